@@ -1,5 +1,7 @@
 # Optimized LLM Configuration for maximum output quality and detailed responses
 
+import os
+
 # Model-specific optimizations
 LLM_CONFIGS = {
     "mistral:instruct": {
@@ -69,4 +71,21 @@ Question: {question}
 
 Technical Response:
 """
-}
\ No newline at end of file
+}
+
+# Shared Ollama client pool settings (see backend/services/llm_pool.py)
+OLLAMA_POOL_CONFIGS = {
+    # Comma-separated list of Ollama servers; requests go to the least busy one
+    "base_urls": [
+        url.strip() for url in os.environ.get("OLLAMA_BASE_URLS", "http://localhost:11434").split(",")
+        if url.strip()
+    ],
+    "max_connections": int(os.environ.get("OLLAMA_MAX_CONNECTIONS", 16)),   # Per client object
+    "max_keepalive_connections": 8,
+    "keepalive_expiry": 300,       # Seconds an idle connection stays open
+    "request_timeout": 600,        # Long generations can take minutes
+    # Concurrent generations allowed per model across all base URLs
+    "max_in_flight": {
+        "default": int(os.environ.get("OLLAMA_MAX_IN_FLIGHT", 4)),
+    }
+}
@@ -1,3 +1,5 @@
+import os
+
 # Performance-optimized configurations for maximum output quality
 
 # Maximum response configurations (prioritizing detailed responses over speed)
@@ -6,7 +8,7 @@ FAST_LLM_CONFIGS = {
         "temperature": 0.3,
         "top_k": 20,         
         "top_p": 0.9,
-        "num_ctx": 32768,    # Maximum context window for mistral:instruct
+        "num_ctx": 32768,    # Upper bound; per-request num_ctx is bucketed by services/token_budget.py
         "repeat_penalty": 1.1,
         "num_predict": 2048, # Maximum response length for detailed answers
         "stop": ["</s>", "[INST]", "[/INST]"]
@@ -83,3 +85,211 @@ SPEED_TEST_CONFIGS = {
         "temperature": 0.2
     }
 }
+
+# Thread pools for blocking work called from async request handlers.
+# "cpu" runs embedding, parsing and FAISS search; "io" runs oc subprocesses and web fetches.
+CONCURRENCY_CONFIGS = {
+    "cpu_workers": int(os.environ.get("CPU_POOL_SIZE", min(8, os.cpu_count() or 4))),
+    "io_workers": int(os.environ.get("IO_POOL_SIZE", 32)),
+    "retrieval_workers": int(os.environ.get("RETRIEVAL_POOL_SIZE", 16))  # Concurrent index searches (see retrieval_orchestrator.py)
+}
+
+# Admission control for LLM generations (see backend/services/scheduler.py).
+# Concurrency per model comes from OLLAMA_POOL_CONFIGS["max_in_flight"].
+SCHEDULER_CONFIGS = {
+    "max_queue_depth": int(os.environ.get("SCHEDULER_MAX_QUEUE_DEPTH", 32)),  # Waiting requests per model
+    "max_queued_per_chat": 2,          # A single chat cannot flood the queue
+    "default_deadline": float(os.environ.get("SCHEDULER_DEADLINE_SECONDS", 180)),  # Queue wait + generation
+    "initial_service_time": 30.0,      # Seed for the generation time estimate (seconds)
+    "service_time_smoothing": 0.2,     # EWMA weight of the latest generation time
+    "wait_time_window": 500            # Recent waits kept for percentiles
+}
+
+# Per-request context window sizing (see backend/services/token_budget.py).
+# num_ctx is rounded up to a bucket so Ollama only reloads a model for a handful of sizes.
+TOKEN_BUDGET_CONFIGS = {
+    "ctx_buckets": [4096, 8192, 16384, 32768],
+    "chars_per_token": 3.5,     # Slightly below the ~4 typical of English prose; YAML/CLI output is denser
+    "safety_margin": 0.1,       # Extra headroom on the prompt estimate
+    "min_output_tokens": 512,   # Never shrink num_predict below this to make a prompt fit
+    "template_overhead_tokens": 64  # Chat template / special tokens added by Ollama
+}
+
+# Token-budgeted context packing (see backend/services/context_packer.py)
+CONTEXT_PACKER_CONFIGS = {
+    **TOKEN_BUDGET_CONFIGS,
+    "max_context_tokens": 12000,       # Upper bound for packed context, below the window limit
+    "max_passage_tokens": 400,         # Long pages are split into passages of this size
+    "retrieval_score_weight": 0.7,     # Blend of retrieval score vs. query term overlap
+    "passage_position_decay": 0.97,    # Later passages of the same page score a little lower
+    "near_duplicate_threshold": 0.8,   # Jaccard similarity of 5-word shingles
+    "min_score": 0.05,                 # Passages sharing almost no query terms are skipped
+    "source_quotas": {"local": 0.6, "web": 0.6, "oc": 0.4},  # Share of budget per source (first pass)
+    "render_order": ["oc", "local", "web"]
+}
+
+# NAS ingestion (see backend/vector_store/ingestion_manifest.py and parallel_ingest.py)
+INGESTION_CONFIGS = {
+    "parse_workers": int(os.environ.get("INGEST_PARSE_WORKERS", os.cpu_count() or 1)),  # Parser processes
+    "parse_timeout": float(os.environ.get("INGEST_PARSE_TIMEOUT", 300)),  # Seconds per file before its worker is killed
+    "result_queue_size": 64,    # Parsed files buffered ahead of embedding
+    "embed_batch_files": 64     # Files embedded per add_documents call
+}
+
+# Shared embedding model (see backend/vector_store/embedding_service.py)
+EMBEDDING_SERVICE_CONFIGS = {
+    "batch_window_ms": 10,          # How long to collect concurrent requests into one encode call
+    "max_batch_size": 256,          # Texts per encode call before the window closes early
+    "memory_cache_entries": 50000,  # ~75 MB of 384-dim vectors
+    "disk_cache_enabled": os.environ.get("EMBEDDING_DISK_CACHE", "true").lower() == "true",
+    "disk_cache_path": os.environ.get("EMBEDDING_CACHE_PATH", "embedding_cache/embeddings.sqlite")
+}
+
+# Per-chat upload indexes (see backend/vector_store/session_index.py)
+SESSION_INDEX_CONFIGS = {
+    "max_sessions_in_memory": int(os.environ.get("SESSION_INDEX_MAX_IN_MEMORY", 64)),
+    "idle_seconds": 1800,        # Indexes unused this long are evicted on the next pass
+    "spill_to_disk": True,       # Evicted indexes are written to spill_dir instead of dropped
+    "spill_dir": os.environ.get("SESSION_INDEX_SPILL_DIR", "session_indexes")
+}
+
+# Chat session limits (see backend/services/session_manager.py)
+SESSION_CONFIGS = {
+    "max_sessions": int(os.environ.get("SESSION_MAX_SESSIONS", 500)),
+    "max_total_bytes": int(os.environ.get("SESSION_MAX_BYTES", 1024 * 1024 * 1024)),  # Documents + indexes
+    "idle_ttl_seconds": int(os.environ.get("SESSION_IDLE_TTL_SECONDS", 4 * 3600)),
+    "sweep_interval_seconds": 60
+}
+
+# Where chat sessions live (see backend/services/session_backend.py). "memory" keeps
+# them in this process; "redis" shares them across uvicorn workers and replicas.
+SESSION_BACKEND_CONFIGS = {
+    "backend": os.environ.get("SESSION_BACKEND", "memory"),
+    "redis_url": os.environ.get("REDIS_URL", "redis://localhost:6379/0"),
+    "key_prefix": os.environ.get("SESSION_KEY_PREFIX", "llm-assistant:session:"),
+    "idle_ttl_seconds": SESSION_CONFIGS["idle_ttl_seconds"],  # Redis keys expire after this much inactivity
+    "store_vectors": True  # Share serialized session indexes so other workers skip re-embedding
+}
+
+# Staged startup (see backend/services/startup.py)
+STARTUP_CONFIGS = {
+    # Warm every component in the background as soon as the app starts; when false,
+    # components load on first use only
+    "eager": os.environ.get("STARTUP_EAGER", "true").lower() == "true",
+    "retry_interval_seconds": 15,  # Retry components marked retry=True (e.g. an unreachable Ollama)
+    "retry_after_seconds": 5       # Retry-After sent with 503s while components are loading
+}
+
+# Global FAISS index loading (see backend/vector_store/mmap_store.py)
+VECTOR_STORE_CONFIGS = {
+    # Memory-map index.faiss read-only and serve documents from docstore.sqlite, so
+    # uvicorn workers on a node share one copy through the page cache. The index
+    # is then only updated by init_faiss.py, not by live oc results.
+    "mmap_read_only": os.environ.get("FAISS_MMAP_READ_ONLY", "false").lower() == "true",
+    "docstore_mmap_bytes": 256 * 1024 * 1024
+}
+
+# ANN index built next to the flat FAISS index (see backend/vector_store/ann_index.py).
+# Chosen at build time (FAISS_INDEX_TYPE or init_faiss.py --index-type); the API
+# searches it automatically while it matches index.faiss.
+ANN_INDEX_CONFIGS = {
+    "type": os.environ.get("FAISS_INDEX_TYPE", "flat"),  # flat, hnsw, ivf_flat or ivf_pq
+    "min_vectors": 10000,         # Below this, exact flat search is fast enough
+    "hnsw_m": 32,
+    "hnsw_ef_construction": 200,
+    "ivf_nlist": None,            # None: 4 * sqrt(vectors)
+    "pq_m": 48,                   # Sub-quantizers (reduced to a divisor of the dimension); 384-dim -> 8 bytes each
+    "pq_nbits": 8,
+    "train_sample": 100000,       # Vectors sampled for IVF/PQ training
+    "build_batch_size": 50000,
+    # Search-time knobs; a request may name a profile or pass its own values
+    "search_profiles": {
+        "fast": {"nprobe": 8, "efSearch": 32},
+        "balanced": {"nprobe": 32, "efSearch": 96},
+        "accurate": {"nprobe": 128, "efSearch": 256}
+    },
+    "default_profile": os.environ.get("FAISS_SEARCH_PROFILE", "balanced")
+}
+
+# Versioned FAISS index snapshots (see backend/vector_store/snapshots.py)
+SNAPSHOT_CONFIGS = {
+    "keep": int(os.environ.get("INDEX_SNAPSHOTS_KEEP", "3")),  # Published snapshots kept for rollback
+    "hot_swap": True,              # API workers switch to a newly published snapshot without restarting
+    "poll_interval_seconds": 10    # How often workers check faiss_index/CURRENT
+}
+
+# Live oc command output, kept in memory and merged into retrieval (see backend/vector_store/live_index.py)
+LIVE_INDEX_CONFIGS = {
+    "ttl_seconds": 300,       # Cluster state older than this is dropped
+    "max_entries": 64,        # Distinct commands kept; oldest evicted first
+    "chunk_chars": 2000,      # oc output is split on line boundaries into chunks of this size
+    "k": 3,                   # Live documents merged ahead of the static results
+    "min_similarity": 0.3     # Cosine similarity below which live output is not considered relevant
+}
+
+# Structure-aware chunking before embedding (see backend/vector_store/chunking.py).
+# Changing these re-embeds the NAS index on the next init_faiss.py run.
+CHUNKING_CONFIGS = {
+    **TOKEN_BUDGET_CONFIGS,
+    "enabled": True,
+    "chunk_tokens": 200,      # all-MiniLM-L6-v2 truncates input at 256 word pieces
+    "overlap_tokens": 30,     # Trailing lines/sentences repeated at the start of the next chunk
+    "min_chunk_tokens": 40    # Smaller PDF/HTML sections are folded into the previous one
+}
+
+# BM25 keyword index kept next to the FAISS index (see backend/vector_store/lexical_index.py)
+LEXICAL_INDEX_CONFIGS = {
+    "enabled": os.environ.get("LEXICAL_INDEX_ENABLED", "true").lower() == "true",
+    "k1": 1.2,
+    "b": 0.75,
+    "k": 5,                    # Lexical hits per query
+    "buffer_docs": 50000,      # Added documents held in memory before becoming a segment
+    "max_segments": 8,         # More segments than this are merged on commit
+    "max_deleted_ratio": 0.3   # Segments are also merged when this share of documents is deleted
+}
+
+# Concurrent hybrid retrieval and rank fusion (see backend/services/retrieval_orchestrator.py)
+RETRIEVAL_CONFIGS = {
+    "fusion": os.environ.get("RETRIEVAL_FUSION", "rrf"),  # rrf (reciprocal rank) or score (min-max normalized)
+    "rrf_k": 60,
+    "k": 5,                        # Fused documents returned
+    "candidates_per_backend": 10,  # Hits requested from each index before fusion
+    "timeout_seconds": float(os.environ.get("RETRIEVAL_TIMEOUT_SECONDS", 2.0)),  # Per backend; late results are dropped
+    # Backend weights in the fusion; live cluster state and the chat's uploads rank ahead of the NAS docs
+    "weights": {"dense": 1.0, "lexical": 1.0, "session": 1.5, "live": 2.0}
+}
+
+# Cross-encoder reranking of fused results (see backend/services/reranker.py).
+# A /query request may name a profile in "rerank"; RERANKER_PROFILE sets the default (unset: off).
+RERANKER_CONFIGS = {
+    "default_profile": os.environ.get("RERANKER_PROFILE") or None,
+    "profiles": {
+        "fast": {"model": "cross-encoder/ms-marco-MiniLM-L-2-v2", "max_candidates": 15, "max_passage_tokens": 128},
+        "balanced": {"model": "cross-encoder/ms-marco-MiniLM-L-4-v2", "max_candidates": 20, "max_passage_tokens": 192},
+        "accurate": {"model": "cross-encoder/ms-marco-MiniLM-L-6-v2", "max_candidates": 30, "max_passage_tokens": 256}
+    },
+    "latency_budget_ms": float(os.environ.get("RERANKER_LATENCY_BUDGET_MS", 400)),  # Over budget: keep fused order
+    "batch_window_ms": 5,          # How long to collect pairs from concurrent requests into one model call
+    "max_batch_pairs": 64,
+    "cache_entries": 20000,        # (query, chunk) scores kept in memory
+    "latency_smoothing": 0.2,      # EWMA weight of the latest per-pair model time
+    "chars_per_token": TOKEN_BUDGET_CONFIGS["chars_per_token"]
+}
+
+# Cache of /query answers for repeated and near-duplicate questions (see backend/services/answer_cache.py)
+ANSWER_CACHE_CONFIGS = {
+    "enabled": os.environ.get("ANSWER_CACHE_ENABLED", "true").lower() == "true",
+    "max_entries": 2000,
+    "ttl_seconds": int(os.environ.get("ANSWER_CACHE_TTL_SECONDS", 6 * 3600)),
+    "similarity_threshold": 0.92,  # Cosine similarity of question embeddings for a near-duplicate hit
+    "min_chunk_overlap": 0.6,      # Jaccard overlap of retrieved chunks required for a near-duplicate hit
+    "skip_with_history": True      # Follow-up questions depend on the conversation, not just the question
+}
+
+# Metadata pre-filtering of the global index (see backend/vector_store/metadata_index.py)
+METADATA_FILTER_CONFIGS = {
+    # Narrow to the OpenShift version a question names (e.g. "OpenShift 4.16"), keeping unversioned documents
+    "detect_openshift_version": os.environ.get("DETECT_OPENSHIFT_VERSION", "true").lower() == "true",
+    "exact_search_max_rows": 4096,   # Filters selecting at most this many vectors are scanned exactly
+    "selection_cache_entries": 64    # Recent filters kept with their faiss selector and lexical masks
+}
@@ -1,4 +1,5 @@
 # Web search configuration for combining local and internet knowledge
+import os
 
 # Trusted websites for different types of queries - SPECIFIC REDHAT DOCUMENTATION URLS
 TRUSTED_WEBSITES = {
@@ -72,6 +73,20 @@ WEB_SEARCH_CONFIG = {
     "user_agent": "LLM-Assistant/1.0 (Educational Purpose - Red Hat Documentation)"
 }
 
+# Concurrent page fetching (see backend/services/web_fetcher.py)
+WEB_FETCH_CONFIG = {
+    "http2": True,                 # Used when the h2 package is installed (pip install httpx[http2])
+    "max_connections": 20,
+    "max_keepalive_connections": 10,
+    "keepalive_expiry": 60,
+    "connect_timeout": 3.0,
+    "per_host_concurrency": 4,     # Simultaneous requests to one site
+    "rate_per_host": 4.0,          # Token bucket: requests per second to one site...
+    "burst_per_host": 4,           # ...with bursts of up to this many
+    # Pages not fetched by then are cancelled and the search continues with what arrived
+    "deadline_seconds": float(os.environ.get("WEB_FETCH_DEADLINE_SECONDS", 6.0))
+}
+
 # Content filtering settings
 CONTENT_FILTER = {
     "min_content_length": 100,
@@ -90,7 +105,7 @@ HYBRID_CONFIG = {
     "local_weight": 0.4,      # 30% weight to local documents
     "web_weight": 0.6,        # 70% weight to web content
     "merge_strategy": "complement",  # "complement" or "verify" or "expand"
-    "max_hybrid_context": 64000,  # Further increased context limit for full responses
+    "max_hybrid_context_tokens": 12000,  # Token budget for packed local + web context
     "prioritize_local": True,     # Show local results first
     "web_fallback": True         # Use web if local results insufficient
 }
@@ -1,13 +1,13 @@
 import os
 from pathlib import Path
 import sys
-from parsers.pdf_parser import parse_pdf
-from parsers.yaml_parser import parse_yaml
-from parsers.shell_parser import parse_shell_script
-from parsers.html_parser import parse_html
+import time
+from parsers.nas_parser import nas_file_type, parse_nas_file
 from parsers.oc_parser import run_oc_explain
 from vector_store.faiss_store import create_vector_store
+from vector_store.ingestion_manifest import index_up_to_date, sync_vector_store
 from vector_store.optimized_retrieval import create_optimized_vector_store
+from vector_store.snapshots import SnapshotStore
 
 
 NAS_PATH = "../nas_data"  # Adjust to your NAS path
@@ -64,51 +64,15 @@ def process_nas_files():
             relative_dir = os.path.relpath(root, NAS_PATH)
             file_stats["total_files"] += 1
             
-            # Add directory context to metadata for better organization
-            result = None
-            base_metadata = {
-                "source": file_path,
-                "directory": relative_dir,
-                "filename": file,
-                "file_type": None
-            }
+            file_type = nas_file_type(file)
+            if file_type is None:
+                file_stats["skipped"] += 1
+                continue
             
             try:
-                if file.endswith(".pdf"):
-                    result = parse_pdf(file_path)
-                    file_stats["pdf"] += 1
-                    base_metadata["file_type"] = "pdf"
-                elif file.endswith((".yaml", ".yml")):
-                    with open(file_path, 'r', encoding='utf-8') as f:
-                        result = parse_yaml(f.read())
-                    file_stats["yaml"] += 1
-                    base_metadata["file_type"] = "yaml"
-                elif file.endswith(".sh"):
-                    with open(file_path, 'r', encoding='utf-8') as f:
-                        result = parse_shell_script(f.read())
-                    file_stats["shell"] += 1
-                    base_metadata["file_type"] = "shell"
-                elif file.endswith((".html", ".htm")):
-                    with open(file_path, 'r', encoding='utf-8') as f:
-                        result = parse_html(f.read())
-                    file_stats["html"] += 1
-                    base_metadata["file_type"] = "html"
-                else:
-                    file_stats["skipped"] += 1
-                    continue
-                
+                result = parse_nas_file(file_path, relative_dir)
+                file_stats[file_type] += 1
                 if result:
-                    # Enhance result metadata with directory information
-                    if hasattr(result, 'metadata'):
-                        result.metadata.update(base_metadata)
-                    elif isinstance(result, dict) and 'metadata' in result:
-                        result['metadata'].update(base_metadata)
-                    else:
-                        # Handle different result formats
-                        if isinstance(result, dict):
-                            result['metadata'] = base_metadata
-                        else:
-                            result.metadata = base_metadata
                     parsed_data.append(result)
                     
             except Exception as e:
@@ -130,8 +94,59 @@ def process_nas_files():
     return parsed_data
 
 def main():
-    """Initialize FAISS index."""
+    """Initialize or incrementally update the FAISS index.
+
+    Pass --rebuild to re-embed every file instead of only new and changed ones,
+    and --index-type=hnsw|ivf_flat|ivf_pq|flat to choose the ANN index built
+    next to the flat one (default: ANN_INDEX_CONFIGS / FAISS_INDEX_TYPE).
+    Each run that changes the index publishes a new snapshot, which running
+    API workers pick up without a restart. --list-snapshots shows them and
+    --rollback[=vNNNNNN] serves the previous (or given) one again.
+    """
+    from backend.config.performance_config import ANN_INDEX_CONFIGS
+
+    snapshots = SnapshotStore(FAISS_INDEX_PATH)
+    ann_config = dict(ANN_INDEX_CONFIGS)
+    for arg in sys.argv[1:]:
+        if arg.startswith("--index-type="):
+            ann_config["type"] = arg.split("=", 1)[1]
+        elif arg == "--list-snapshots":
+            for info in snapshots.versions():
+                marker = "*" if info["current"] else " "
+                print(f"{marker} {info['version']}  source={info.get('source')}  parent={info.get('parent')}  "
+                      f"created={time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(info.get('created_at', 0)))}")
+            return
+        elif arg == "--rollback" or arg.startswith("--rollback="):
+            version = arg.split("=", 1)[1] if "=" in arg else None
+            print(f"FAISS index rolled back to snapshot {snapshots.rollback(version)}")
+            return
+
     os.makedirs(FAISS_INDEX_PATH, exist_ok=True)
+    if os.path.exists(NAS_PATH):
+        rebuild = "--rebuild" in sys.argv
+        current = snapshots.current_version()
+        # Diff the share against the served snapshot before staging a copy of it
+        if current and not rebuild and index_up_to_date(NAS_PATH, str(snapshots.current_path()), ann_config=ann_config):
+            print(f"FAISS index is up to date (snapshot {current})")
+            return
+        with snapshots.stage() as staging:
+            vector_store, report = sync_vector_store(
+                NAS_PATH, str(staging), parse_nas_file, rebuild=rebuild, ann_config=ann_config
+            )
+            if vector_store is None:
+                print("No data to index. FAISS index not created.")
+                return
+            if not report["index_updated"] and snapshots.current_version():
+                print(f"FAISS index is up to date (snapshot {snapshots.current_version()})")
+                return
+            version = snapshots.publish(staging, source="init_faiss", info={"ingestion": report})
+        print(f"FAISS index snapshot {version} published at {FAISS_INDEX_PATH}: "
+              f"{report['new_files']} new, {report['changed_files']} changed, "
+              f"{report['removed_files']} removed, {report['unchanged_files']} unchanged files "
+              f"({report['vectors_added']} vectors added, {report['vectors_deleted']} deleted) "
+              f"in {report['seconds']}s")
+        return
+
     parsed_data = process_nas_files()
     if not parsed_data:
         print("No data to index. FAISS index not created.")
@@ -142,4 +157,4 @@ def main():
 
 if __name__ == "__main__":
     sys.path.append(str(Path(__file__).parent.parent))
-    main()
\ No newline at end of file
+    main()
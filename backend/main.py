@@ -7,11 +7,16 @@ import asyncio
 # Add S:\Project to Python path
 sys.path.append(str(Path(__file__).parent.parent))
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from starlette.middleware.sessions import SessionMiddleware
-from backend.routes.api import router as api_router
+from backend.routes.api import router as api_router, session_manager, snapshot_watcher
 from backend.routes.oauth import router as oauth_router
+from backend.services.executors import install_default_executor, shutdown_executors
+from backend.services.scheduler import SchedulerRejected
+from backend.services.startup import ComponentsNotReady, startup
+from backend.services.web_fetcher import web_fetcher
 
 # Configuration
 os.makedirs("parsed_data", exist_ok=True)
@@ -36,5 +41,64 @@ app.add_middleware(
 app.include_router(api_router)
 app.include_router(oauth_router)
 
+@app.exception_handler(SchedulerRejected)
+async def scheduler_rejected_handler(request: Request, exc: SchedulerRejected):
+    """Map scheduler rejections to 429/503 with a Retry-After estimate."""
+    return JSONResponse(
+        status_code=exc.status_code,
+        content={"detail": exc.detail, "retry_after": exc.retry_after},
+        headers={"Retry-After": str(exc.retry_after)}
+    )
+
+@app.exception_handler(ComponentsNotReady)
+async def components_not_ready_handler(request: Request, exc: ComponentsNotReady):
+    """Reject requests that need components still loading with 503 and Retry-After."""
+    return JSONResponse(
+        status_code=exc.status_code,
+        content={"detail": exc.detail, "components": exc.components, "retry_after": exc.retry_after},
+        headers={"Retry-After": str(exc.retry_after)}
+    )
+
+@app.on_event("startup")
+async def configure_executors():
+    """Bound library-internal executor usage to the configured CPU pool."""
+    install_default_executor()
+
+@app.on_event("startup")
+async def start_components():
+    """Load the index, LLM and NLP models in the background; /readyz reports progress."""
+    startup.start()
+
+@app.on_event("startup")
+async def start_session_sweeper():
+    """Periodically evict idle chat sessions and enforce the session memory cap."""
+    session_manager.start_sweeper()
+
+@app.on_event("startup")
+async def start_snapshot_watcher():
+    """Swap to newly published FAISS index snapshots without a restart."""
+    snapshot_watcher.start()
+
+@app.on_event("shutdown")
+async def stop_components():
+    await startup.stop()
+
+@app.on_event("shutdown")
+async def stop_snapshot_watcher():
+    await snapshot_watcher.stop()
+
+@app.on_event("shutdown")
+async def stop_session_sweeper():
+    await session_manager.stop_sweeper()
+
+@app.on_event("shutdown")
+async def stop_web_fetcher():
+    await asyncio.to_thread(web_fetcher.close)
+
+@app.on_event("shutdown")
+async def stop_executors():
+    """Release worker threads on shutdown."""
+    shutdown_executors()
+
 if __name__ == "__main__":
     uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
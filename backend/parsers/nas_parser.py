@@ -0,0 +1,50 @@
+import os
+
+from .html_parser import parse_html
+from .pdf_parser import parse_pdf
+from .shell_parser import parse_shell_script
+from .yaml_parser import parse_yaml
+
+def nas_file_type(file):
+    """Return the parser key for a NAS file, or None if it is not supported."""
+    if file.endswith(".pdf"):
+        return "pdf"
+    if file.endswith((".yaml", ".yml")):
+        return "yaml"
+    if file.endswith(".sh"):
+        return "shell"
+    if file.endswith((".html", ".htm")):
+        return "html"
+    return None
+
+def parse_nas_file(file_path, relative_dir):
+    """Parse a single NAS file and attach its directory metadata."""
+    file = os.path.basename(file_path)
+    file_type = nas_file_type(file)
+    if file_type is None:
+        return None
+
+    if file_type == "pdf":
+        result = parse_pdf(file_path)
+    else:
+        text_parsers = {"yaml": parse_yaml, "shell": parse_shell_script, "html": parse_html}
+        with open(file_path, 'r', encoding='utf-8') as f:
+            result = text_parsers[file_type](f.read())
+
+    if result:
+        # Add directory context to metadata for better organization
+        base_metadata = {
+            "source": file_path,
+            "directory": relative_dir,
+            "filename": file,
+            "file_type": file_type
+        }
+        if hasattr(result, 'metadata'):
+            result.metadata.update(base_metadata)
+        elif isinstance(result, dict) and 'metadata' in result:
+            result['metadata'].update(base_metadata)
+        elif isinstance(result, dict):
+            result['metadata'] = base_metadata
+        else:
+            result.metadata = base_metadata
+    return result
@@ -1,3 +1,4 @@
+import asyncio
 import subprocess
 import json
 import re
@@ -136,6 +137,31 @@ class OpenShiftCommandHandler:
         
         return results
     
+    async def aexecute_commands(self, commands: List[Dict]) -> Dict[str, Dict]:
+        """Execute oc commands concurrently on the I/O thread pool and return results."""
+        from backend.services.executors import run_io_bound
+        
+        async def run_command(cmd_info: Dict) -> Optional[Dict]:
+            command_type = cmd_info['command']
+            if command_type not in self.supported_commands:
+                return None
+            try:
+                return await run_io_bound(self.supported_commands[command_type], cmd_info)
+            except Exception as e:
+                logger.error(f"Failed to execute oc command {cmd_info}: {e}")
+                return None
+        
+        outputs = await asyncio.gather(*(run_command(cmd_info) for cmd_info in commands))
+        
+        results = {}
+        for cmd_info, result in zip(commands, outputs):
+            if result:
+                cache_key = self._get_cache_key(cmd_info)
+                results[cache_key] = result
+                self._cache_result(cache_key, result)
+        
+        return results
+    
     def _run_oc_explain(self, cmd_info: Dict) -> Optional[Dict]:
         """Run oc explain command."""
         resource = cmd_info.get('resource', '')
@@ -441,8 +467,8 @@ class OpenShiftCommandHandler:
         if age < max_age:
             return cache_entry['result']
         else:
-            # Remove expired entry
-            del self.cache[key]
+            # Remove expired entry (may already be gone if another thread expired it)
+            self.cache.pop(key, None)
             return None
     
     def check_oc_availability(self) -> bool:
@@ -461,6 +487,32 @@ class OpenShiftCommandHandler:
             
         except Exception:
             return False
+    
+    async def acheck_oc_availability(self) -> bool:
+        """Async variant of check_oc_availability that does not block the event loop."""
+        try:
+            returncode, _, _ = await run_oc_command_async(['oc', 'version', '--client'], timeout=10)
+            if returncode != 0:
+                return False
+            
+            returncode, _, _ = await run_oc_command_async(['oc', 'whoami'], timeout=10)
+            return returncode == 0
+            
+        except Exception:
+            return False
+
+async def run_oc_command_async(cmd: List[str], timeout: int = 30) -> Tuple[int, str, str]:
+    """Run an oc command as an asyncio subprocess and return (returncode, stdout, stderr)."""
+    process = await asyncio.create_subprocess_exec(
+        *cmd, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
+    )
+    try:
+        stdout, stderr = await asyncio.wait_for(process.communicate(), timeout=timeout)
+    except asyncio.TimeoutError:
+        process.kill()
+        await process.wait()
+        raise subprocess.TimeoutExpired(cmd, timeout)
+    return process.returncode, stdout.decode(errors="replace"), stderr.decode(errors="replace")
 
 # Global instance
 oc_handler = OpenShiftCommandHandler()
@@ -494,4 +546,16 @@ def detect_and_run_oc_commands(query: str) -> Dict[str, Dict]:
     if not commands:
         return {}
     
-    return oc_handler.execute_commands(commands)
\ No newline at end of file
+    return oc_handler.execute_commands(commands)
+
+async def adetect_and_run_oc_commands(query: str) -> Dict[str, Dict]:
+    """Async variant of detect_and_run_oc_commands for request handlers."""
+    if not await oc_handler.acheck_oc_availability():
+        logger.warning("oc command not available or user not logged in")
+        return {}
+    
+    commands = oc_handler.detect_oc_commands_needed(query)
+    if not commands:
+        return {}
+    
+    return await oc_handler.aexecute_commands(commands)
\ No newline at end of file
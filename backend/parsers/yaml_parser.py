@@ -1,17 +1,34 @@
 import yaml
 import json
 
+def _yaml_document(data):
+    """One YAML document as text, with its Kubernetes kind and name when it has them."""
+    document = {"content": yaml.safe_dump(data, sort_keys=False, default_flow_style=False)}
+    if isinstance(data, dict):
+        metadata = data.get("metadata") if isinstance(data.get("metadata"), dict) else {}
+        for key, value in (("kind", data.get("kind")), ("name", metadata.get("name")),
+                           ("namespace", metadata.get("namespace"))):
+            if isinstance(value, str):
+                document[key] = value
+    return document
+
 def parse_yaml(content):
-    """Parse YAML content using PyYAML."""
+    """Parse YAML content (one or more ``---`` separated documents) using PyYAML."""
     try:
-        data = yaml.safe_load(content)
+        documents = [data for data in yaml.safe_load_all(content) if data is not None]
+        data = documents[0] if len(documents) == 1 else documents
         metadata = {
             "source": "uploaded_yaml",
             "type": "yaml",
             "context": "project",
             "filename": "uploaded.yaml"
         }
-        return {"content": json.dumps(data, indent=2), "metadata": metadata}
+        return {
+            "content": json.dumps(data, indent=2, default=str),
+            "metadata": metadata,
+            # Per-document text and kind, used by the chunker to split on document boundaries
+            "documents": [_yaml_document(document) for document in documents]
+        }
     except Exception as e:
         print(f"Error parsing YAML: {e}")
-        return None
\ No newline at end of file
+        return None
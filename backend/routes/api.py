@@ -1,20 +1,45 @@
-from fastapi import APIRouter, File, UploadFile, HTTPException
+from fastapi import APIRouter, File, UploadFile, HTTPException, Request
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel
 import asyncio
 import json
+from contextlib import asynccontextmanager
+from enum import Enum
 from backend.parsers.pdf_parser import parse_pdf, parse_any_file_enhanced
+from backend.parsers.nas_parser import parse_nas_file
 from backend.parsers.yaml_parser import parse_yaml
 from backend.parsers.shell_parser import parse_shell_script
 from backend.parsers.html_parser import parse_html
-from backend.parsers.oc_parser import run_oc_explain, detect_and_run_oc_commands, oc_handler
-from backend.vector_store.faiss_store import create_vector_store
+from backend.parsers.oc_parser import run_oc_explain, adetect_and_run_oc_commands, run_oc_command_async, oc_handler
+from backend.vector_store.ingestion_manifest import sync_vector_store
+from backend.vector_store.embedding_service import get_embedding_service, get_embedding_stats
+from backend.vector_store.session_index import SessionIndexStore
+from backend.vector_store.mmap_store import ReadOnlyFAISS, open_vector_store
+from backend.vector_store.snapshots import SnapshotStore
+from backend.vector_store.live_index import LiveClusterIndex
+from backend.vector_store.metadata_index import normalize_filters
+from backend.services.session_manager import SessionManager
+from backend.services.session_backend import create_session_backend
+from backend.config.performance_config import (
+    ANN_INDEX_CONFIGS, RERANKER_CONFIGS, SESSION_INDEX_CONFIGS, VECTOR_STORE_CONFIGS
+)
 from backend.services.web_search import HybridKnowledgeSystem
-from langchain_ollama import OllamaLLM
+from backend.services.executors import run_cpu_bound, run_io_bound, get_executor_stats
+from backend.services.llm_pool import llm_registry
+from backend.services.scheduler import generation_scheduler, SchedulerRejected
+from backend.services.token_budget import plan_context_window, available_context_tokens
+from backend.services.context_packer import context_packer, chunks_from_documents
+from backend.services.startup import startup
+from backend.services.snapshot_watcher import SnapshotWatcher
+from backend.services.reranker import get_reranker, get_reranker_stats
+from backend.services.retrieval_orchestrator import (
+    FusionRetriever, RetrievalOrchestrator, chunk_id, lexical_backend, live_backend, vector_backend
+)
+from backend.services.answer_cache import answer_cache
+from backend.services.query_preprocessor import PreparedQuery, query_preprocessor
+from backend.services.web_fetcher import web_fetcher
 from langchain.chains import RetrievalQA
 from langchain.prompts import PromptTemplate
-from langchain.docstore.document import Document
-from langchain_huggingface import HuggingFaceEmbeddings
-from langchain_community.vectorstores import FAISS
 import os
 import re
 import time
@@ -22,8 +47,8 @@ from pathlib import Path
 import json
 import logging
 from pythonjsonlogger import jsonlogger
-import spacy
 import requests
+import httpx
 
 # Configuration Constants
 NAS_PATH = "nas_data"
@@ -34,6 +59,12 @@ LLM_MODEL = "mistral:instruct"  # Current model
 EMBEDDING_MODEL = "all-MiniLM-L6-v2"
 FAISS_INDEX_PATH = "faiss_index" 
 GREETINGS_CONFIG_PATH = "config/greetings.json"
+SUPPORTED_MODELS = ["mistral:instruct", "llama3.1:8b"]
+
+# System prompts for the per-request LLM instances
+QUERY_SYSTEM_PROMPT = "You are an AI assistant that ONLY uses the provided document context to answer questions. You do NOT have access to the internet, current events, or any external information beyond what is explicitly provided in the context. If the provided documents do not contain sufficient information, clearly state you cannot answer based on available information. IMPORTANT: Always format your responses with proper structure - use numbered lists (1., 2., 3.) for procedures, bullet points (•) for lists, code blocks with triple backticks (```), and **bold** for important concepts. Make your responses well-organized and easy to read."
+HYBRID_SYSTEM_PROMPT = "You are an expert AI assistant with access to both local documentation and current web information. Always format your responses professionally with numbered procedures (1., 2., 3.), bullet points (•) for lists, code blocks with triple backticks (```), and **bold** for important concepts. Structure your answers clearly with proper paragraph breaks and logical organization."
+LOCAL_CONTEXT_SYSTEM_PROMPT = "You are an expert AI assistant. Always format your responses professionally and use conversation history to provide relevant, contextual answers."
 
 # Import optimized configurations with fallback
 try:
@@ -83,29 +114,23 @@ file_handler = logging.FileHandler(LOG_FILE)
 file_handler.setFormatter(jsonlogger.JsonFormatter())
 logger.addHandler(file_handler)
 
-# Initialize spaCy
-nlp = spacy.load("en_core_web_sm")
-
-# Load greetings configuration
-with open(GREETINGS_CONFIG_PATH, 'r') as f:
-    greetings_config = json.load(f)
-if isinstance(greetings_config, dict) and "greetings" in greetings_config:
-    greetings_config = greetings_config["greetings"]
-
-# Initialize global variables
-parsed_data = []
+# Initialize global variables; the expensive ones are filled in by the startup components below
+llm = None
 vector_store = None
 qa_chain = None
 hybrid_system = None  # Add hybrid system
 
 # Chat session management
-chat_sessions = {}  # Store chat-specific contexts and files
-session_vector_stores = {}  # Store vector stores per chat session
+session_indexes = SessionIndexStore(get_embedding_service(EMBEDDING_MODEL), SESSION_INDEX_CONFIGS)  # In-memory vector index per chat session
+live_index = LiveClusterIndex(get_embedding_service(EMBEDDING_MODEL))  # Latest oc output per command, never persisted
+session_manager = SessionManager(session_indexes, backend=create_session_backend())  # Bounded store of chat-specific contexts and files
+retrieval_orchestrator = RetrievalOrchestrator()  # Searches all indexes concurrently and fuses their rankings
 
 def is_greeting(query):
     """Check if the query is a greeting using spaCy and config patterns."""
     query = query.strip().lower()
-    doc = nlp(query)
+    doc = startup.get("nlp")(query)
+    greetings_config = startup.get("greetings")
     
     # Only check for greetings in very short queries and only if they start with greeting words
     if len(doc) <= 3:  
@@ -134,143 +159,168 @@ def is_greeting(query):
             return response
     
     return None
-    
-    return None
 
-def process_nas_files():
-    """Process all files in the NAS directory with enhanced directory structure support."""
-    global parsed_data
-    parsed_data = []
-    if not os.path.exists(NAS_PATH):
-        print(f"NAS directory {NAS_PATH} not found.")
-        logger.warning({"message": f"NAS directory {NAS_PATH} not found"})
-        return
-    
-    # Track processing statistics
-    file_stats = {
-        "pdf": 0,
-        "yaml": 0, 
-        "shell": 0,
-        "html": 0,
-        "skipped": 0,
-        "directories": set(),
-        "total_files": 0
+async def _detect_greeting(query):
+    """is_greeting, run off the event loop while spaCy has not been loaded yet."""
+    if startup.is_ready("nlp") and startup.is_ready("greetings"):
+        return is_greeting(query)
+    return await run_cpu_bound(is_greeting, query)
+
+# Query Classification and Optimization Functions
+class QueryType(Enum):
+    TECHNICAL_CONFIG = "technical_config"
+    TROUBLESHOOTING = "troubleshooting"
+    CODE_ANALYSIS = "code_analysis"
+    GENERAL_INFO = "general_info"
+    COMPARISON = "comparison"
+    STEP_BY_STEP = "step_by_step"
+
+class QueryClassifier:
+    """Simple query classifier for optimized processing."""
+
+    @staticmethod
+    def classify_query(query: str) -> QueryType:
+        """Classify query type based on keywords and patterns."""
+        query_lower = query.lower()
+
+        # Technical configuration keywords
+        if any(word in query_lower for word in ["configure", "config", "setup", "install", "deploy", "create"]):
+            return QueryType.TECHNICAL_CONFIG
+
+        # Troubleshooting keywords
+        if any(word in query_lower for word in ["error", "problem", "issue", "fix", "debug", "troubleshoot", "fails", "not working"]):
+            return QueryType.TROUBLESHOOTING
+
+        # Code analysis keywords
+        if any(word in query_lower for word in ["code", "script", "command", "analyze", "explain", "review"]):
+            return QueryType.CODE_ANALYSIS
+
+        # Comparison keywords
+        if any(word in query_lower for word in ["compare", "difference", "vs", "versus", "better", "prefer"]):
+            return QueryType.COMPARISON
+
+        # Step-by-step keywords
+        if any(word in query_lower for word in ["how to", "step by step", "guide", "tutorial", "process"]):
+            return QueryType.STEP_BY_STEP
+
+        return QueryType.GENERAL_INFO
+
+def enhance_context_with_metadata(documents, query_type):
+    """Enhance document context with metadata based on query type."""
+    if not documents:
+        return ""
+
+    enhanced_context = []
+    for doc in documents:
+        # Add document source information
+        source = getattr(doc, 'metadata', {}).get('source', 'Unknown')
+        page = getattr(doc, 'metadata', {}).get('page', 'N/A')
+
+        context_block = f"[Source: {source}, Page: {page}]\n{doc.page_content}\n"
+        enhanced_context.append(context_block)
+
+    return "\n---\n".join(enhanced_context)
+
+def optimize_response_quality(query, source_documents, response):
+    """Simple response quality optimization."""
+    quality_metrics = {
+        "has_sources": len(source_documents) > 0,
+        "response_length": len(response),
+        "includes_examples": "example" in response.lower() or "for instance" in response.lower(),
+        "includes_commands": any(char in response for char in ["$", "#", "oc ", "kubectl"]),
+        "confidence_score": 0.8  # Default confidence
     }
-    
-    logger.info({"message": "Starting NAS directory processing", "path": NAS_PATH})
-    
-    for root, dirs, files in os.walk(NAS_PATH):
-        if files:  # Only log directories that contain files
-            relative_path = os.path.relpath(root, NAS_PATH)
-            file_stats["directories"].add(relative_path)
-            logger.info({"message": f"Processing directory: {relative_path}", "file_count": len(files)})
-        
-        for file in files:
-            file_path = os.path.join(root, file)
-            relative_dir = os.path.relpath(root, NAS_PATH)
-            file_stats["total_files"] += 1
-            
-            # Add directory context to metadata for better organization
-            result = None
-            base_metadata = {
-                "source": file_path,
-                "directory": relative_dir,
-                "filename": file,
-                "file_type": None
-            }
-            
-            try:
-                if file.endswith(".pdf"):
-                    result = parse_pdf(file_path)
-                    file_stats["pdf"] += 1
-                    base_metadata["file_type"] = "pdf"
-                elif file.endswith((".yaml", ".yml")):
-                    with open(file_path, 'r', encoding='utf-8') as f:
-                        result = parse_yaml(f.read())
-                    file_stats["yaml"] += 1
-                    base_metadata["file_type"] = "yaml"
-                elif file.endswith(".sh"):
-                    with open(file_path, 'r', encoding='utf-8') as f:
-                        result = parse_shell_script(f.read())
-                    file_stats["shell"] += 1
-                    base_metadata["file_type"] = "shell"
-                elif file.endswith((".html", ".htm")):
-                    with open(file_path, 'r', encoding='utf-8') as f:
-                        result = parse_html(f.read())
-                    file_stats["html"] += 1
-                    base_metadata["file_type"] = "html"
-                else:
-                    file_stats["skipped"] += 1
-                    logger.debug({"message": f"Skipped unsupported file: {file}", "directory": relative_dir})
-                    continue
-                
-                if result:
-                    # Enhance result metadata with directory information
-                    if hasattr(result, 'metadata'):
-                        result.metadata.update(base_metadata)
-                    else:
-                        result.metadata = base_metadata
-                    parsed_data.append(result)
-                    
-            except Exception as e:
-                logger.error({
-                    "message": f"Failed to process file: {file}", 
-                    "directory": relative_dir,
-                    "error": str(e)
-                })
-                file_stats["skipped"] += 1
-    
-    # Enhanced logging with detailed statistics
-    logger.info({
-        "message": f"Completed NAS directory processing",
-        "total_files_found": file_stats["total_files"],
-        "successfully_processed": len(parsed_data),
-        "pdf_files": file_stats["pdf"],
-        "yaml_files": file_stats["yaml"],
-        "shell_files": file_stats["shell"],
-        "html_files": file_stats["html"],
-        "skipped_files": file_stats["skipped"],
-        "directories_processed": len(file_stats["directories"]),
-        "directory_list": sorted(list(file_stats["directories"]))
-    })
-    
-    print(f"Successfully processed {len(parsed_data)} files from {len(file_stats['directories'])} directories in NAS")
-    return parsed_data
 
-# Initialize LLM with optimized configuration for speed
-try:
+    # Calculate overall quality score
+    score = sum([
+        quality_metrics["has_sources"] * 0.3,
+        (quality_metrics["response_length"] > 100) * 0.2,
+        quality_metrics["includes_examples"] * 0.2,
+        quality_metrics["includes_commands"] * 0.3
+    ])
+
+    quality_metrics["overall_score"] = min(score, 1.0)
+    return quality_metrics
+
+def _load_nlp():
+    import spacy
+
+    return spacy.load("en_core_web_sm")
+
+def _load_greetings():
+    with open(GREETINGS_CONFIG_PATH, 'r') as f:
+        greetings_config = json.load(f)
+    if isinstance(greetings_config, dict) and "greetings" in greetings_config:
+        greetings_config = greetings_config["greetings"]
+    return greetings_config
+
+def _load_llm():
+    """Check that the local Ollama instance is up, then build the global LLM client."""
+    global llm
+    if not validate_offline_mode():
+        raise RuntimeError(f"Local Ollama instance not reachable at {llm_registry.base_urls[0]}")
+
     # Use fast config for better response times
     model_config = FAST_LLM_CONFIGS.get(LLM_MODEL, FAST_LLM_CONFIGS["mistral:instruct"])
     
-    llm = OllamaLLM(
-        model=LLM_MODEL,
-        base_url="http://localhost:11434",
-        **model_config,
+    llm = llm_registry.get_client(
+        LLM_MODEL,
+        "global",
+        model_config,
         system="You are an AI assistant that ONLY uses the provided document context to answer questions. You do NOT have access to the internet, current events, or any external information beyond what is explicitly provided in the context. If the provided documents do not contain sufficient information to answer a question, you must clearly state that you cannot answer based on the available information."
     )
     logger.info({"message": f"Initialized optimized LLM with model: {LLM_MODEL}", "config": model_config})
-except Exception as e:
-    logger.error({"message": f"Failed to initialize global LLM: {LLM_MODEL}", "error": str(e)})
-    llm = None
-
-# Initialize vector store with NAS data
-index_file = Path(FAISS_INDEX_PATH) / "index.faiss"
-if index_file.exists():
-    embedding_model = HuggingFaceEmbeddings(model_name=EMBEDDING_MODEL)
-    vector_store = FAISS.load_local(FAISS_INDEX_PATH, embeddings=embedding_model, allow_dangerous_deserialization=True)
-    logger.info({"message": f"Loaded existing FAISS index from {FAISS_INDEX_PATH}"})
-else:
-    process_nas_files()
-    if parsed_data:
-        vector_store = create_vector_store(parsed_data)
-        # vector_store = create_optimized_vector_store(parsed_data)
-        logger.info({"message": f"Created new FAISS index with {len(parsed_data)} documents"})
+    return llm
+
+def _open_global_store(path):
+    """Open a saved global index, memory-mapped if configured."""
+    return open_vector_store(
+        path, get_embedding_service(EMBEDDING_MODEL), VECTOR_STORE_CONFIGS["mmap_read_only"],
+        VECTOR_STORE_CONFIGS["docstore_mmap_bytes"]
+    )
+
+def _load_vector_store():
+    """Load the current FAISS index snapshot, or build the first one from the NAS."""
+    global vector_store
+    if index_snapshots.exists():
+        version = index_snapshots.current_version()  # None for an index saved before snapshots
+        vector_store = _open_global_store(index_snapshots.current_path())
+        snapshot_watcher.loaded_version = version
+        logger.info({"message": f"Loaded existing FAISS index from {FAISS_INDEX_PATH}", "snapshot": version,
+                     "memory_mapped": VECTOR_STORE_CONFIGS["mmap_read_only"]})
+    elif os.path.exists(NAS_PATH):
+        # Build the index through the ingestion manifest so later runs only embed changed files
+        version = None
+        with index_snapshots.stage() as staging:
+            built, ingestion_report = sync_vector_store(NAS_PATH, str(staging), parse_nas_file)
+            if built:
+                version = index_snapshots.publish(staging, source="api_startup", info={"ingestion": ingestion_report})
+        if version:
+            logger.info({"message": "Created new FAISS index from NAS", "snapshot": version, **ingestion_report})
+            vector_store = _open_global_store(index_snapshots.path(version))
+            snapshot_watcher.loaded_version = version
+        else:
+            print("No initial data to create vector store. Upload files to initialize.")
+            logger.warning({"message": "No initial data to create vector store. Queries require file uploads"})
     else:
         print("No initial data to create vector store. Upload files to initialize.")
         logger.warning({"message": "No initial data to create vector store. Queries require file uploads"})
+    return vector_store
+
+def _swap_vector_store(version: str, path):
+    """Serve a newly published (or rolled back) snapshot; in-flight queries keep their old retriever."""
+    global vector_store
+    vector_store = _open_global_store(path)
+    answer_cache.invalidate()  # Answers were generated from the previous snapshot's chunks
+    if llm is not None and startup.is_ready("qa_chain"):
+        _load_qa_chain()  # Rebinds qa_chain and hybrid_system to the new store
+
+def _load_qa_chain():
+    """Initialize QA chain and hybrid system with offline LLM if vector store exists."""
+    global qa_chain, hybrid_system
+    if not (vector_store and llm):
+        return None
 
-# Initialize QA chain with offline LLM if vector store exists
-if vector_store and llm:
     try:
         # Advanced prompt template with industry best practices
         offline_prompt_template = """# Enterprise Technical Assistant
@@ -342,14 +392,14 @@ You are a specialized AI assistant with deep expertise in OpenShift, Kubernetes,
         qa_chain = RetrievalQA.from_chain_type(
             llm=llm,
             chain_type="stuff",
-            retriever=vector_store.as_retriever(search_kwargs={"k": 3}),  # Reduced from 5 for speed
+            retriever=FusionRetriever(orchestrator=retrieval_orchestrator, backends=_global_backends(), k=3),  # Reduced from 5 for speed
             return_source_documents=True,
             chain_type_kwargs={"prompt": OFFLINE_PROMPT}
         )
         logger.info({"message": "Initialized offline QA chain"})
         
         # Initialize hybrid knowledge system
-        hybrid_system = HybridKnowledgeSystem(vector_store, qa_chain)
+        hybrid_system = HybridKnowledgeSystem(vector_store, qa_chain, llm_model=LLM_MODEL)
         logger.info({"message": "Initialized hybrid knowledge system with web search capability"})
         
     except Exception as e:
@@ -357,14 +407,39 @@ You are a specialized AI assistant with deep expertise in OpenShift, Kubernetes,
         qa_chain = RetrievalQA.from_chain_type(
             llm=llm,
             chain_type="stuff",
-            retriever=vector_store.as_retriever(search_kwargs={"k": 3}),  # Reduced from 5 for speed
+            retriever=FusionRetriever(orchestrator=retrieval_orchestrator, backends=_global_backends(), k=3),  # Reduced from 5 for speed
             return_source_documents=True
         )
+    return qa_chain
+
+# Published index snapshots; workers swap to a new one without restarting (see main.py)
+index_snapshots = SnapshotStore(FAISS_INDEX_PATH)
+snapshot_watcher = SnapshotWatcher(index_snapshots, _swap_vector_store, is_ready=lambda: startup.is_ready("vector_store"))
+
+# Expensive dependencies load behind the running app (see main.py) or on first use
+startup.register("nlp", _load_nlp, required=False)
+startup.register("greetings", _load_greetings, required=False, pool="io")
+startup.register("llm", _load_llm, pool="io", retry=True)
+startup.register("vector_store", _load_vector_store)
+startup.register("qa_chain", _load_qa_chain, depends_on=("vector_store", "llm"))
 
 @router.get("/")
 def read_root():
     return {"message": "Hello from FastAPI"}
 
+@router.get("/healthz")
+async def healthz():
+    """Liveness: the process is up and serving requests, even while components load."""
+    return {"status": "alive", "uptime_seconds": startup.status()["uptime_seconds"]}
+
+@router.get("/readyz")
+async def readyz():
+    """Readiness: 200 once the index, LLM and QA chain are loaded, 503 with per-component state before."""
+    status = startup.status()
+    if not status["ready"]:
+        return JSONResponse(status_code=503, content=status)
+    return status
+
 class QueryInput(BaseModel):
     query: str
     model: str = "mistral:instruct"
@@ -373,6 +448,9 @@ class QueryInput(BaseModel):
     conversation_history: list = []  # Add conversation history  
     use_web_search: bool = True  # Enable/disable web search
     trusted_sites_only: bool = True  # Limit to trusted sites
+    search_profile: str = None  # ANN search profile for the global index: fast, balanced or accurate
+    rerank: str = None  # Cross-encoder profile (fast, balanced, accurate) or "off"; default RERANKER_PROFILE
+    filters: dict = None  # Metadata filters for the global index, e.g. {"file_type": "yaml", "openshift_version": "4.16"}
 
 @router.post("/upload")
 async def upload_file(file: UploadFile = File(...)):
@@ -429,29 +507,131 @@ async def upload_file(file: UploadFile = File(...)):
         logger.error({"message": f"Failed to upload file: {file.filename}", "error": str(e)})
         raise HTTPException(status_code=500, detail="Failed to save uploaded file")
 
+def _build_conversation_context(conversation_history: list) -> str:
+    """Format the last 10 conversation messages for inclusion in a prompt."""
+    if not conversation_history:
+        return ""
+
+    conversation_context = "\n\nConversation History:\n"
+    for msg in conversation_history[-10:]:  # Include last 10 messages for context
+        role = msg.get('role', 'user')
+        content = msg.get('content', '')
+        conversation_context += f"{role.upper()}: {content}\n"
+    conversation_context += "\n"
+    return conversation_context
+
+def _build_hybrid_prompt(context: str, conversation_context: str, query: str) -> str:
+    """Build the prompt used for combined local + web answers."""
+    hybrid_prompt = f"""You are an AI assistant with access to both local documentation and current web information from trusted sources.
+
+INSTRUCTIONS:
+1. Use both local knowledge and web information to provide comprehensive answers
+2. Prioritize information from official documentation and trusted sources
+3. If there are conflicts between sources, explain the differences
+4. Provide the most current and accurate information available
+5. Give clear, professional responses without indicating the source type in your answer
+6. Use the conversation history to provide contextual and relevant responses
+
+FORMATTING REQUIREMENTS:
+• Use numbered lists (1., 2., 3.) for step-by-step procedures
+• Use bullet points (•) for feature lists or requirements
+• Format commands in code blocks with proper syntax highlighting
+• Use **bold** for important concepts or section headers
+• Use clear paragraph breaks between different topics
+• Number complex procedures with consistent formatting
+• Indent sub-steps with proper hierarchy (1.1, 1.2, etc.)
+• Format file paths and configurations clearly
+
+CONTEXT:
+{context}
+
+{conversation_context}
+
+QUESTION: {query}
+
+COMPREHENSIVE ANSWER:"""
+    return hybrid_prompt
+
+def _build_local_context_prompt(context: str, conversation_context: str, query: str) -> str:
+    """Build the prompt used to re-answer local results with conversation history."""
+    enhanced_prompt = f"""You are an AI assistant with access to local documentation. Use the conversation history to provide contextual responses.
+
+INSTRUCTIONS:
+1. Use the provided context and conversation history to answer questions
+2. Reference previous parts of the conversation when relevant
+3. Provide clear, professional responses
+4. If the context doesn't contain sufficient information, clearly state this
+
+FORMATTING REQUIREMENTS:
+• Use numbered lists (1., 2., 3.) for step-by-step procedures
+• Use bullet points (•) for feature lists or requirements
+• Format commands in code blocks with proper syntax highlighting
+• Use **bold** for important concepts or section headers
+
+CONTEXT:
+{context}
+
+{conversation_context}
+
+QUESTION: {query}
+
+CONTEXTUAL ANSWER:"""
+    return enhanced_prompt
+
+def _hybrid_llm_generation(chat_id: str, profile: str, system_prompt: str, prompt_text: str):
+    """Scheduled, pooled generation context for the hybrid query endpoints.
+
+    Returns the unentered context and the context budget chosen for the prompt.
+    """
+    from backend.config.performance_config import FAST_LLM_CONFIGS
+
+    model_config, budget = plan_context_window(
+        prompt_text, FAST_LLM_CONFIGS.get("mistral:instruct", {}), system_prompt
+    )
+    generation = _llm_generation(
+        "mistral:instruct", chat_id, f"{profile}:ctx{budget.num_ctx}", model_config, system_prompt
+    )
+    return generation, budget
+
+def _format_local_sources(sources: list) -> list:
+    """Structure local source metadata for hybrid responses."""
+    local_sources = []
+    for src in sources:
+        source_path = src.get('source', 'Unknown')
+        # Extract just the filename from the full path
+        filename = source_path.split('/')[-1] if '/' in source_path else source_path.split('\\')[-1]
+        local_sources.append({
+            "type": "local",
+            "filename": filename,
+            "resource": filename
+        })
+    return local_sources
+
 @router.post("/hybrid-query")
 async def hybrid_query_llm(input: QueryInput):
     """Handle queries using hybrid local + web knowledge with standard responses."""
     global hybrid_system
-    
+
+    startup.require("qa_chain")
     if not hybrid_system:
         raise HTTPException(status_code=503, detail="Hybrid knowledge system not initialized")
-    
+
     # Use standard responses for both web and local queries
     query = input.query.strip()
     use_web = input.use_web_search
+    chat_id = input.chat_id or "default"
     conversation_history = input.conversation_history or []
-    
+
     logger.info({
         "message": "Received hybrid query",
         "query": query[:100],
         "use_web_search": use_web,
         "conversation_length": len(conversation_history)
     })
-    
+
     # Handle greetings first
     try:
-        greeting_response = is_greeting(query)
+        greeting_response = await _detect_greeting(query)
         if greeting_response:
             logger.info({"message": "Detected greeting in hybrid query", "query": query, "response": greeting_response})
             return {
@@ -464,437 +644,401 @@ async def hybrid_query_llm(input: QueryInput):
     except Exception as greeting_error:
         logger.warning({"message": "Failed to process greeting detection", "error": str(greeting_error)})
         # Continue with normal processing if greeting detection fails
-    
+
     try:
         if use_web:
-            # Get hybrid results (local + web)
-            hybrid_result = hybrid_system.hybrid_search(query)
-            
-            # Build conversation context
-            conversation_context = ""
-            if conversation_history:
-                conversation_context = "\n\nConversation History:\n"
-                for i, msg in enumerate(conversation_history[-10:]):  # Include last 10 messages for context
-                    role = msg.get('role', 'user')
-                    content = msg.get('content', '')
-                    conversation_context += f"{role.upper()}: {content}\n"
-                conversation_context += "\n"
-            
-            # Create enhanced prompt for hybrid context with better formatting
-            hybrid_prompt = f"""You are an AI assistant with access to both local documentation and current web information from trusted sources.
-
-INSTRUCTIONS:
-1. Use both local knowledge and web information to provide comprehensive answers
-2. Prioritize information from official documentation and trusted sources
-3. If there are conflicts between sources, explain the differences
-4. Provide the most current and accurate information available
-5. Give clear, professional responses without indicating the source type in your answer
-6. Use the conversation history to provide contextual and relevant responses
+            # Get hybrid results (local + web); the local QA chain generates an answer too
+            hybrid_result = await hybrid_system.ahybrid_search(query, chat_id)
 
-FORMATTING REQUIREMENTS:
-• Use numbered lists (1., 2., 3.) for step-by-step procedures
-• Use bullet points (•) for feature lists or requirements
-• Format commands in code blocks with proper syntax highlighting
-• Use **bold** for important concepts or section headers
-• Use clear paragraph breaks between different topics
-• Number complex procedures with consistent formatting
-• Indent sub-steps with proper hierarchy (1.1, 1.2, etc.)
-• Format file paths and configurations clearly
-
-CONTEXT:
-{hybrid_result['context']}
-
-{conversation_context}
-
-QUESTION: {query}
-
-COMPREHENSIVE ANSWER:"""
+            # Create enhanced prompt for hybrid context with better formatting
+            conversation_context = _build_conversation_context(conversation_history)
+            hybrid_prompt = _build_hybrid_prompt(hybrid_result['context'], conversation_context, query)
 
             # Use the existing LLM to process hybrid context
-            from backend.config.performance_config import FAST_LLM_CONFIGS
-            
-            model_config = FAST_LLM_CONFIGS.get("mistral:instruct", {})
-            
-            llm_instance = OllamaLLM(
-                model="mistral:instruct",
-                base_url="http://localhost:11434",
-                **model_config,
-                system="You are an expert AI assistant with access to both local documentation and current web information. Always format your responses professionally with numbered procedures (1., 2., 3.), bullet points (•) for lists, code blocks with triple backticks (```), and **bold** for important concepts. Structure your answers clearly with proper paragraph breaks and logical organization."
-            )
-            
-            response = llm_instance.invoke(hybrid_prompt)
-            
+            generation, budget = _hybrid_llm_generation(chat_id, "hybrid", HYBRID_SYSTEM_PROMPT, hybrid_prompt)
+            async with generation as (llm_instance, slot):
+                response = await _invoke_within_deadline(llm_instance, hybrid_prompt, slot)
+
             return {
                 "response": response,
                 "sources": hybrid_result['sources'],
                 "has_local_knowledge": hybrid_result['has_local'],
                 "has_web_knowledge": hybrid_result['has_web'],
                 "search_type": "hybrid",
+                "context_budget": budget.to_dict(),
+                "context_manifest": hybrid_result['context_manifest'],
                 "timestamp": time.time()
             }
         else:
             # Fall back to local-only search with conversation history support
-            local_result = hybrid_system.get_local_results(query)
-            
+            local_result = await hybrid_system.aget_local_results(query, chat_id)
+
             # If we have conversation history, enhance the local result with context
             if conversation_history and local_result['answer']:
-                # Build conversation context
-                conversation_context = "\n\nConversation History:\n"
-                for i, msg in enumerate(conversation_history[-10:]):
-                    role = msg.get('role', 'user')
-                    content = msg.get('content', '')
-                    conversation_context += f"{role.upper()}: {content}\n"
-                conversation_context += "\n"
-                
                 # Create a context-aware prompt for local results
-                enhanced_prompt = f"""You are an AI assistant with access to local documentation. Use the conversation history to provide contextual responses.
-
-INSTRUCTIONS:
-1. Use the provided context and conversation history to answer questions
-2. Reference previous parts of the conversation when relevant
-3. Provide clear, professional responses
-4. If the context doesn't contain sufficient information, clearly state this
-
-FORMATTING REQUIREMENTS:
-• Use numbered lists (1., 2., 3.) for step-by-step procedures
-• Use bullet points (•) for feature lists or requirements
-• Format commands in code blocks with proper syntax highlighting
-• Use **bold** for important concepts or section headers
-
-CONTEXT:
-{local_result['answer']}
-
-{conversation_context}
-
-QUESTION: {query}
-
-CONTEXTUAL ANSWER:"""
+                conversation_context = _build_conversation_context(conversation_history)
+                enhanced_prompt = _build_local_context_prompt(local_result['answer'], conversation_context, query)
 
                 # Use the existing LLM to process with conversation context
-                from backend.config.performance_config import FAST_LLM_CONFIGS
-                model_config = FAST_LLM_CONFIGS.get("mistral:instruct", {})
-                
-                llm_instance = OllamaLLM(
-                    model="mistral:instruct",
-                    base_url="http://localhost:11434",
-                    **model_config,
-                    system="You are an expert AI assistant. Always format your responses professionally and use conversation history to provide relevant, contextual answers."
+                generation, budget = _hybrid_llm_generation(
+                    chat_id, "hybrid_local", LOCAL_CONTEXT_SYSTEM_PROMPT, enhanced_prompt
                 )
-                
-                enhanced_response = llm_instance.invoke(enhanced_prompt)
+                async with generation as (llm_instance, slot):
+                    enhanced_response = await _invoke_within_deadline(llm_instance, enhanced_prompt, slot)
                 local_result['answer'] = enhanced_response
-            
-            # Structure local sources properly
-            local_sources = []
-            for src in local_result['sources']:
-                source_path = src.get('source', 'Unknown')
-                # Extract just the filename from the full path
-                filename = source_path.split('/')[-1] if '/' in source_path else source_path.split('\\')[-1]
-                local_sources.append({
-                    "type": "local",
-                    "filename": filename,
-                    "resource": filename
-                })
-            
+            else:
+                budget = None
+
             return {
                 "response": local_result['answer'],
-                "sources": local_sources,
+                "sources": _format_local_sources(local_result['sources']),
                 "has_local_knowledge": bool(local_result['answer']),
                 "has_web_knowledge": False,
-                "search_type": "local_only"
+                "search_type": "local_only",
+                "context_budget": budget.to_dict() if budget else None
             }
-            
+
+    except (HTTPException, SchedulerRejected):
+        raise
     except Exception as e:
         logger.error({"message": "Hybrid query failed", "error": str(e)})
         raise HTTPException(status_code=500, detail=f"Hybrid query processing failed: {str(e)}")
 
-@router.post("/query")
-async def query_llm(input: QueryInput):
-    """Handle configuration queries with enhanced robustness and chat session isolation."""
-    global vector_store, qa_chain, parsed_data, chat_sessions, session_vector_stores
+@router.post("/hybrid-query/stream")
+async def hybrid_query_llm_stream(input: QueryInput, request: Request):
+    """Stream hybrid local + web answers as server-sent events."""
+    startup.require("qa_chain")
+    if not hybrid_system:
+        raise HTTPException(status_code=503, detail="Hybrid knowledge system not initialized")
 
     query = input.query.strip()
-    model = input.model
-    filename = input.filename
-    chat_id = input.chat_id or "default"  # Use default if no chat_id provided
+    use_web = input.use_web_search
+    chat_id = input.chat_id or "default"
     conversation_history = input.conversation_history or []
-    
+
     logger.info({
-        "message": "Received query", 
-        "query": query, 
-        "model": model, 
-        "filename": filename,
-        "chat_id": chat_id,
+        "message": "Received streaming hybrid query",
+        "query": query[:100],
+        "use_web_search": use_web,
         "conversation_length": len(conversation_history)
     })
-    
-    # Initialize chat session if it doesn't exist
-    if chat_id not in chat_sessions:
-        chat_sessions[chat_id] = {
-            "files": [],  # Files uploaded in this chat session
-            "context": [],  # Additional context for this session
-            "created_at": json.dumps({"timestamp": "now"}),  # For cleanup purposes
-        }
 
-    # Handle greetings first
-    greeting_response = is_greeting(query)
+    greeting_response = await _detect_greeting(query)
     if greeting_response:
-        logger.info({"message": "Detected greeting", "query": query, "response": greeting_response})
-        # Clear temp files even for greetings
-        try:
-            await _clear_temp_files()
-        except Exception as e:
-            logger.warning({"message": "Failed to clear temp files for greeting", "error": str(e)})
-        return {
-            "answer": greeting_response,
-            "sources": []
+        return _sse_response(_stream_static_answer(greeting_response, [], {"search_type": "greeting"}))
+
+    try:
+        if use_web:
+            hybrid_result = await hybrid_system.ahybrid_search(query, chat_id)
+            conversation_context = _build_conversation_context(conversation_history)
+            prompt_text = _build_hybrid_prompt(hybrid_result['context'], conversation_context, query)
+            generation, budget = _hybrid_llm_generation(chat_id, "hybrid", HYBRID_SYSTEM_PROMPT, prompt_text)
+            done_payload = {
+                "has_local_knowledge": hybrid_result['has_local'],
+                "has_web_knowledge": hybrid_result['has_web'],
+                "search_type": "hybrid",
+                "context_budget": budget.to_dict(),
+                "context_manifest": hybrid_result['context_manifest']
+            }
+            return _sse_response(_stream_llm_answer(
+                request, generation, prompt_text, query, hybrid_result['sources'], done_payload
+            ))
+
+        local_result = await hybrid_system.aget_local_results(query, chat_id)
+        local_sources = _format_local_sources(local_result['sources'])
+        done_payload = {
+            "has_local_knowledge": bool(local_result['answer']),
+            "has_web_knowledge": False,
+            "search_type": "local_only"
         }
+        if conversation_history and local_result['answer']:
+            conversation_context = _build_conversation_context(conversation_history)
+            prompt_text = _build_local_context_prompt(local_result['answer'], conversation_context, query)
+            generation, budget = _hybrid_llm_generation(
+                chat_id, "hybrid_local", LOCAL_CONTEXT_SYSTEM_PROMPT, prompt_text
+            )
+            done_payload["context_budget"] = budget.to_dict()
+            return _sse_response(_stream_llm_answer(
+                request, generation, prompt_text, query, local_sources, done_payload
+            ))
+
+        # The local QA chain already produced the full answer
+        return _sse_response(_stream_static_answer(local_result['answer'], local_sources, done_payload))
+
+    except (HTTPException, SchedulerRejected):
+        raise
+    except Exception as e:
+        logger.error({"message": "Streaming hybrid query failed", "error": str(e)})
+        raise HTTPException(status_code=500, detail=f"Hybrid query processing failed: {str(e)}")
+
+async def _ensure_chat_session(chat_id: str):
+    """Initialize chat session if it doesn't exist and mark it as recently used."""
+    # A round trip when sessions live in Redis
+    await run_io_bound(session_manager.ensure, chat_id)
 
-    # Validate model
-    SUPPORTED_MODELS = ["mistral:instruct", "llama3.1:8b"]
+def _validate_model(model: str):
+    """Reject models that are not served by the local Ollama instance."""
     if model not in SUPPORTED_MODELS:
         logger.error({"message": f"Unsupported model selected: {model}"})
         raise HTTPException(
-            status_code=400, 
+            status_code=400,
             detail=f"Invalid model: {model}. Supported models: {', '.join(SUPPORTED_MODELS)}"
         )
 
+def _get_query_llm_options(model: str, query: str):
+    """Return generation options for a /query request, tuned to the query type."""
     try:
-        # Query Classification and Optimization Functions
-        from enum import Enum
-
-        class QueryType(Enum):
-            TECHNICAL_CONFIG = "technical_config"
-            TROUBLESHOOTING = "troubleshooting"
-            CODE_ANALYSIS = "code_analysis"
-            GENERAL_INFO = "general_info"
-            COMPARISON = "comparison"
-            STEP_BY_STEP = "step_by_step"
-
-        class QueryClassifier:
-            """Simple query classifier for optimized processing."""
-            
-            @staticmethod
-            def classify_query(query: str) -> QueryType:
-                """Classify query type based on keywords and patterns."""
-                query_lower = query.lower()
-                
-                # Technical configuration keywords
-                if any(word in query_lower for word in ["configure", "config", "setup", "install", "deploy", "create"]):
-                    return QueryType.TECHNICAL_CONFIG
-                
-                # Troubleshooting keywords
-                if any(word in query_lower for word in ["error", "problem", "issue", "fix", "debug", "troubleshoot", "fails", "not working"]):
-                    return QueryType.TROUBLESHOOTING
-                
-                # Code analysis keywords
-                if any(word in query_lower for word in ["code", "script", "command", "analyze", "explain", "review"]):
-                    return QueryType.CODE_ANALYSIS
-                
-                # Comparison keywords
-                if any(word in query_lower for word in ["compare", "difference", "vs", "versus", "better", "prefer"]):
-                    return QueryType.COMPARISON
-                
-                # Step-by-step keywords
-                if any(word in query_lower for word in ["how to", "step by step", "guide", "tutorial", "process"]):
-                    return QueryType.STEP_BY_STEP
-                
-                return QueryType.GENERAL_INFO
-
-        def enhance_context_with_metadata(documents, query_type):
-            """Enhance document context with metadata based on query type."""
-            if not documents:
-                return ""
-            
-            enhanced_context = []
-            for doc in documents:
-                # Add document source information
-                source = getattr(doc, 'metadata', {}).get('source', 'Unknown')
-                page = getattr(doc, 'metadata', {}).get('page', 'N/A')
-                
-                context_block = f"[Source: {source}, Page: {page}]\n{doc.page_content}\n"
-                enhanced_context.append(context_block)
-            
-            return "\n---\n".join(enhanced_context)
-
-        def optimize_response_quality(query, source_documents, response):
-            """Simple response quality optimization."""
-            quality_metrics = {
-                "has_sources": len(source_documents) > 0,
-                "response_length": len(response),
-                "includes_examples": "example" in response.lower() or "for instance" in response.lower(),
-                "includes_commands": any(char in response for char in ["$", "#", "oc ", "kubectl"]),
-                "confidence_score": 0.8  # Default confidence
-            }
-            
-            # Calculate overall quality score
-            score = sum([
-                quality_metrics["has_sources"] * 0.3,
-                (quality_metrics["response_length"] > 100) * 0.2,
-                quality_metrics["includes_examples"] * 0.2,
-                quality_metrics["includes_commands"] * 0.3
-            ])
-            
-            quality_metrics["overall_score"] = min(score, 1.0)
-            return quality_metrics
-        
         # Classify query type for optimized parameters
         query_type = QueryClassifier.classify_query(query).value
-        
+
         # Get fast configuration for speed optimization
         try:
             base_config = FAST_LLM_CONFIGS.get(model, FAST_LLM_CONFIGS["mistral:instruct"])
         except (NameError, KeyError):
             # Fallback to regular config if fast config not available
             base_config = LLM_CONFIGS.get(model, LLM_CONFIGS["mistral:instruct"])
-        
-        # Maximum response settings - allow high token counts for detailed responses
+
+        # Maximum response settings - allow high token counts for detailed responses.
+        # num_ctx is only the upper bound here; _plan_query_options sizes it per prompt.
         query_adjustments = {
-            "technical_config": {"num_predict": 2048, "num_ctx": 32768},
-            "troubleshooting": {"num_predict": 2048, "num_ctx": 32768}, 
-            "code_analysis": {"num_predict": 1536, "num_ctx": 32768},
-            "comparison": {"num_predict": 2048, "num_ctx": 32768},
-            "step_by_step": {"num_predict": 2048, "num_ctx": 32768},  # Maximum tokens for detailed steps
-            "general_info": {"num_predict": 2048, "num_ctx": 32768}
+            "technical_config": {"num_predict": 2048},
+            "troubleshooting": {"num_predict": 2048},
+            "code_analysis": {"num_predict": 1536},
+            "comparison": {"num_predict": 2048},
+            "step_by_step": {"num_predict": 2048},  # Maximum tokens for detailed steps
+            "general_info": {"num_predict": 2048}
         }
-        
+
         # Apply query-specific adjustments
         optimized_config = base_config.copy()
         if query_type in query_adjustments:
             optimized_config.update(query_adjustments[query_type])
-        
-        # Initialize LLM with optimized configuration and enhanced formatting system prompt
-        llm_instance = OllamaLLM(
-            model=model,
-            base_url="http://localhost:11434",
-            **optimized_config,
-            system="You are an AI assistant that ONLY uses the provided document context to answer questions. You do NOT have access to the internet, current events, or any external information beyond what is explicitly provided in the context. If the provided documents do not contain sufficient information, clearly state you cannot answer based on available information. IMPORTANT: Always format your responses with proper structure - use numbered lists (1., 2., 3.) for procedures, bullet points (•) for lists, code blocks with triple backticks (```), and **bold** for important concepts. Make your responses well-organized and easy to read."
-        )
-        logger.info({"message": f"Initialized optimized LLM", "model": model, "query_type": query_type, "config": optimized_config})
+
+        logger.info({"message": f"Using query LLM options", "model": model, "query_type": query_type, "config": optimized_config})
+        return optimized_config, query_type
     except Exception as e:
         logger.error({"message": f"Failed to initialize model: {model}", "error": str(e)})
         raise HTTPException(status_code=500, detail=f"Failed to initialize model: {model}")
 
-    # Process uploaded file if provided and add to session
-    temp_doc = None
-    if filename:
-        temp_doc = await _process_uploaded_file(filename)
-        if temp_doc:
-            # Add file to this chat session
-            chat_sessions[chat_id]["files"].append(temp_doc)
-            logger.info({
-                "message": "Successfully processed uploaded file for chat session", 
-                "filename": filename,
-                "chat_id": chat_id,
-                "content_length": len(temp_doc["content"]), 
-                "metadata": temp_doc["metadata"],
-                "session_files_count": len(chat_sessions[chat_id]["files"])
-            })
+def _plan_query_options(model: str, query_type: str, prompt_text: str, llm_options: dict):
+    """Size num_ctx for the assembled /query prompt; returns (options, profile, budget)."""
+    planned_options, budget = plan_context_window(prompt_text, llm_options, QUERY_SYSTEM_PROMPT)
+    logger.info({
+        "message": "Planned context window",
+        "model": model,
+        "query_type": query_type,
+        **budget.to_dict()
+    })
+    return planned_options, f"query:{query_type}:ctx{budget.num_ctx}", budget
 
-    # Create session-specific retriever
+def _pack_query_context(PROMPT, question: str, search_text: str, relevant_docs, llm_options: dict):
+    """Pack retrieved documents into the tokens the prompt frame and output leave free.
+
+    The budget is measured with the full LLM ``question``; passages are
+    scored against ``search_text``, the question without added instructions.
+    """
+    from backend.config.performance_config import CONTEXT_PACKER_CONFIGS
+
+    token_budget = available_context_tokens(
+        llm_options, PROMPT.format(context="", question=question), QUERY_SYSTEM_PROMPT,
+        ceiling=CONTEXT_PACKER_CONFIGS["max_context_tokens"]
+    )
+    return context_packer.pack(chunks_from_documents(relevant_docs), search_text, token_budget)
+
+async def _attach_uploaded_file(chat_id: str, filename: str):
+    """Process an uploaded file and add it to the chat session."""
+    if not filename:
+        return None
+
+    temp_doc = await _process_uploaded_file(filename)
+    if temp_doc:
+        # Add file to this chat session
+        # Takes the session lock, which the sweeper holds while spilling indexes to disk
+        session_files_count = await run_cpu_bound(session_manager.add_file, chat_id, temp_doc)
+        answer_cache.invalidate(f"chat:{chat_id}:")
+        logger.info({
+            "message": "Successfully processed uploaded file for chat session",
+            "filename": filename,
+            "chat_id": chat_id,
+            "content_length": len(temp_doc["content"]),
+            "metadata": temp_doc["metadata"],
+            "session_files_count": session_files_count
+        })
+    return temp_doc
+
+def _global_backends(search_kwargs: dict = None, selection=None) -> list:
+    """Retrieval backends over the global store (dense and lexical) and live oc output.
+
+    A metadata ``selection`` restricts both global backends to its documents.
+    """
+    backends = []
+    if vector_store is not None:
+        search_kwargs = dict(search_kwargs or {})
+        if selection is not None:
+            search_kwargs["selection"] = selection
+        backends.append(vector_backend("dense", vector_store, **search_kwargs))
+        if getattr(vector_store, "lexical_index", None) is not None:
+            backends.append(lexical_backend("lexical", vector_store.lexical_index, vector_store.docstore,
+                                            doc_filter=selection))
+    backends.append(live_backend("live", live_index))
+    return backends
+
+def _metadata_selection(prepared: PreparedQuery, filters: dict = None):
+    """Selection of the global index for a request's ``filters`` and the OpenShift version its question names.
+
+    A detected version also admits documents without a version, and is
+    dropped when no document carries it. Returns None when nothing filters
+    the search.
+    """
     try:
-        # Initialize oc_command_results early
-        oc_command_results = {}
-        
-        # Validate offline query validation
-        validated_query = enforce_offline_query_validation(query)
-        
-        # Get documents for this specific chat session
-        session_docs = chat_sessions[chat_id]["files"]
-        
-        if session_docs:
-            # Create or use cached session-specific vector store
-            if chat_id not in session_vector_stores:
-                embedding_model = HuggingFaceEmbeddings(model_name=EMBEDDING_MODEL)
-                # Only use documents from this specific chat session
-                session_vector_stores[chat_id] = create_vector_store(session_docs)
-                logger.info({"message": f"Created session-specific vector store", "chat_id": chat_id, "documents": len(session_docs)})
-            elif temp_doc:
-                # Update existing session vector store with new document
-                embedding_model = HuggingFaceEmbeddings(model_name=EMBEDDING_MODEL)
-                session_vector_stores[chat_id] = create_vector_store(session_docs)
-                logger.info({"message": f"Updated session-specific vector store", "chat_id": chat_id, "documents": len(session_docs)})
-            
-            retriever = session_vector_stores[chat_id].as_retriever(search_kwargs={"k": 5})
-            logger.info({"message": f"Using session-specific vector store", "chat_id": chat_id, "documents": len(session_docs)})
-        elif vector_store:
-            # Fallback to global vector store if no session documents
-            retriever = vector_store.as_retriever(search_kwargs={"k": 5})
-            logger.info({"message": "Using global vector store as fallback", "chat_id": chat_id})
-        else:
-            # No documents available
-            logger.warning({"message": "No documents available for query", "query": query, "chat_id": chat_id})
-            raise HTTPException(
-                status_code=400,
-                detail="No documents available for this chat session. Please upload files related to your query."
-            )
+        filters = normalize_filters(filters)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    metadata_index = getattr(vector_store, "metadata_index", None)
+    if metadata_index is None:
+        if filters:
+            logger.warning({"message": "Metadata filters ignored, the index has no metadata index; rerun init_faiss.py",
+                            "filters": filters})
+        return None
+    version = prepared.filters.get("openshift_version")
+    if version and "openshift_version" not in filters and metadata_index.count("openshift_version", version):
+        filters["openshift_version"] = [version, None]
+    return metadata_index.select(filters)
+
+async def _retrieval_backends(chat_id: str, search_profile: str = None, selection=None) -> list:
+    """Retrieval backends for a chat: its uploads, the global dense and lexical indexes and live oc output.
+
+    They are searched concurrently and fused by ``retrieval_orchestrator``.
+    ``search_profile`` tunes the global store's ANN search (nprobe/efSearch);
+    session indexes are small flat indexes and ignore it. A metadata
+    ``selection`` narrows only the global indexes; uploads and live oc
+    output are always searched in full.
+    """
+    search_kwargs = {}
+    if search_profile:
+        if search_profile not in ANN_INDEX_CONFIGS["search_profiles"]:
+            raise HTTPException(status_code=400, detail=f"Unknown search profile: {search_profile}. "
+                                f"Available: {', '.join(ANN_INDEX_CONFIGS['search_profiles'])}")
+        search_kwargs["search_params"] = search_profile
+    backends = _global_backends(search_kwargs, selection)
+
+    # Index only files this worker has not embedded yet; the global index is never touched
+    session_retriever = await run_cpu_bound(session_manager.session_retriever, chat_id)
+    if session_retriever is not None:
+        backends.insert(0, vector_backend("session", session_retriever.vectorstore))
+    elif vector_store is None:
+        # No documents available
+        logger.warning({"message": "No documents available for query", "chat_id": chat_id})
+        raise HTTPException(
+            status_code=400,
+            detail="No documents available for this chat session. Please upload files related to your query."
+        )
+    return backends
 
-        # Get relevant documents for enhanced context creation
-        relevant_docs = retriever.invoke(validated_query)
-        
-        # Create enhanced context that includes both documents and live OpenShift data
-        try:
-            enhanced_context = enhance_context_with_metadata(relevant_docs, query_type)
-            
-            # Add OpenShift command results to context if available
-            if oc_command_results:
-                oc_context_parts = []
-                for cmd_key, oc_result in oc_command_results.items():
-                    if oc_result and "content" in oc_result:
-                        cmd_info = oc_result.get("metadata", {})
-                        command_used = cmd_info.get("command", cmd_key)
-                        oc_context_parts.append(f"[Live OpenShift Data - {command_used}]\n{oc_result['content']}")
-                
-                if oc_context_parts:
-                    live_oc_context = "\n\n---LIVE OPENSHIFT DATA---\n" + "\n\n".join(oc_context_parts)
-                    enhanced_context = f"{enhanced_context}\n\n{live_oc_context}"
-                    
-                    logger.info({
-                        "message": "Enhanced context with live OpenShift data",
-                        "oc_commands_included": len(oc_command_results),
-                        "context_length": len(enhanced_context)
-                    })
-                    
-        except Exception as context_error:
-            logger.warning({"message": "Failed to enhance context, using basic context", "error": str(context_error)})
-            enhanced_context = "\n\n".join([doc.page_content for doc in relevant_docs])
+def _get_reranker(profile: str = None):
+    """The reranker for a request's ``rerank`` profile (or the configured default); None when off."""
+    profile = profile or RERANKER_CONFIGS["default_profile"]
+    if not profile or profile == "off":
+        return None
+    try:
+        return get_reranker(profile)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+async def _retrieve(prepared: PreparedQuery, backends: list, reranker=None, selection=None):
+    """Search the backends concurrently; returns the FusedResult with per-backend latency.
+
+    Dense backends share the prepared query vector instead of each
+    embedding the question.
+
+    With a reranker, up to its candidate cap of fused documents are
+    rescored and the top ``k`` kept; over its latency budget the fused
+    order stands.
+    """
+    k = retrieval_orchestrator.config["k"]
+    retrieval = await retrieval_orchestrator.retrieve(
+        prepared.text, backends, max(k, reranker.max_candidates) if reranker else k, query_vector=prepared.vector
+    )
+    if reranker is not None:
+        reranked = await reranker.arerank(prepared.text, retrieval.documents)
+        retrieval.documents = reranked.documents[:k]
+        retrieval.rerank = reranked.report()
+    if selection is not None:
+        retrieval.filters = selection.report()
+    logger.info({"message": "Retrieved documents", **retrieval.report()})
+    return retrieval
+
+def _answer_cache_key(prepared: PreparedQuery, model: str, chat_id: str, conversation_history: list,
+                      oc_command_results: dict, retrieval) -> dict:
+    """What an answer for this request is cached under, or None when it must not be cached.
+
+    Answers shaped by live oc output or conversation history are never
+    cached. The scope names the served snapshot, plus the chat when its
+    uploads were searched, so a new snapshot or upload misses.
+    """
+    if not answer_cache.enabled or not retrieval.documents:
+        return None
+    live_hits = retrieval.backends.get("live", {}).get("hits", 0)
+    if oc_command_results or live_hits:
+        answer_cache.skip("live_data")
+        return None
+    if conversation_history and answer_cache.config["skip_with_history"]:
+        answer_cache.skip("history")
+        return None
 
-        # Create QA chain with optimized context-aware prompt
-        
-        # Get optimized prompt based on query classification
-        try:
-            # Import advanced prompt templates
-            from backend.config.advanced_prompts import get_optimized_prompt, detect_query_type
-            
-            # Detect query type and get appropriate prompt
-            query_type_detected = detect_query_type(query)
-            optimized_prompt_text, detected_type = get_optimized_prompt(query, enhanced_context, conversation_context)
-            
-            logger.info({
-                "message": "Using advanced prompt template",
-                "query_type": detected_type,
-                "prompt_optimization": "enabled"
-            })
-            
-            PROMPT = PromptTemplate(
-                template=optimized_prompt_text,
-                input_variables=["context", "question"]
-            )
-            
-        except ImportError as import_error:
-            logger.warning({"message": "Advanced prompts not available, using enhanced fallback", "error": str(import_error)})
-            # Use enhanced fallback prompt template
-            conversation_context = ""
-            if conversation_history:
-                conversation_context = "\n\nConversation History:\n"
-                for i, msg in enumerate(conversation_history[-10:]):  # Include last 10 messages for context
-                    role = msg.get('role', 'user')
-                    content = msg.get('content', '')
-                    conversation_context += f"{role.upper()}: {content}\n"
-                conversation_context += "\n"
-            
-            # Enhanced fallback prompt with better structure
-            prompt_text = f"""# Technical Documentation Assistant
+    version = snapshot_watcher.loaded_version
+    scope = f"chat:{chat_id}:@{version}" if "session" in retrieval.backends else f"global@{version}"
+    return {"query": prepared.normalized, "model": model, "scope": scope,
+            "chunk_ids": [chunk_id(doc) for doc in retrieval.documents], "vector": prepared.vector}
+
+def _cached_answer(cache_key: dict):
+    """A cached response for the request, or None."""
+    if cache_key is None:
+        return None
+    response, kind = answer_cache.lookup(**cache_key)
+    if response is not None:
+        logger.info({"message": "Answer cache hit", "kind": kind, "query": cache_key["query"], **response["cache"]})
+    return response
+
+def _cache_answer(cache_key: dict, response: dict, generation_seconds: float) -> dict:
+    """Store a generated response under the request's cache key and return it unchanged."""
+    if cache_key is not None and response.get("answer"):
+        answer_cache.store(response=response, generation_seconds=generation_seconds, **cache_key)
+    return response
+
+def _build_query_prompt(query: str, enhanced_context: str, conversation_history: list):
+    """Select the prompt template for a /query request.
+
+    Returns the PromptTemplate and the detected advanced query type, or None
+    when one of the fallback templates is used.
+    """
+    conversation_context = _build_conversation_context(conversation_history)
+
+    # Get optimized prompt based on query classification
+    try:
+        # Import advanced prompt templates
+        from backend.config.advanced_prompts import get_optimized_prompt
+
+        # Detect query type and get appropriate prompt
+        optimized_prompt_text, detected_type = get_optimized_prompt(query, enhanced_context, conversation_context)
+
+        logger.info({
+            "message": "Using advanced prompt template",
+            "query_type": detected_type,
+            "prompt_optimization": "enabled"
+        })
+
+        PROMPT = PromptTemplate(
+            template=optimized_prompt_text,
+            input_variables=["context", "question"]
+        )
+        return PROMPT, detected_type
+
+    except ImportError as import_error:
+        logger.warning({"message": "Advanced prompts not available, using enhanced fallback", "error": str(import_error)})
+
+        # Enhanced fallback prompt with better structure
+        prompt_text = f"""# Technical Documentation Assistant
 
 ## Your Role
 You are a specialized technical consultant with expertise in OpenShift, Kubernetes, and Red Hat Enterprise Linux.
@@ -931,24 +1075,17 @@ oc get pods  # Lists all pods in current namespace
 
 ## Expert Response
 [Provide comprehensive guidance following the format requirements above]"""
-            
-            PROMPT = PromptTemplate(
-                template=prompt_text,
-                input_variables=["context", "question"]
-            )
-        except Exception as prompt_error:
-            logger.warning({"message": "Failed to get optimized prompt, using fallback", "error": str(prompt_error)})
-            # Fallback to enhanced basic prompt
-            conversation_context = ""
-            if conversation_history:
-                conversation_context = "\n\nConversation History:\n"
-                for i, msg in enumerate(conversation_history[-10:]):  # Include last 10 messages for context
-                    role = msg.get('role', 'user')
-                    content = msg.get('content', '')
-                    conversation_context += f"{role.upper()}: {content}\n"
-                conversation_context += "\n"
-            
-            prompt_template = f"""# Advanced Technical Assistant - Enterprise Systems Expert
+
+        PROMPT = PromptTemplate(
+            template=prompt_text,
+            input_variables=["context", "question"]
+        )
+        return PROMPT, None
+    except Exception as prompt_error:
+        logger.warning({"message": "Failed to get optimized prompt, using fallback", "error": str(prompt_error)})
+
+        # Fallback to enhanced basic prompt
+        prompt_template = f"""# Advanced Technical Assistant - Enterprise Systems Expert
 
 ## Identity & Expertise
 You are a senior technical consultant with 15+ years of experience in enterprise container platforms, specifically OpenShift, Kubernetes, and Red Hat Enterprise Linux. You provide authoritative guidance to system administrators and DevOps engineers.
@@ -1060,52 +1197,32 @@ oc get pods -n namespace --selector=app=myapp  # Lists pods matching label selec
 ## Expert Technical Response
 [Deliver comprehensive guidance following the template above, adapting sections based on question complexity and type]"""
 
-            PROMPT = PromptTemplate(
-                template=prompt_template,
-                input_variables=["context", "question"]
-            )
-            
-            qa_chain = RetrievalQA.from_chain_type(
-                llm=llm_instance,
-                chain_type="stuff",
-                retriever=retriever,
-                return_source_documents=True,
-                chain_type_kwargs={"prompt": PROMPT}
-            )
+        PROMPT = PromptTemplate(
+            template=prompt_template,
+            input_variables=["context", "question"]
+        )
+        return PROMPT, None
 
-    except Exception as e:
-        logger.error({"message": "Failed to create QA chain", "error": str(e)})
-        raise HTTPException(status_code=500, detail="Failed to initialize query system")
+async def _run_live_oc_commands(query: str) -> dict:
+    """Run oc commands relevant to the query and index their output as live cluster data."""
+    oc_command_results = {}
 
     # Enhanced OpenShift resource queries with dynamic command detection
-    if oc_handler.check_oc_availability():
+    if await oc_handler.acheck_oc_availability():
         try:
-            oc_command_results = detect_and_run_oc_commands(query)
+            oc_command_results = await adetect_and_run_oc_commands(query)
             if oc_command_results:
                 logger.info({
-                    "message": f"Executed {len(oc_command_results)} oc commands for query", 
+                    "message": f"Executed {len(oc_command_results)} oc commands for query",
                     "commands": list(oc_command_results.keys()),
                     "query": query
                 })
-                
-                # Add oc command results to the vector store for immediate use
+
+                # Replace each command's previous output in the live index for immediate use
                 for cmd_key, oc_result in oc_command_results.items():
                     if oc_result and "content" in oc_result:
-                        # Create document from oc command result
-                        oc_doc = Document(
-                            page_content=oc_result["content"], 
-                            metadata=oc_result.get("metadata", {})
-                        )
-                        
-                        # Add to parsed data and update vector store
-                        parsed_data.append(oc_result)
-                        if vector_store:
-                            try:
-                                vector_store.add_documents([oc_doc])
-                                vector_store.save_local(FAISS_INDEX_PATH)
-                            except Exception as vs_error:
-                                logger.warning(f"Failed to add oc result to vector store: {vs_error}")
-                        
+                        await run_cpu_bound(live_index.put, cmd_key, oc_result)
+
         except Exception as oc_error:
             logger.warning({"message": "Failed to execute oc commands", "error": str(oc_error)})
     else:
@@ -1114,61 +1231,181 @@ oc get pods -n namespace --selector=app=myapp  # Lists pods matching label selec
     # Legacy oc explain handling for backward compatibility
     oc_resource_match = re.search(r"(pod|deployment|service)\.spec", query, re.IGNORECASE)
     if oc_resource_match and not oc_command_results:  # Only run if enhanced handler didn't already handle it
+        resource = oc_resource_match.group(0).lower()
         try:
-            resource = oc_resource_match.group(0).lower()
-            oc_result = run_oc_explain(resource)
-            if oc_result and vector_store:
-                parsed_data.append(oc_result)
-                vector_store.add_documents([Document(page_content=oc_result["content"], metadata=oc_result["metadata"])])
-                vector_store.save_local(FAISS_INDEX_PATH)
+            oc_result = await run_io_bound(run_oc_explain, resource)
+            if oc_result:
+                await run_cpu_bound(live_index.put, f"oc explain {resource}", oc_result)
                 logger.info({"message": f"Added legacy oc explain data for resource: {resource}"})
         except Exception as e:
             logger.warning({"message": f"Failed to process legacy oc explain for {resource}", "error": str(e)})
 
+    return oc_command_results
+
+@asynccontextmanager
+async def _llm_generation(model: str, chat_id: str, profile: str, options: dict, system: str):
+    """Wait for a scheduler slot, then lease a pooled client for one generation.
+
+    Yields ``(llm_instance, slot)``; raises SchedulerRejected when not admitted.
+    """
+    async with generation_scheduler.slot(model, chat_id) as slot:
+        async with llm_registry.lease(model, profile, options, system) as llm_instance:
+            yield llm_instance, slot
+
+async def _invoke_within_deadline(llm_instance, prompt_text: str, slot) -> str:
+    """Run a full generation, giving up when the request deadline passes."""
+    try:
+        return await asyncio.wait_for(llm_instance.ainvoke(prompt_text), timeout=slot.remaining())
+    except asyncio.TimeoutError:
+        logger.warning({"message": "Generation exceeded request deadline", "model": slot.model, "chat_id": slot.chat_id})
+        raise HTTPException(status_code=504, detail="Generation exceeded the request deadline")
+
+def _format_sources(source_documents) -> list:
+    """Return source metadata with the source reduced to its filename."""
+    return [
+        {
+            **doc.metadata,
+            "source": doc.metadata.get("source", "Unknown").split('/')[-1] if '/' in doc.metadata.get("source", "") else doc.metadata.get("source", "Unknown").split('\\')[-1]
+        } for doc in source_documents
+    ]
+
+def _record_query_metrics(query, answer, source_documents, processing_time, enhanced_context,
+                          chat_id, model, query_type, detected_type):
+    """Record prompt performance metrics for a processed query."""
+    try:
+        from backend.config.prompt_optimization import record_prompt_metrics
+
+        record_prompt_metrics(
+            prompt_type="advanced" if detected_type else "fallback",
+            query_type=detected_type or query_type,
+            query=query,
+            response=answer,
+            sources=[doc.metadata for doc in source_documents],
+            processing_time=processing_time,
+            context_length=len(enhanced_context),
+            session_id=chat_id,
+            model_used=model
+        )
+
+    except Exception as metrics_error:
+        logger.warning({"message": "Failed to record prompt metrics", "error": str(metrics_error)})
+
+NO_RELEVANT_DOCUMENTS_ANSWER = "Sorry, I couldn't find relevant information in the available documents to answer your question. Please note that I can only access information from uploaded documents and cannot search the internet."
+
+@router.post("/query")
+async def query_llm(input: QueryInput):
+    """Handle configuration queries with enhanced robustness and chat session isolation."""
+    query = input.query.strip()
+    model = input.model
+    filename = input.filename
+    chat_id = input.chat_id or "default"  # Use default if no chat_id provided
+    conversation_history = input.conversation_history or []
+
+    logger.info({
+        "message": "Received query",
+        "query": query,
+        "model": model,
+        "filename": filename,
+        "chat_id": chat_id,
+        "conversation_length": len(conversation_history)
+    })
+
+    await _ensure_chat_session(chat_id)
+
+    # Handle greetings first
+    greeting_response = await _detect_greeting(query)
+    if greeting_response:
+        logger.info({"message": "Detected greeting", "query": query, "response": greeting_response})
+        # Clear temp files even for greetings
+        try:
+            await _clear_temp_files()
+        except Exception as e:
+            logger.warning({"message": "Failed to clear temp files for greeting", "error": str(e)})
+        return {
+            "answer": greeting_response,
+            "sources": []
+        }
+
+    _validate_model(model)
+    startup.require("vector_store", "llm")
+    llm_options, query_type = _get_query_llm_options(model, query)
+
+    # Process uploaded file if provided and add to session
+    await _attach_uploaded_file(chat_id, filename)
+
+    # Create session-specific retriever
+    try:
+        # The LLM gets the question with the offline note; retrieval gets the normalized question
+        validated_query = enforce_offline_query_validation(query)
+        prepared = await query_preprocessor.prepare(query, EMBEDDING_MODEL)
+
+        selection = _metadata_selection(prepared, input.filters)
+        backends = await _retrieval_backends(chat_id, input.search_profile, selection)
+        reranker = _get_reranker(input.rerank)
+
+        # Run oc commands before retrieval so live cluster data can be picked up
+        oc_command_results = await _run_live_oc_commands(query)
+
+        # Get relevant documents for enhanced context creation
+        retrieval = await _retrieve(prepared, backends, reranker, selection)
+        relevant_docs = retrieval.documents
+
+        cache_key = _answer_cache_key(prepared, model, chat_id, conversation_history, oc_command_results, retrieval)
+        cached = _cached_answer(cache_key)
+        if cached is not None:
+            await _clear_temp_files()
+            return cached
+
+        try:
+            enhanced_context = enhance_context_with_metadata(relevant_docs, query_type)
+        except Exception as context_error:
+            logger.warning({"message": "Failed to enhance context, using basic context", "error": str(context_error)})
+            enhanced_context = "\n\n".join([doc.page_content for doc in relevant_docs])
+
+        # Build the optimized context-aware prompt and pack documents into the token budget
+        PROMPT, detected_type = _build_query_prompt(query, enhanced_context, conversation_history)
+        packed_context = _pack_query_context(PROMPT, validated_query, prepared.text, relevant_docs, llm_options)
+        prompt_text = PROMPT.format(context=packed_context.context, question=validated_query)
+        llm_options, llm_profile, context_budget = _plan_query_options(model, query_type, prompt_text, llm_options)
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error({"message": "Failed to create QA chain", "error": str(e)})
+        raise HTTPException(status_code=500, detail="Failed to initialize query system")
+
     # Execute query with offline enforcement and quality assessment
     try:
         # Record start time for performance tracking
         start_time = time.time()
-        
+
         # Validate offline mode before processing
-        if not validate_offline_mode():
+        if not await avalidate_offline_mode():
             logger.warning({"message": "Offline mode validation failed, but proceeding with query"})
-        
-        result = qa_chain.invoke({"query": validated_query})
-        
+
+        if relevant_docs:
+            async with _llm_generation(model, chat_id, llm_profile, llm_options, QUERY_SYSTEM_PROMPT) as (llm_instance, slot):
+                answer = await _invoke_within_deadline(llm_instance, prompt_text, slot)
+        else:
+            answer = ""
+        result = {"result": answer, "source_documents": relevant_docs}
+
         # Calculate processing time
         processing_time = time.time() - start_time
-        
+
         # Validate response
         if not result["source_documents"]:
             logger.warning({"message": "No relevant documents found", "query": query})
             return {
-                "answer": "Sorry, I couldn't find relevant information in the available documents to answer your question. Please note that I can only access information from uploaded documents and cannot search the internet.",
+                "answer": NO_RELEVANT_DOCUMENTS_ANSWER,
                 "sources": []
             }
 
         # Record prompt performance metrics
-        try:
-            from backend.config.prompt_optimization import record_prompt_metrics
-            
-            # Determine prompt type used
-            prompt_type = "advanced" if 'detected_type' in locals() else "fallback"
-            actual_query_type = detected_type if 'detected_type' in locals() else query_type
-            
-            record_prompt_metrics(
-                prompt_type=prompt_type,
-                query_type=actual_query_type,
-                query=query,
-                response=result["result"],
-                sources=[doc.metadata for doc in result["source_documents"]],
-                processing_time=processing_time,
-                context_length=len(enhanced_context),
-                session_id=chat_id,
-                model_used=model
-            )
-            
-        except Exception as metrics_error:
-            logger.warning({"message": "Failed to record prompt metrics", "error": str(metrics_error)})
+        _record_query_metrics(
+            query, result["result"], result["source_documents"], processing_time,
+            enhanced_context, chat_id, model, query_type, detected_type
+        )
 
         # Enhanced response quality assessment
         try:
@@ -1198,15 +1435,13 @@ oc get pods -n namespace --selector=app=myapp  # Lists pods matching label selec
                 enhanced_answer += "\n\n💡 **Suggestions for better results**:\n" + \
                                  "\n".join([f"• {suggestion}" for suggestion in quality_analysis["suggestions"]])
             
-            return {
+            return _cache_answer(cache_key, {
                 "answer": enhanced_answer,
-                "sources": [
-                    {
-                        **doc.metadata,
-                        "source": doc.metadata.get("source", "Unknown").split('/')[-1] if '/' in doc.metadata.get("source", "") else doc.metadata.get("source", "Unknown").split('\\')[-1]
-                    } for doc in result["source_documents"]
-                ],
+                "sources": _format_sources(result["source_documents"]),
                 "openshift_commands_executed": list(oc_command_results.keys()) if oc_command_results else [],
+                "context_budget": context_budget.to_dict(),
+                "context_manifest": packed_context.manifest(),
+                "retrieval": retrieval.report(),
                 "quality_metrics": {
                     "confidence_score": quality_analysis["confidence_score"],
                     "relevance_score": quality_analysis["metrics"]["avg_relevance"],
@@ -1215,7 +1450,7 @@ oc get pods -n namespace --selector=app=myapp  # Lists pods matching label selec
                     "has_citations": quality_analysis["metrics"]["has_citations"],
                     "live_data_included": len(oc_command_results) > 0
                 }
-            }
+            }, processing_time)
             
         except Exception as quality_error:
             logger.warning({"message": "Quality assessment failed, returning basic response", "error": str(quality_error)})
@@ -1228,17 +1463,17 @@ oc get pods -n namespace --selector=app=myapp  # Lists pods matching label selec
                 "sources_count": len(result["source_documents"])
             })
 
-            return {
+            return _cache_answer(cache_key, {
                 "answer": result["result"],
-                "sources": [
-                    {
-                        **doc.metadata,
-                        "source": doc.metadata.get("source", "Unknown").split('/')[-1] if '/' in doc.metadata.get("source", "") else doc.metadata.get("source", "Unknown").split('\\')[-1]
-                    } for doc in result["source_documents"]
-                ],
-                "openshift_commands_executed": list(oc_command_results.keys()) if oc_command_results else []
-            }
+                "sources": _format_sources(result["source_documents"]),
+                "openshift_commands_executed": list(oc_command_results.keys()) if oc_command_results else [],
+                "context_budget": context_budget.to_dict(),
+                "context_manifest": packed_context.manifest(),
+                "retrieval": retrieval.report()
+            }, processing_time)
 
+    except (HTTPException, SchedulerRejected):
+        raise
     except Exception as e:
         logger.error({"message": "Failed to process query", "query": query, "error": str(e)})
         raise HTTPException(status_code=500, detail="Failed to process your query")
@@ -1251,6 +1486,201 @@ oc get pods -n namespace --selector=app=myapp  # Lists pods matching label selec
         except Exception as e:
             logger.warning({"message": "Failed to clear temp files", "error": str(e)})
 
+@router.post("/query/stream")
+async def query_llm_stream(input: QueryInput, request: Request):
+    """Stream a /query answer as server-sent events.
+
+    Emits a ``sources`` event once retrieval finishes, ``token`` events as the
+    LLM generates, and a final ``done`` event with quality metrics. Closing the
+    connection aborts the upstream Ollama generation.
+    """
+    query = input.query.strip()
+    model = input.model
+    filename = input.filename
+    chat_id = input.chat_id or "default"
+    conversation_history = input.conversation_history or []
+
+    logger.info({
+        "message": "Received streaming query",
+        "query": query,
+        "model": model,
+        "filename": filename,
+        "chat_id": chat_id,
+        "conversation_length": len(conversation_history)
+    })
+
+    await _ensure_chat_session(chat_id)
+
+    greeting_response = await _detect_greeting(query)
+    if greeting_response:
+        logger.info({"message": "Detected greeting", "query": query, "response": greeting_response})
+        return _sse_response(_stream_static_answer(greeting_response, [], {}))
+
+    _validate_model(model)
+    startup.require("vector_store", "llm")
+    llm_options, query_type = _get_query_llm_options(model, query)
+    await _attach_uploaded_file(chat_id, filename)
+
+    try:
+        validated_query = enforce_offline_query_validation(query)
+        prepared = await query_preprocessor.prepare(query, EMBEDDING_MODEL)
+        selection = _metadata_selection(prepared, input.filters)
+        backends = await _retrieval_backends(chat_id, input.search_profile, selection)
+        reranker = _get_reranker(input.rerank)
+        oc_command_results = await _run_live_oc_commands(query)
+
+        # Retrieve after oc commands ran so live cluster data can be picked up
+        retrieval = await _retrieve(prepared, backends, reranker, selection)
+        relevant_docs = retrieval.documents
+        cache_key = _answer_cache_key(prepared, model, chat_id, conversation_history, oc_command_results, retrieval)
+        cached = _cached_answer(cache_key)
+        enhanced_context = enhance_context_with_metadata(relevant_docs, query_type)
+        PROMPT, detected_type = _build_query_prompt(query, enhanced_context, conversation_history)
+
+        packed_context = _pack_query_context(PROMPT, validated_query, prepared.text, relevant_docs, llm_options)
+        prompt_text = PROMPT.format(context=packed_context.context, question=validated_query)
+        llm_options, llm_profile, context_budget = _plan_query_options(model, query_type, prompt_text, llm_options)
+
+    except HTTPException:
+        await _clear_temp_files()
+        raise
+    except Exception as e:
+        await _clear_temp_files()
+        logger.error({"message": "Failed to prepare streaming query", "error": str(e)})
+        raise HTTPException(status_code=500, detail="Failed to initialize query system")
+
+    if not relevant_docs:
+        logger.warning({"message": "No relevant documents found", "query": query})
+        await _clear_temp_files()
+        return _sse_response(_stream_static_answer(NO_RELEVANT_DOCUMENTS_ANSWER, [], {}))
+
+    if cached is not None:
+        await _clear_temp_files()
+        return _sse_response(_stream_static_answer(cached.pop("answer"), cached.pop("sources"), cached))
+
+    # Reject before the response starts if the generation queue is already too deep
+    try:
+        generation_scheduler.admit(model, chat_id)
+    except SchedulerRejected:
+        await _clear_temp_files()
+        raise
+
+    def on_complete(answer: str, processing_time: float):
+        _record_query_metrics(
+            query, answer, relevant_docs, processing_time,
+            enhanced_context, chat_id, model, query_type, detected_type
+        )
+        _cache_answer(cache_key, {"answer": answer, "sources": _format_sources(relevant_docs), **done_payload},
+                      processing_time)
+
+    done_payload = {
+        "openshift_commands_executed": list(oc_command_results.keys()) if oc_command_results else [],
+        "live_data_included": len(oc_command_results) > 0,
+        "context_budget": context_budget.to_dict(),
+        "context_manifest": packed_context.manifest(),
+        "retrieval": retrieval.report()
+    }
+    return _sse_response(_stream_llm_answer(
+        request,
+        _llm_generation(model, chat_id, llm_profile, llm_options, QUERY_SYSTEM_PROMPT),
+        prompt_text, query, _format_sources(relevant_docs), done_payload,
+        source_documents=relevant_docs, on_complete=on_complete, cleanup=_clear_temp_files
+    ))
+
+def _sse_event(event: str, data: dict) -> str:
+    """Encode a server-sent event frame."""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+def _sse_response(event_stream) -> StreamingResponse:
+    """Wrap an SSE generator in a non-buffered streaming response."""
+    return StreamingResponse(
+        event_stream,
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no"  # Disable nginx response buffering
+        }
+    )
+
+async def _stream_static_answer(answer: str, sources: list, done_payload: dict):
+    """Stream an already computed answer using the same frames as a live generation."""
+    yield _sse_event("sources", {"sources": sources})
+    if answer:
+        yield _sse_event("token", {"token": answer})
+    yield _sse_event("done", {"answer": answer, **done_payload})
+
+async def _stream_llm_answer(request: Request, generation, prompt_text: str, query: str,
+                             sources: list, done_payload: dict, source_documents=None,
+                             on_complete=None, cleanup=None):
+    """Stream LLM tokens as SSE frames, aborting generation if the client disconnects.
+
+    ``generation`` is an unentered ``_llm_generation(...)`` context; the
+    scheduler slot is held only while tokens are being generated.
+    """
+    start_time = time.time()
+    first_token_time = None
+    answer_parts = []
+
+    try:
+        yield _sse_event("sources", {"sources": sources})
+
+        async with generation as (llm_instance, slot):
+            token_stream = llm_instance.astream(prompt_text)
+            try:
+                async for token in token_stream:
+                    if await request.is_disconnected():
+                        logger.info({"message": "Client disconnected, aborting generation", "query": query[:100]})
+                        return
+                    if first_token_time is None:
+                        first_token_time = time.time()
+                    answer_parts.append(token)
+                    yield _sse_event("token", {"token": token})
+            finally:
+                # Closing the generator closes the HTTP stream, which makes Ollama stop generating
+                await token_stream.aclose()
+
+        answer = "".join(answer_parts)
+        processing_time = time.time() - start_time
+        if on_complete:
+            on_complete(answer, processing_time)
+
+        quality_analysis = optimize_response_quality(query, source_documents or sources, answer)
+        yield _sse_event("done", {
+            "answer": answer,
+            **done_payload,
+            "quality_metrics": {
+                "confidence_score": quality_analysis["confidence_score"],
+                "overall_score": quality_analysis["overall_score"],
+                "sources_used": len(sources),
+                "has_examples": quality_analysis["includes_examples"],
+                "has_commands": quality_analysis["includes_commands"],
+                "live_data_included": done_payload.get("live_data_included", False)
+            },
+            "processing_time": processing_time,
+            "time_to_first_token": (first_token_time - start_time) if first_token_time else None,
+            "timestamp": time.time()
+        })
+
+    except asyncio.CancelledError:
+        logger.info({"message": "Streaming generation cancelled", "query": query[:100]})
+        raise
+    except SchedulerRejected as rejected:
+        logger.warning({"message": "Streaming generation rejected by scheduler", "query": query[:100], "detail": rejected.detail})
+        yield _sse_event("error", {
+            "detail": rejected.detail,
+            "status_code": rejected.status_code,
+            "retry_after": rejected.retry_after
+        })
+    except Exception as e:
+        logger.error({"message": "Streaming generation failed", "query": query[:100], "error": str(e)})
+        yield _sse_event("error", {"detail": "Failed to process your query"})
+    finally:
+        if cleanup:
+            try:
+                await cleanup()
+            except Exception as e:
+                logger.warning({"message": "Failed to clear temp files", "error": str(e)})
+
 async def _clear_temp_files():
     """Helper function to clear temporary uploaded files."""
     temp_dir = "tmp_uploads"
@@ -1270,6 +1700,11 @@ async def _process_uploaded_file(filename: str):
     if not filename:
         return None
     
+    # PDF extraction is CPU-bound, keep it off the event loop
+    return await run_cpu_bound(_parse_uploaded_file, filename)
+
+def _parse_uploaded_file(filename: str):
+    """Parse an uploaded file from the temp directory (blocking)."""
     temp_dir = "tmp_uploads"
     file_path = os.path.join(temp_dir, filename)
     
@@ -1353,16 +1788,50 @@ async def list_uploaded_files():
 @router.get("/debug/system-status")
 async def system_status():
     """Get system status for debugging."""
+    sessions = await run_io_bound(session_manager.stats)
     return {
         "vector_store_initialized": vector_store is not None,
-        "parsed_data_count": len(parsed_data) if parsed_data else 0,
-        "faiss_index_exists": os.path.exists(os.path.join(FAISS_INDEX_PATH, "index.faiss")),
+        "vector_store_memory_mapped": isinstance(vector_store, ReadOnlyFAISS),
+        "vector_index": vector_store.ann_info() if hasattr(vector_store, "ann_info") else None,
+        "lexical_index": vector_store.lexical_index.stats() if getattr(vector_store, "lexical_index", None) else None,
+        "metadata_index": vector_store.metadata_index.stats() if getattr(vector_store, "metadata_index", None) else None,
+        "faiss_index_exists": index_snapshots.exists(),
+        "faiss_index_snapshot": snapshot_watcher.loaded_version,
         "upload_dir_exists": os.path.exists("tmp_uploads"),
         "nas_dir_exists": os.path.exists(NAS_PATH),
         "embedding_model": EMBEDDING_MODEL,
-        "default_llm_model": LLM_MODEL
+        "default_llm_model": LLM_MODEL,
+        "executors": get_executor_stats(),
+        "llm_clients": llm_registry.stats(),
+        "embeddings": get_embedding_stats(),
+        "sessions": sessions,
+        "live_cluster_index": live_index.stats(),
+        "retrieval_backends": retrieval_orchestrator.stats(),
+        "rerankers": get_reranker_stats(),
+        "answer_cache": answer_cache.stats(),
+        "web_fetcher": web_fetcher.stats(),
+        "query_embeddings": query_preprocessor.stats(),
+        "startup": startup.status()
     }
 
+@router.get("/debug/index-snapshots")
+async def index_snapshot_status():
+    """Published FAISS index snapshots and the one this worker is serving."""
+    return await run_io_bound(snapshot_watcher.status)
+
+@router.post("/debug/index-snapshots/rollback")
+async def rollback_index_snapshot(version: str = None):
+    """Serve an earlier index snapshot (default: the previous one) and swap this worker to it.
+
+    Other workers pick it up on their next snapshot check.
+    """
+    try:
+        target = await run_io_bound(index_snapshots.rollback, version)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    swapped = await snapshot_watcher.check()
+    return {"rolled_back_to": target, "swapped": swapped, "serving": snapshot_watcher.loaded_version}
+
 @router.delete("/debug/clear-uploads")
 async def clear_uploaded_files():
     """Clear all uploaded files for debugging."""
@@ -1387,7 +1856,7 @@ async def clear_uploaded_files():
 async def openshift_status():
     """Check OpenShift CLI availability and connection status."""
     try:
-        oc_available = oc_handler.check_oc_availability()
+        oc_available = await oc_handler.acheck_oc_availability()
         
         status_info = {
             "oc_available": oc_available,
@@ -1399,21 +1868,16 @@ async def openshift_status():
         if oc_available:
             # Get basic cluster info
             try:
-                import subprocess
-                version_result = subprocess.run(['oc', 'version', '--client'], 
-                                              capture_output=True, text=True, timeout=10)
-                if version_result.returncode == 0:
-                    status_info["oc_version"] = version_result.stdout.strip()
-                
-                whoami_result = subprocess.run(['oc', 'whoami'], 
-                                             capture_output=True, text=True, timeout=10)
-                if whoami_result.returncode == 0:
-                    status_info["current_user"] = whoami_result.stdout.strip()
-                
-                project_result = subprocess.run(['oc', 'project'], 
-                                              capture_output=True, text=True, timeout=10)
-                if project_result.returncode == 0:
-                    status_info["current_project"] = project_result.stdout.strip()
+                version_result, whoami_result, project_result = await asyncio.gather(
+                    run_oc_command_async(['oc', 'version', '--client'], timeout=10),
+                    run_oc_command_async(['oc', 'whoami'], timeout=10),
+                    run_oc_command_async(['oc', 'project'], timeout=10)
+                )
+                for key, (returncode, stdout, _) in (("oc_version", version_result),
+                                                     ("current_user", whoami_result),
+                                                     ("current_project", project_result)):
+                    if returncode == 0:
+                        status_info[key] = stdout.strip()
                     
             except Exception as e:
                 status_info["cluster_info_error"] = str(e)
@@ -1431,7 +1895,7 @@ async def test_openshift_commands(query_input: QueryInput):
     """Test OpenShift command detection for a given query."""
     query = query_input.query
     
-    if not oc_handler.check_oc_availability():
+    if not await oc_handler.acheck_oc_availability():
         raise HTTPException(
             status_code=400,
             detail="OpenShift CLI not available or user not logged in"
@@ -1454,18 +1918,30 @@ async def test_openshift_commands(query_input: QueryInput):
             detail=f"Failed to analyze query for OpenShift commands: {e}"
         )
 
+@router.get("/debug/scheduler-status")
+async def scheduler_status():
+    """Report generation queue depth, wait times and concurrency per model."""
+    return {
+        "models": generation_scheduler.stats(),
+        "llm_clients": llm_registry.stats(),
+        "timestamp": time.time()
+    }
+
 @router.delete("/debug/clear-oc-cache")
 async def clear_openshift_cache():
     """Clear OpenShift command cache."""
     cache_size = len(oc_handler.cache)
     oc_handler.cache.clear()
+    live_entries = live_index.clear()
     
-    logger.info({"message": f"Cleared OpenShift command cache", "entries_cleared": cache_size})
+    logger.info({"message": f"Cleared OpenShift command cache", "entries_cleared": cache_size,
+                 "live_index_entries_cleared": live_entries})
     
     return {
         "message": f"Cleared {cache_size} cached OpenShift command results",
         "cache_size_before": cache_size,
-        "cache_size_after": 0
+        "cache_size_after": 0,
+        "live_index_entries_cleared": live_entries
     }
 
 @router.get("/debug/prompt-performance")
@@ -1499,8 +1975,8 @@ async def check_offline_status():
     """Check if the system is properly configured for offline operation."""
     status = {
         "offline_mode_configured": True,
-        "local_ollama_running": validate_offline_mode(),
-        "base_url": "http://localhost:11434",
+        "local_ollama_running": await avalidate_offline_mode(),
+        "base_url": llm_registry.base_urls[0],
         "internet_restrictions": {
             "custom_prompts_enabled": True,
             "query_validation_enabled": True,
@@ -1511,7 +1987,7 @@ async def check_offline_status():
     
     if not status["local_ollama_running"]:
         status["recommendations"].append("Start local Ollama instance: ollama serve")
-        status["recommendations"].append("Verify Ollama is accessible at http://localhost:11434")
+        status["recommendations"].append(f"Verify Ollama is accessible at {llm_registry.base_urls[0]}")
     
     if status["local_ollama_running"] and status["offline_mode_configured"]:
         status["status"] = "FULLY_OFFLINE"
@@ -1549,7 +2025,7 @@ def validate_offline_mode():
     """Validate that the system is configured for offline operation."""
     try:
         # Check if Ollama is running locally
-        response = requests.get("http://localhost:11434/api/tags", timeout=5)
+        response = requests.get(f"{llm_registry.base_urls[0]}/api/tags", timeout=5)
         if response.status_code == 200:
             logger.info({"message": "Local Ollama instance detected and running"})
             return True
@@ -1560,24 +2036,25 @@ def validate_offline_mode():
         logger.error({"message": "Failed to connect to local Ollama instance", "error": str(e)})
         return False
 
-# Validate offline mode at startup
-offline_mode_valid = validate_offline_mode()
-if not offline_mode_valid:
-    logger.warning({"message": "System may not be properly configured for offline operation"})
+async def avalidate_offline_mode():
+    """Async variant of validate_offline_mode for use inside request handlers."""
+    try:
+        async with httpx.AsyncClient(timeout=5) as client:
+            response = await client.get(f"{llm_registry.base_urls[0]}/api/tags")
+        if response.status_code == 200:
+            logger.info({"message": "Local Ollama instance detected and running"})
+            return True
+        else:
+            logger.warning({"message": "Local Ollama instance not responding properly"})
+            return False
+    except Exception as e:
+        logger.error({"message": "Failed to connect to local Ollama instance", "error": str(e)})
+        return False
 
 @router.delete("/sessions/{chat_id}")
 async def cleanup_chat_session(chat_id: str):
     """Clean up a specific chat session and its associated resources."""
-    global chat_sessions, session_vector_stores
-    
-    cleaned_up = False
-    if chat_id in chat_sessions:
-        del chat_sessions[chat_id]
-        cleaned_up = True
-        
-    if chat_id in session_vector_stores:
-        del session_vector_stores[chat_id]
-        cleaned_up = True
+    cleaned_up = await run_io_bound(session_manager.remove, chat_id)
     
     logger.info({"message": f"Cleaned up chat session", "chat_id": chat_id, "resources_found": cleaned_up})
     
@@ -1586,16 +2063,15 @@ async def cleanup_chat_session(chat_id: str):
         "resources_found": cleaned_up
     }
 
+@router.get("/sessions/stats")
+async def session_stats():
+    """Live session counts, estimated memory use and eviction counters."""
+    return await run_io_bound(session_manager.stats)
+
 @router.delete("/sessions")
 async def cleanup_all_sessions():
     """Clean up all chat sessions and their associated resources."""
-    global chat_sessions, session_vector_stores
-    
-    session_count = len(chat_sessions)
-    vector_store_count = len(session_vector_stores)
-    
-    chat_sessions.clear()
-    session_vector_stores.clear()
+    session_count, vector_store_count = await run_io_bound(session_manager.clear)
     
     logger.info({"message": "Cleaned up all chat sessions", "sessions_cleared": session_count, "vector_stores_cleared": vector_store_count})
     
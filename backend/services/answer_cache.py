@@ -0,0 +1,159 @@
+import copy
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from backend.config.performance_config import ANSWER_CACHE_CONFIGS
+from backend.services.query_preprocessor import normalize_query
+
+logger = logging.getLogger("ConfigGuidanceAPI")
+
+def chunk_fingerprint(chunk_ids: Iterable[str]) -> str:
+    """Order-independent fingerprint of the retrieved chunks an answer was generated from."""
+    return hashlib.sha1("\0".join(sorted(set(chunk_ids))).encode()).hexdigest()[:16]
+
+@dataclass
+class CachedAnswer:
+    """A generated response and what it was generated from."""
+    response: Dict
+    query: str                   # Normalized
+    vector: Optional[np.ndarray]  # Unit-length query embedding, for near-duplicate lookup
+    scope: str                   # Index snapshot and session documents it is valid for
+    model: str
+    chunk_ids: FrozenSet[str]
+    created_at: float
+    generation_seconds: float    # What a hit saves
+
+class AnswerCache:
+    """Per-worker cache of /query answers for repeated and near-duplicate questions.
+
+    An exact hit needs the same normalized question, model and scope, and
+    the same retrieved chunks (by fingerprint). A near-duplicate hit needs a
+    question embedding within ``similarity_threshold`` (cosine) of a cached
+    one with the same model and scope, and at least ``min_chunk_overlap``
+    (Jaccard) of its retrieved chunks. The scope names the index snapshot
+    and the chat's uploaded files, so a new snapshot or upload invalidates
+    earlier answers. Callers skip the cache when live oc data or
+    conversation history shapes the answer.
+    """
+
+    def __init__(self, config: Dict = None):
+        self.config = config or ANSWER_CACHE_CONFIGS
+        self._entries: "OrderedDict[Tuple, CachedAnswer]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"exact_hits": 0, "semantic_hits": 0, "misses": 0, "stores": 0, "expired": 0,
+                       "evicted": 0, "invalidated": 0, "latency_saved_seconds": 0.0}
+        self._skipped: Dict[str, int] = {}
+
+    @property
+    def enabled(self) -> bool:
+        return self.config["enabled"]
+
+    def skip(self, reason: str):
+        """Count a request that bypassed the cache (e.g. ``live_data``, ``history``)."""
+        with self._lock:
+            self._skipped[reason] = self._skipped.get(reason, 0) + 1
+
+    def _key(self, query: str, model: str, scope: str, fingerprint: str) -> Tuple:
+        return (scope, model, query, fingerprint)
+
+    def _alive(self, entry: CachedAnswer, now: float) -> bool:
+        return now - entry.created_at < self.config["ttl_seconds"]
+
+    def lookup(self, query: str, model: str, scope: str, chunk_ids: List[str],
+               vector: Optional[List[float]] = None) -> Tuple[Optional[Dict], Optional[str]]:
+        """``(response copy, "exact" | "semantic")`` for a cache hit, or ``(None, None)``."""
+        query = normalize_query(query)
+        key = self._key(query, model, scope, chunk_fingerprint(chunk_ids))
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and not self._alive(entry, now):
+                del self._entries[key]
+                self._stats["expired"] += 1
+                entry = None
+            kind = "exact" if entry is not None else None
+            if entry is None and vector is not None:
+                entry = self._nearest(np.asarray(vector, dtype=np.float32), model, scope, frozenset(chunk_ids), now)
+                kind = "semantic" if entry is not None else None
+            if entry is None:
+                self._stats["misses"] += 1
+                return None, None
+            self._entries.move_to_end(self._key(entry.query, entry.model, entry.scope, chunk_fingerprint(entry.chunk_ids)))
+            self._stats[f"{kind}_hits"] += 1
+            self._stats["latency_saved_seconds"] += entry.generation_seconds
+        response = copy.deepcopy(entry.response)
+        response["cache"] = {"hit": kind, "age_seconds": round(now - entry.created_at, 1), "cached_query": entry.query}
+        return response, kind
+
+    def _nearest(self, vector: np.ndarray, model: str, scope: str, chunk_ids: FrozenSet[str],
+                 now: float) -> Optional[CachedAnswer]:
+        vector = vector / max(float(np.linalg.norm(vector)), 1e-12)
+        candidates = [
+            entry for entry in self._entries.values()
+            if entry.vector is not None and entry.model == model and entry.scope == scope and self._alive(entry, now)
+        ]
+        if not candidates:
+            return None
+        similarities = np.vstack([entry.vector for entry in candidates]) @ vector
+        for i in np.argsort(-similarities):
+            if similarities[i] < self.config["similarity_threshold"]:
+                break
+            entry = candidates[i]
+            union = entry.chunk_ids | chunk_ids
+            if union and len(entry.chunk_ids & chunk_ids) / len(union) >= self.config["min_chunk_overlap"]:
+                return entry
+        return None
+
+    def store(self, query: str, model: str, scope: str, chunk_ids: List[str], response: Dict,
+              generation_seconds: float, vector: Optional[List[float]] = None):
+        query = normalize_query(query)
+        if vector is not None:
+            vector = np.asarray(vector, dtype=np.float32)
+            vector = vector / max(float(np.linalg.norm(vector)), 1e-12)
+        entry = CachedAnswer(copy.deepcopy(response), query, vector, scope, model, frozenset(chunk_ids),
+                             time.time(), generation_seconds)
+        with self._lock:
+            key = self._key(query, model, scope, chunk_fingerprint(chunk_ids))
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            self._stats["stores"] += 1
+            while len(self._entries) > self.config["max_entries"]:
+                self._entries.popitem(last=False)
+                self._stats["evicted"] += 1
+
+    def invalidate(self, scope_prefix: str = None) -> int:
+        """Drop entries whose scope starts with ``scope_prefix`` (all entries if None)."""
+        with self._lock:
+            stale = [key for key, entry in self._entries.items()
+                     if scope_prefix is None or entry.scope.startswith(scope_prefix)]
+            for key in stale:
+                del self._entries[key]
+            self._stats["invalidated"] += len(stale)
+        if stale:
+            logger.info({"message": "Invalidated cached answers", "entries": len(stale)})
+        return len(stale)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self._stats)
+            skipped = dict(self._skipped)
+            entries = len(self._entries)
+        hits = stats["exact_hits"] + stats["semantic_hits"]
+        lookups = hits + stats["misses"]
+        return {
+            **stats,
+            "latency_saved_seconds": round(stats["latency_saved_seconds"], 1),
+            "hit_ratio": round(hits / lookups, 3) if lookups else 0.0,
+            "skipped": skipped,
+            "entries": entries,
+            "enabled": self.enabled
+        }
+
+answer_cache = AnswerCache()
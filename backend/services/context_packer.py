@@ -0,0 +1,242 @@
+import hashlib
+import logging
+import re
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from backend.config.performance_config import CONTEXT_PACKER_CONFIGS
+from backend.services.token_budget import estimate_tokens
+
+logger = logging.getLogger("ConfigGuidanceAPI")
+
+_WORD_PATTERN = re.compile(r"\w+")
+_PARAGRAPH_BREAK = re.compile(r"\n\s*\n")
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+@dataclass
+class ContextChunk:
+    """A candidate piece of context from local docs, web pages or oc output."""
+    text: str
+    source_type: str              # "local", "web" or "oc"
+    source_id: str
+    score: float = 0.0            # Retrieval relevance in [0, 1]; 0 means "unknown"
+    metadata: Dict = field(default_factory=dict)
+    title: Optional[str] = None
+    tokens: int = 0
+
+@dataclass
+class PackedContext:
+    """The packed context string plus a manifest of what was kept and dropped."""
+    context: str
+    chunks: List[ContextChunk]
+    dropped: List[Dict]
+    tokens_used: int
+    token_budget: int
+
+    def manifest(self) -> Dict:
+        return {
+            "token_budget": self.token_budget,
+            "tokens_used": self.tokens_used,
+            "included": [
+                {"source_type": c.source_type, "source_id": c.source_id, "tokens": c.tokens, "score": round(c.score, 3)}
+                for c in self.chunks
+            ],
+            "dropped": self.dropped
+        }
+
+def split_passages(text: str, max_tokens: int, config: Dict = None) -> List[str]:
+    """Split long text into passages of at most ``max_tokens`` on paragraph or sentence boundaries."""
+    config = config or CONTEXT_PACKER_CONFIGS
+    if estimate_tokens(text, config) <= max_tokens:
+        return [text]
+
+    pieces = []
+    for paragraph in _PARAGRAPH_BREAK.split(text):
+        if not paragraph.strip():
+            continue
+        if estimate_tokens(paragraph, config) <= max_tokens:
+            pieces.append(paragraph)
+        else:
+            pieces.extend(s for s in _SENTENCE_END.split(paragraph) if s.strip())
+
+    passages, current = [], ""
+    for piece in pieces:
+        candidate = f"{current}\n\n{piece}" if current else piece
+        if current and estimate_tokens(candidate, config) > max_tokens:
+            passages.append(current)
+            candidate = piece
+        # A single oversized sentence is hard-split rather than dropped
+        while estimate_tokens(candidate, config) > max_tokens:
+            cut = max(1, int(len(candidate) * max_tokens / estimate_tokens(candidate, config)))
+            passages.append(candidate[:cut])
+            candidate = candidate[cut:]
+        current = candidate
+    if current.strip():
+        passages.append(current)
+    return passages
+
+def _lexical_score(query_terms: set, text: str) -> float:
+    """Fraction of query terms that occur in the text."""
+    if not query_terms:
+        return 0.0
+    words = set(_WORD_PATTERN.findall(text.lower()))
+    return len(query_terms & words) / len(query_terms)
+
+def _shingles(text: str, size: int = 5) -> set:
+    words = _WORD_PATTERN.findall(text.lower())
+    if len(words) <= size:
+        return {" ".join(words)}
+    return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+def _fingerprint(text: str) -> str:
+    return hashlib.sha1(" ".join(_WORD_PATTERN.findall(text.lower())).encode()).hexdigest()
+
+class ContextPacker:
+    """Fill a token budget with the most relevant context per token.
+
+    Chunks are split into passages, deduplicated (exact and near-duplicate),
+    scored by a blend of retrieval score and query term overlap, and packed
+    greedily by score per token. Each source type is first limited to its
+    quota share of the budget; budget left over after that pass is handed to
+    the remaining passages so quotas never leave the window under-filled.
+    """
+
+    def __init__(self, config: Dict = None):
+        self.config = config or CONTEXT_PACKER_CONFIGS
+
+    def _expand(self, chunks: List[ContextChunk], query_terms: set) -> List[ContextChunk]:
+        """Split chunks into scored passages; later passages of a page score slightly lower."""
+        passages = []
+        weight = self.config["retrieval_score_weight"]
+        for chunk in chunks:
+            parts = split_passages(chunk.text, self.config["max_passage_tokens"], self.config)
+            for index, part in enumerate(parts):
+                lexical = _lexical_score(query_terms, part)
+                score = weight * chunk.score + (1 - weight) * lexical if chunk.score else lexical
+                score *= self.config["passage_position_decay"] ** index
+                passages.append(ContextChunk(
+                    text=part.strip(),
+                    source_type=chunk.source_type,
+                    source_id=chunk.source_id if len(parts) == 1 else f"{chunk.source_id}#{index}",
+                    score=score,
+                    metadata=chunk.metadata,
+                    title=chunk.title,
+                    tokens=estimate_tokens(part, self.config)
+                ))
+        return passages
+
+    def _dedupe(self, passages: List[ContextChunk], dropped: List[Dict]) -> List[ContextChunk]:
+        """Drop exact and near-duplicate passages, keeping the higher scored copy."""
+        kept, fingerprints, shingle_sets = [], set(), []
+        threshold = self.config["near_duplicate_threshold"]
+        for passage in sorted(passages, key=lambda p: p.score, reverse=True):
+            fingerprint = _fingerprint(passage.text)
+            shingles = _shingles(passage.text)
+            duplicate = fingerprint in fingerprints or any(
+                len(shingles & other) / max(1, len(shingles | other)) >= threshold for other in shingle_sets
+            )
+            if duplicate:
+                dropped.append(self._dropped(passage, "duplicate"))
+                continue
+            fingerprints.add(fingerprint)
+            shingle_sets.append(shingles)
+            kept.append(passage)
+        return kept
+
+    @staticmethod
+    def _dropped(passage: ContextChunk, reason: str) -> Dict:
+        return {
+            "source_type": passage.source_type,
+            "source_id": passage.source_id,
+            "tokens": passage.tokens,
+            "score": round(passage.score, 3),
+            "reason": reason
+        }
+
+    def pack(self, chunks: List[ContextChunk], query: str, token_budget: int,
+             quotas: Optional[Dict[str, float]] = None) -> PackedContext:
+        """Select passages for ``token_budget`` tokens and render them in source order."""
+        quotas = quotas if quotas is not None else self.config["source_quotas"]
+        query_terms = {term for term in _WORD_PATTERN.findall(query.lower()) if len(term) > 2}
+        dropped: List[Dict] = []
+
+        passages = self._dedupe(self._expand(chunks, query_terms), dropped)
+        min_score = self.config["min_score"]
+        candidates = []
+        for passage in passages:
+            if passage.score < min_score and passage.source_type != "oc":
+                dropped.append(self._dropped(passage, "low_relevance"))
+            else:
+                candidates.append(passage)
+        candidates.sort(key=lambda p: p.score / max(1, p.tokens), reverse=True)
+
+        selected, used = [], 0
+        used_by_source: Dict[str, int] = {}
+        deferred = []
+        # First pass: respect per-source quotas
+        for passage in candidates:
+            quota = int(quotas.get(passage.source_type, 1.0) * token_budget)
+            source_used = used_by_source.get(passage.source_type, 0)
+            if used + passage.tokens > token_budget:
+                deferred.append((passage, "budget"))
+            elif source_used + passage.tokens > quota:
+                deferred.append((passage, "quota"))
+            else:
+                selected.append(passage)
+                used += passage.tokens
+                used_by_source[passage.source_type] = source_used + passage.tokens
+        # Second pass: spend what the quotas left unused
+        for passage, reason in deferred:
+            if used + passage.tokens <= token_budget:
+                selected.append(passage)
+                used += passage.tokens
+            else:
+                dropped.append(self._dropped(passage, reason))
+
+        order = {source_type: i for i, source_type in enumerate(self.config["render_order"])}
+        selected.sort(key=lambda p: (order.get(p.source_type, len(order)), -p.score))
+
+        if dropped:
+            logger.info({
+                "message": "Context packed",
+                "token_budget": token_budget,
+                "tokens_used": used,
+                "included": len(selected),
+                "dropped": len(dropped)
+            })
+        return PackedContext(
+            context=self._render(selected),
+            chunks=selected,
+            dropped=dropped,
+            tokens_used=used,
+            token_budget=token_budget
+        )
+
+    @staticmethod
+    def _render(passages: List[ContextChunk]) -> str:
+        parts = []
+        for passage in passages:
+            if passage.title:
+                parts.append(f"{passage.title}:\n{passage.text}")
+            else:
+                parts.append(passage.text)
+        return "\n\n".join(parts)
+
+def chunks_from_documents(documents, source_type: str = "local") -> List[ContextChunk]:
+    """Turn retriever Documents (best first) into chunks with a rank-based score."""
+    chunks = []
+    for rank, doc in enumerate(documents):
+        metadata = doc.metadata or {}
+        doc_source_type = "oc" if str(metadata.get("type", "")).startswith("oc_") else source_type
+        score = metadata.get("score") or 1.0 / (1 + rank * 0.25)
+        chunks.append(ContextChunk(
+            text=doc.page_content,
+            source_type=doc_source_type,
+            source_id=str(metadata.get("source", f"{doc_source_type}_{rank}")),
+            score=float(score),
+            metadata=metadata
+        ))
+    return chunks
+
+# Global instance
+context_packer = ContextPacker()
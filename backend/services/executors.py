@@ -0,0 +1,70 @@
+import asyncio
+import functools
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict
+
+from backend.config.performance_config import CONCURRENCY_CONFIGS
+
+logger = logging.getLogger("ConfigGuidanceAPI")
+
+# Pool name -> configured worker count
+POOL_SIZES = {
+    "cpu": CONCURRENCY_CONFIGS["cpu_workers"],
+    "io": CONCURRENCY_CONFIGS["io_workers"],
+    "retrieval": CONCURRENCY_CONFIGS["retrieval_workers"],
+}
+
+_executors: Dict[str, ThreadPoolExecutor] = {}
+
+def get_executor(kind: str) -> ThreadPoolExecutor:
+    """Return the bounded thread pool for a workload kind, creating it on first use."""
+    if kind not in POOL_SIZES:
+        raise ValueError(f"Unknown executor kind: {kind}. Expected one of: {', '.join(POOL_SIZES)}")
+
+    executor = _executors.get(kind)
+    if executor is None:
+        executor = ThreadPoolExecutor(max_workers=POOL_SIZES[kind], thread_name_prefix=f"{kind}-pool")
+        _executors[kind] = executor
+        logger.info({"message": f"Created {kind} thread pool", "max_workers": POOL_SIZES[kind]})
+    return executor
+
+async def run_in_pool(kind: str, func: Callable, *args, **kwargs) -> Any:
+    """Run a blocking callable in the named pool without blocking the event loop."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_executor(kind), functools.partial(func, *args, **kwargs))
+
+async def run_cpu_bound(func: Callable, *args, **kwargs) -> Any:
+    """Run embedding, parsing or vector search work in the CPU pool."""
+    return await run_in_pool("cpu", func, *args, **kwargs)
+
+async def run_io_bound(func: Callable, *args, **kwargs) -> Any:
+    """Run blocking subprocess, file or HTTP work in the I/O pool."""
+    return await run_in_pool("io", func, *args, **kwargs)
+
+def install_default_executor():
+    """Route library-internal run_in_executor(None, ...) calls to the CPU pool.
+
+    LangChain's async retrievers fall back to the loop's default executor for
+    FAISS search and query embedding, so this keeps that work bounded too.
+    """
+    asyncio.get_running_loop().set_default_executor(get_executor("cpu"))
+
+def get_executor_stats() -> Dict[str, Dict]:
+    """Return size and backlog information for each pool."""
+    stats = {}
+    for kind, max_workers in POOL_SIZES.items():
+        executor = _executors.get(kind)
+        stats[kind] = {
+            "max_workers": max_workers,
+            "started": executor is not None,
+            "threads": len(executor._threads) if executor else 0,
+            "queued_tasks": executor._work_queue.qsize() if executor else 0,
+        }
+    return stats
+
+def shutdown_executors(wait: bool = False):
+    """Shut down all pools, e.g. on application shutdown."""
+    for kind, executor in list(_executors.items()):
+        executor.shutdown(wait=wait, cancel_futures=True)
+        del _executors[kind]
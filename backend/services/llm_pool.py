@@ -0,0 +1,129 @@
+import asyncio
+import hashlib
+import json
+import logging
+import threading
+from contextlib import asynccontextmanager
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+from langchain_ollama import OllamaLLM
+
+from backend.config.llm_config import OLLAMA_POOL_CONFIGS
+
+logger = logging.getLogger("ConfigGuidanceAPI")
+
+class LLMClientRegistry:
+    """Process-wide registry of reusable Ollama clients.
+
+    Clients are keyed by (model, option profile, base URL). Each client keeps
+    its own keep-alive HTTP connection pool, so repeated requests with the same
+    options reuse connections instead of building a new client per request.
+    """
+
+    def __init__(self, base_urls: List[str] = None, config: Dict = None):
+        self.config = config or OLLAMA_POOL_CONFIGS
+        self.base_urls = base_urls or self.config["base_urls"]
+        self._clients: Dict[Tuple, OllamaLLM] = {}
+        self._profiles: Dict[Tuple, str] = {}
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._in_flight: Dict[Tuple[str, str], int] = {}
+        self._lock = threading.Lock()
+
+    def _client_kwargs(self) -> Dict:
+        """httpx settings shared by the sync and async clients of every OllamaLLM."""
+        return {
+            "timeout": self.config["request_timeout"],
+            "limits": httpx.Limits(
+                max_connections=self.config["max_connections"],
+                max_keepalive_connections=self.config["max_keepalive_connections"],
+                keepalive_expiry=self.config["keepalive_expiry"]
+            )
+        }
+
+    @staticmethod
+    def _profile_key(options: Dict, system: Optional[str]) -> str:
+        """Stable fingerprint of the generation options and system prompt."""
+        payload = json.dumps({"options": options, "system": system}, sort_keys=True, default=str)
+        return hashlib.sha1(payload.encode()).hexdigest()[:16]
+
+    def get_client(self, model: str, profile: str, options: Dict, system: Optional[str] = None,
+                   base_url: Optional[str] = None) -> OllamaLLM:
+        """Return the shared client for a model/options combination, creating it once."""
+        base_url = base_url or self._least_busy_base_url(model)
+        key = (model, self._profile_key(options, system), base_url)
+
+        client = self._clients.get(key)
+        if client is None:
+            with self._lock:
+                client = self._clients.get(key)
+                if client is None:
+                    llm_kwargs = dict(options)
+                    if system:
+                        llm_kwargs["system"] = system
+                    client = OllamaLLM(
+                        model=model,
+                        base_url=base_url,
+                        client_kwargs=self._client_kwargs(),
+                        **llm_kwargs
+                    )
+                    self._clients[key] = client
+                    self._profiles[key] = profile
+                    logger.info({
+                        "message": "Created pooled Ollama client",
+                        "model": model,
+                        "profile": profile,
+                        "base_url": base_url,
+                        "clients": len(self._clients)
+                    })
+        return client
+
+    def max_in_flight(self, model: str) -> int:
+        """Concurrent generation limit for a model."""
+        limits = self.config["max_in_flight"]
+        return limits.get(model, limits["default"])
+
+    def _semaphore(self, model: str) -> asyncio.Semaphore:
+        semaphore = self._semaphores.get(model)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self.max_in_flight(model))
+            self._semaphores[model] = semaphore
+        return semaphore
+
+    def _least_busy_base_url(self, model: str) -> str:
+        return min(self.base_urls, key=lambda url: self._in_flight.get((model, url), 0))
+
+    @asynccontextmanager
+    async def lease(self, model: str, profile: str, options: Dict, system: Optional[str] = None):
+        """Hold one of the model's in-flight slots and yield a client on the least busy server."""
+        async with self._semaphore(model):
+            base_url = self._least_busy_base_url(model)
+            client = self.get_client(model, profile, options, system, base_url=base_url)
+            self._in_flight[(model, base_url)] = self._in_flight.get((model, base_url), 0) + 1
+            try:
+                yield client
+            finally:
+                self._in_flight[(model, base_url)] -= 1
+
+    def stats(self) -> Dict:
+        """Client counts and in-flight generations per model and server."""
+        clients_per_model: Dict[str, int] = {}
+        for model, _, _ in self._clients:
+            clients_per_model[model] = clients_per_model.get(model, 0) + 1
+
+        return {
+            "base_urls": self.base_urls,
+            "clients": len(self._clients),
+            "clients_per_model": clients_per_model,
+            "profiles": sorted(set(self._profiles.values())),
+            "max_connections_per_client": self.config["max_connections"],
+            "in_flight": {
+                f"{model}@{url}": count for (model, url), count in self._in_flight.items()
+            },
+            "max_in_flight": {
+                model: self.max_in_flight(model) for model in {key[0] for key in self._clients}
+            }
+        }
+
+# Global instance
+llm_registry = LLMClientRegistry()
@@ -0,0 +1,88 @@
+import logging
+import re
+import threading
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from backend.config.performance_config import METADATA_FILTER_CONFIGS
+from backend.vector_store.embedding_service import get_embedding_service
+from backend.vector_store.metadata_index import openshift_version
+
+logger = logging.getLogger("ConfigGuidanceAPI")
+
+_WHITESPACE = re.compile(r"\s+")
+_TRAILING_PUNCTUATION = re.compile(r"[\s?.!]+$")
+_MENTIONS_OPENSHIFT = re.compile(r"\b(?:openshift|ocp)\b", re.IGNORECASE)
+_VERSION = re.compile(r"\b([34]\.\d{1,2})\b")
+
+def retrieval_text(query: str) -> str:
+    """The question as searched: surrounding and repeated whitespace removed, case kept for lexical matching."""
+    return _WHITESPACE.sub(" ", query.strip())
+
+def normalize_query(query: str) -> str:
+    """Case, whitespace and trailing punctuation insensitive form of a question."""
+    return _TRAILING_PUNCTUATION.sub("", retrieval_text(query).lower())
+
+def detect_filters(query: str) -> Dict[str, str]:
+    """Metadata filters the question implies; currently the OpenShift version it names, e.g. ``4.16``."""
+    version = openshift_version(query)
+    if version is None and _MENTIONS_OPENSHIFT.search(query):
+        # "how do I upgrade to 4.16 on openshift"
+        match = _VERSION.search(query)
+        version = match.group(1) if match else None
+    return {"openshift_version": version} if version else {}
+
+@dataclass
+class PreparedQuery:
+    """A user question ready for retrieval, kept apart from the instructions added for the LLM."""
+    text: str                      # Searched by lexical backends and the reranker
+    normalized: str                # Embedded, and the key for query and answer caches
+    vector: Optional[List[float]]  # Embedding of ``normalized``; None if embedding failed
+    embedding_model: str
+    filters: Dict[str, str] = field(default_factory=dict)  # Detected from the question (see detect_filters)
+
+class QueryPreprocessor:
+    """Normalizes questions and embeds them once per request.
+
+    The normalized text is embedded through the shared EmbeddingService,
+    whose memory and disk caches are keyed by ``(model, text)``, so a
+    repeated question, or one differing only in case, spacing or trailing
+    punctuation, skips the encoder. Embedding the normalized text is
+    lossless for the uncased MiniLM model. The vector is computed once per
+    request and shared by every dense backend.
+    """
+
+    def __init__(self):
+        self._models = set()  # Embedding models queries were prepared for, reported in stats
+        self._lock = threading.Lock()
+        self._stats = {"queries": 0, "errors": 0}
+
+    async def prepare(self, query: str, embedding_model: str) -> PreparedQuery:
+        text = retrieval_text(query)
+        normalized = normalize_query(query)
+        with self._lock:
+            self._models.add(embedding_model)
+            self._stats["queries"] += 1
+        vector = None
+        try:
+            vector = await get_embedding_service(embedding_model).aembed_query(normalized)
+        except Exception as e:
+            # Backends embed the text themselves instead
+            with self._lock:
+                self._stats["errors"] += 1
+            logger.warning({"message": "Failed to embed query", "model": embedding_model, "error": str(e)})
+        filters = detect_filters(text) if METADATA_FILTER_CONFIGS["detect_openshift_version"] else {}
+        return PreparedQuery(text, normalized, vector, embedding_model, filters)
+
+    def stats(self) -> Dict:
+        """Query counters, with the cache hit counters of the embedding services they used."""
+        with self._lock:
+            stats = dict(self._stats)
+            models = sorted(self._models)
+        embeddings = {}
+        for model in models:
+            service = get_embedding_service(model).stats()
+            embeddings[model] = {key: service[key] for key in ("memory_hits", "disk_hits", "embedded")}
+        return {**stats, "embeddings": embeddings}
+
+query_preprocessor = QueryPreprocessor()
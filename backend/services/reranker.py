@@ -0,0 +1,275 @@
+import asyncio
+import hashlib
+import logging
+import queue
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from langchain.docstore.document import Document
+
+from backend.config.performance_config import RERANKER_CONFIGS
+from backend.services.retrieval_orchestrator import chunk_id
+
+logger = logging.getLogger("ConfigGuidanceAPI")
+
+@dataclass
+class RerankResult:
+    """Documents in final order plus whether (and how) the cross-encoder was applied."""
+    documents: List[Document]
+    reranked: bool
+    reason: str = "ok"          # ok, latency_budget, error or empty
+    latency_ms: float = 0.0
+    scored: int = 0             # Pairs sent to the model
+    cache_hits: int = 0
+    extra: Dict = field(default_factory=dict)
+
+    def report(self) -> Dict:
+        return {"reranked": self.reranked, "reason": self.reason, "latency_ms": self.latency_ms,
+                "scored": self.scored, "cache_hits": self.cache_hits, **self.extra}
+
+class CrossEncoderReranker:
+    """Process-wide cross-encoder for one reranker profile, with batching and a score cache.
+
+    Only the first ``max_candidates`` fused documents are rescored, each
+    passage cut to about ``max_passage_tokens``; the rest keep their fused
+    order after them. Pairs from concurrent requests are collected for up
+    to ``batch_window_ms`` and scored in one model call. Scores are cached
+    (LRU) by query hash and chunk ID. If the pairs still to score are not
+    back within the latency budget, the fused order is returned instead;
+    the batch still completes and fills the cache for the next request.
+    """
+
+    def __init__(self, profile: str, config: Dict = None):
+        self.config = config or RERANKER_CONFIGS
+        self.profile = profile
+        self.settings = self.config["profiles"][profile]
+        self._model = None
+        self._model_lock = threading.Lock()
+        self._cache: "OrderedDict[Tuple[str, str], float]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._requests: "queue.Queue" = queue.Queue()
+        self._batcher: Optional[threading.Thread] = None
+        self._pair_ms: Optional[float] = None   # Smoothed model time per pair
+        self._queued_pairs = 0
+        self._stats = {"requests": 0, "reranked": 0, "skipped_budget": 0, "errors": 0,
+                       "cache_hits": 0, "scored": 0, "batches": 0}
+
+    @property
+    def max_candidates(self) -> int:
+        return self.settings["max_candidates"]
+
+    def _query_hash(self, query: str) -> str:
+        return hashlib.sha1(f"{self.settings['model']}\0{query}".encode("utf-8")).hexdigest()
+
+    def _passage(self, document: Document) -> str:
+        # Cut before tokenization; the model truncates the pair to max_length tokens as well
+        max_chars = int(self.settings["max_passage_tokens"] * self.config["chars_per_token"])
+        return document.page_content[:max_chars]
+
+    def _prepare(self, query: str, documents: List[Document]):
+        """Cached scores by key, and the ``key -> (query, passage)`` pairs still to score."""
+        query_hash = self._query_hash(query)
+        keys = [(query_hash, chunk_id(document)) for document in documents]
+        cached, to_score = {}, {}
+        with self._cache_lock:
+            for key, document in zip(keys, documents):
+                score = self._cache.get(key)
+                if score is not None:
+                    self._cache.move_to_end(key)
+                    cached[key] = score
+                elif key not in to_score:
+                    to_score[key] = (query, self._passage(document))
+            self._stats["cache_hits"] += len(cached)
+        return keys, cached, to_score
+
+    def _over_budget(self, pairs: int, budget_ms: float) -> bool:
+        """Whether the queued and new pairs would take longer than the budget at the observed rate."""
+        return self._pair_ms is not None and (self._queued_pairs + pairs) * self._pair_ms > budget_ms
+
+    def _ordered(self, documents: List[Document], keys, scores: Dict) -> List[Document]:
+        candidates = documents[:self.max_candidates]
+        ranked = sorted(zip(candidates, keys), key=lambda item: scores[item[1]], reverse=True)
+        reranked = [
+            Document(id=document.id, page_content=document.page_content,
+                     metadata={**document.metadata, "rerank_score": round(float(scores[key]), 6)})
+            for document, key in ranked
+        ]
+        return reranked + documents[self.max_candidates:]
+
+    def _finish(self, documents, keys, scores, started, to_score, cached) -> RerankResult:
+        self._stats["reranked"] += 1
+        return RerankResult(self._ordered(documents, keys, scores), True,
+                            latency_ms=round((time.perf_counter() - started) * 1000, 1),
+                            scored=len(to_score), cache_hits=len(cached), extra={"profile": self.profile})
+
+    def _fallback(self, documents, reason: str, started, to_score=(), cached=()) -> RerankResult:
+        self._stats["skipped_budget" if reason == "latency_budget" else "errors"] += 1
+        return RerankResult(documents, False, reason, round((time.perf_counter() - started) * 1000, 1),
+                            len(to_score), len(cached), extra={"profile": self.profile})
+
+    async def arerank(self, query: str, documents: List[Document], budget_ms: float = None) -> RerankResult:
+        """Reorder fused documents by cross-encoder score, or keep their order if over budget."""
+        started = time.perf_counter()
+        self._stats["requests"] += 1
+        if not documents:
+            return RerankResult(documents, False, "empty")
+        budget_ms = budget_ms or self.config["latency_budget_ms"]
+        keys, scores, to_score = self._prepare(query, documents[:self.max_candidates])
+        cached = dict(scores)
+        if to_score:
+            if self._over_budget(len(to_score), budget_ms):
+                return self._fallback(documents, "latency_budget", started, to_score, cached)
+            remaining = budget_ms / 1000 - (time.perf_counter() - started)
+            try:
+                # Shielded so a timeout leaves the batch running to fill the cache
+                future = asyncio.shield(asyncio.wrap_future(self._submit(to_score)))
+                scores.update(await asyncio.wait_for(future, max(remaining, 0)))
+            except asyncio.TimeoutError:
+                return self._fallback(documents, "latency_budget", started, to_score, cached)
+            except Exception as e:
+                logger.warning({"message": "Reranking failed, keeping fused order", "profile": self.profile, "error": str(e)})
+                return self._fallback(documents, "error", started, to_score, cached)
+        return self._finish(documents, keys, scores, started, to_score, cached)
+
+    def rerank(self, query: str, documents: List[Document], budget_ms: float = None) -> RerankResult:
+        """Blocking variant of ``arerank`` for synchronous callers."""
+        started = time.perf_counter()
+        self._stats["requests"] += 1
+        if not documents:
+            return RerankResult(documents, False, "empty")
+        budget_ms = budget_ms or self.config["latency_budget_ms"]
+        keys, scores, to_score = self._prepare(query, documents[:self.max_candidates])
+        cached = dict(scores)
+        if to_score:
+            if self._over_budget(len(to_score), budget_ms):
+                return self._fallback(documents, "latency_budget", started, to_score, cached)
+            try:
+                scores.update(self._submit(to_score).result(timeout=budget_ms / 1000))
+            except FutureTimeoutError:
+                return self._fallback(documents, "latency_budget", started, to_score, cached)
+            except Exception as e:
+                logger.warning({"message": "Reranking failed, keeping fused order", "profile": self.profile, "error": str(e)})
+                return self._fallback(documents, "error", started, to_score, cached)
+        return self._finish(documents, keys, scores, started, to_score, cached)
+
+    # Batching
+
+    def _submit(self, to_score: Dict) -> Future:
+        self._ensure_batcher()
+        future: Future = Future()
+        with self._cache_lock:
+            self._queued_pairs += len(to_score)
+        self._requests.put((to_score, future))
+        return future
+
+    def _ensure_batcher(self):
+        if self._batcher is None or not self._batcher.is_alive():
+            with self._model_lock:
+                if self._batcher is None or not self._batcher.is_alive():
+                    self._batcher = threading.Thread(target=self._run_batcher, name=f"reranker-{self.profile}", daemon=True)
+                    self._batcher.start()
+
+    def _load_model(self):
+        if self._model is None:
+            from langchain_community.cross_encoders import HuggingFaceCrossEncoder
+
+            started = time.time()
+            self._model = HuggingFaceCrossEncoder(
+                model_name=self.settings["model"],
+                model_kwargs={"device": "cpu", "max_length": self.settings["max_passage_tokens"] + 64}
+            )
+            logger.info({"message": "Loaded reranker model", "profile": self.profile, "model": self.settings["model"],
+                         "seconds": round(time.time() - started, 2)})
+        return self._model
+
+    def _run_batcher(self):
+        """Collect requests for a short window, then score their pairs in one model call."""
+        window = self.config["batch_window_ms"] / 1000
+        max_batch = self.config["max_batch_pairs"]
+        while True:
+            batch = [self._requests.get()]
+            size = len(batch[0][0])
+            deadline = time.monotonic() + window
+            while size < max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    request = self._requests.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                batch.append(request)
+                size += len(request[0])
+            self._score_batch(batch)
+
+    def _score_batch(self, batch):
+        # Pairs requested by several callers in the same window are scored once
+        unique: Dict = {}
+        for to_score, _ in batch:
+            unique.update(to_score)
+        try:
+            keys = list(unique)
+            started = time.perf_counter()
+            scores = self._load_model().score([list(unique[key]) for key in keys])
+            pair_ms = (time.perf_counter() - started) * 1000 / max(len(keys), 1)
+            scored = dict(zip(keys, (float(score) for score in scores)))
+        except Exception as e:
+            logger.error({"message": "Reranker batch failed", "profile": self.profile, "pairs": len(unique), "error": str(e)})
+            self._release(batch)
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        smoothing = self.config["latency_smoothing"]
+        if self._model is not None and self._stats["batches"] > 0:  # The first batch includes model loading
+            self._pair_ms = pair_ms if self._pair_ms is None else (1 - smoothing) * self._pair_ms + smoothing * pair_ms
+        with self._cache_lock:
+            for key, score in scored.items():
+                self._cache[key] = score
+                self._cache.move_to_end(key)
+            while len(self._cache) > self.config["cache_entries"]:
+                self._cache.popitem(last=False)
+        self._stats["batches"] += 1
+        self._stats["scored"] += len(scored)
+        self._release(batch)
+        for to_score, future in batch:
+            if not future.done():
+                future.set_result({key: scored[key] for key in to_score})
+
+    def _release(self, batch):
+        with self._cache_lock:
+            self._queued_pairs -= sum(len(to_score) for to_score, _ in batch)
+
+    def stats(self) -> Dict:
+        return {
+            "model": self.settings["model"],
+            "model_loaded": self._model is not None,
+            "cache_entries": len(self._cache),
+            "queued_pairs": self._queued_pairs,
+            "ms_per_pair": round(self._pair_ms, 2) if self._pair_ms is not None else None,
+            **self._stats
+        }
+
+_rerankers: Dict[str, CrossEncoderReranker] = {}
+_rerankers_lock = threading.Lock()
+
+def get_reranker(profile: str) -> CrossEncoderReranker:
+    """Return the shared reranker for a profile in RERANKER_CONFIGS, creating it once per process."""
+    if profile not in RERANKER_CONFIGS["profiles"]:
+        raise ValueError(f"Unknown reranker profile: {profile}. Available: {', '.join(RERANKER_CONFIGS['profiles'])}")
+    reranker = _rerankers.get(profile)
+    if reranker is None:
+        with _rerankers_lock:
+            reranker = _rerankers.get(profile)
+            if reranker is None:
+                reranker = _rerankers[profile] = CrossEncoderReranker(profile)
+    return reranker
+
+def get_reranker_stats() -> Dict[str, Dict]:
+    return {profile: reranker.stats() for profile, reranker in _rerankers.items()}
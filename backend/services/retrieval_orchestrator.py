@@ -0,0 +1,248 @@
+import asyncio
+import hashlib
+import logging
+import threading
+import time
+from concurrent.futures import wait
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from langchain.docstore.document import Document
+from langchain_core.callbacks import AsyncCallbackManagerForRetrieverRun, CallbackManagerForRetrieverRun
+from langchain_core.retrievers import BaseRetriever
+
+from backend.config.performance_config import RETRIEVAL_CONFIGS
+from backend.services.executors import get_executor, run_in_pool
+
+logger = logging.getLogger("ConfigGuidanceAPI")
+
+Hit = Tuple[Document, float]
+
+@dataclass
+class RetrievalBackend:
+    """One index queried for a request.
+
+    ``search(query, k)`` is blocking and returns ``(document, score)`` pairs,
+    best first, with higher scores better. Embedding backends also offer
+    ``search_by_vector(vector, k)``, used when the query was embedded once
+    up front.
+    """
+    name: str
+    search: Callable[[str, int], List[Hit]]
+    search_by_vector: Optional[Callable[[List[float], int], List[Hit]]] = None
+
+def vector_backend(name: str, store, **search_kwargs) -> RetrievalBackend:
+    """Dense search over a FAISS store; ``search_kwargs`` (e.g. ``search_params``) go to every search."""
+    from langchain_community.vectorstores.utils import DistanceStrategy
+
+    # FAISS returns distances for L2 and similarities for inner product
+    sign = 1.0 if getattr(store, "distance_strategy", None) == DistanceStrategy.MAX_INNER_PRODUCT else -1.0
+
+    def search(query: str, k: int) -> List[Hit]:
+        return [(doc, sign * float(score)) for doc, score in store.similarity_search_with_score(query, k, **search_kwargs)]
+
+    def search_by_vector(vector: List[float], k: int) -> List[Hit]:
+        return [(doc, sign * float(score))
+                for doc, score in store.similarity_search_with_score_by_vector(vector, k, **search_kwargs)]
+    return RetrievalBackend(name, search, search_by_vector)
+
+def lexical_backend(name: str, index, docstore, doc_filter=None) -> RetrievalBackend:
+    """BM25 search over a LexicalIndex, with documents fetched from the FAISS docstore.
+
+    ``doc_filter`` (e.g. a metadata Selection) limits the search to the documents it allows.
+    """
+    def search(query: str, k: int) -> List[Hit]:
+        hits = []
+        for doc_id, score in index.search(query, k, doc_filter=doc_filter):
+            document = docstore.search(doc_id)
+            if isinstance(document, Document):
+                hits.append((document, score))
+        return hits
+    return RetrievalBackend(name, search)
+
+def live_backend(name: str, live_index) -> RetrievalBackend:
+    """Cosine search over the live oc output index, capped at its own ``k``."""
+    return RetrievalBackend(name, lambda query, k: live_index.search(query),
+                            lambda vector, k: live_index.search_by_vector(vector))
+
+def chunk_id(document: Document) -> str:
+    """Identity used to merge the same chunk found by several backends."""
+    if document.id:
+        return document.id
+    source = str(document.metadata.get("source", ""))
+    return hashlib.sha1(f"{source}\0{document.page_content}".encode()).hexdigest()[:16]
+
+def fuse(rankings: Dict[str, List[Hit]], weights: Dict[str, float], method: str, rrf_k: int,
+         k: int) -> List[Tuple[Document, float, List[str]]]:
+    """Merge per-backend rankings into one, best first, as ``(document, fused score, backends)``.
+
+    ``rrf`` (reciprocal-rank fusion) sums ``weight / (rrf_k + rank)`` and
+    ignores the raw scores, which are not comparable across backends;
+    ``score`` min-max normalizes each backend's scores to [0, 1] and sums
+    them weighted.
+    """
+    scores: Dict[str, float] = {}
+    documents: Dict[str, Document] = {}
+    found_by: Dict[str, List[str]] = {}
+    for name, hits in rankings.items():
+        weight = weights.get(name, 1.0)
+        if method == "rrf":
+            contributions = [weight / (rrf_k + rank) for rank in range(1, len(hits) + 1)]
+        else:
+            raw = [score for _, score in hits]
+            low, high = min(raw, default=0.0), max(raw, default=0.0)
+            contributions = [weight * ((score - low) / (high - low) if high > low else 1.0) for score in raw]
+        seen = set()
+        for (document, _), contribution in zip(hits, contributions):
+            key = chunk_id(document)
+            if key in seen:
+                continue
+            seen.add(key)
+            scores[key] = scores.get(key, 0.0) + contribution
+            documents.setdefault(key, document)
+            found_by.setdefault(key, []).append(name)
+    ranked = sorted(scores, key=scores.get, reverse=True)[:k]
+    return [(documents[key], scores[key], found_by[key]) for key in ranked]
+
+@dataclass
+class FusedResult:
+    """Fused documents for one query plus how each backend did."""
+    documents: List[Document]
+    backends: Dict[str, Dict] = field(default_factory=dict)  # name -> status, latency_ms, hits
+    latency_ms: float = 0.0
+    rerank: Optional[Dict] = None  # Set when a reranker reordered (or declined to reorder) the documents
+    filters: Optional[Dict] = None  # Set when the global index was searched through a metadata filter
+
+    def report(self) -> Dict:
+        report = {"latency_ms": self.latency_ms, "fused": len(self.documents), "backends": self.backends}
+        if self.rerank is not None:
+            report["rerank"] = self.rerank
+        if self.filters is not None:
+            report["filters"] = self.filters
+        return report
+
+class RetrievalOrchestrator:
+    """Queries dense, lexical, session and live indexes concurrently and fuses the results.
+
+    Every backend runs in the ``retrieval`` pool under ``timeout_seconds``.
+    A backend that times out or fails contributes nothing to this query
+    (its search finishes in the background), so a slow index costs at most
+    the timeout instead of stalling retrieval. Returned documents are
+    copies carrying ``fusion_score`` and ``retrieved_by`` metadata.
+    """
+
+    def __init__(self, config: Dict = None):
+        self.config = config or RETRIEVAL_CONFIGS
+        self._stats: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+
+    def _record(self, name: str, status: str, latency_ms: float, hits: int) -> Dict:
+        with self._lock:
+            stats = self._stats.setdefault(name, {"calls": 0, "timeouts": 0, "errors": 0, "total_ms": 0.0, "max_ms": 0.0})
+            stats["calls"] += 1
+            stats["timeouts"] += status == "timeout"
+            stats["errors"] += status == "error"
+            stats["total_ms"] += latency_ms
+            stats["max_ms"] = max(stats["max_ms"], latency_ms)
+        return {"status": status, "latency_ms": round(latency_ms, 1), "hits": hits}
+
+    def _fused_result(self, outcomes: List[Tuple[str, List[Hit], Dict]], k: int, started: float) -> FusedResult:
+        rankings = {name: hits for name, hits, _ in outcomes}
+        fused = fuse(rankings, self.config["weights"], self.config["fusion"], self.config["rrf_k"], k)
+        documents = [
+            Document(id=document.id, page_content=document.page_content,
+                     metadata={**document.metadata, "fusion_score": round(score, 6), "retrieved_by": names})
+            for document, score, names in fused
+        ]
+        return FusedResult(documents, {name: report for name, _, report in outcomes},
+                           round((time.perf_counter() - started) * 1000, 1))
+
+    @staticmethod
+    def _call(backend: RetrievalBackend, query: str, query_vector: Optional[List[float]]):
+        if query_vector is not None and backend.search_by_vector is not None:
+            return backend.search_by_vector, query_vector
+        return backend.search, query
+
+    async def _search(self, backend: RetrievalBackend, query: str,
+                      query_vector: Optional[List[float]]) -> Tuple[str, List[Hit], Dict]:
+        started = time.perf_counter()
+        search, argument = self._call(backend, query, query_vector)
+        try:
+            hits = await asyncio.wait_for(
+                run_in_pool("retrieval", search, argument, self.config["candidates_per_backend"]),
+                self.config["timeout_seconds"]
+            )
+            status = "ok"
+        except asyncio.TimeoutError:
+            hits, status = [], "timeout"
+            logger.warning({"message": "Retrieval backend timed out", "backend": backend.name,
+                            "timeout_seconds": self.config["timeout_seconds"]})
+        except Exception as e:
+            hits, status = [], "error"
+            logger.warning({"message": "Retrieval backend failed", "backend": backend.name, "error": str(e)})
+        return backend.name, hits, self._record(backend.name, status, (time.perf_counter() - started) * 1000, len(hits))
+
+    async def retrieve(self, query: str, backends: List[RetrievalBackend], k: int = None,
+                       query_vector: List[float] = None) -> FusedResult:
+        """Search every backend; with ``query_vector``, embedding backends skip embedding the query."""
+        started = time.perf_counter()
+        outcomes = await asyncio.gather(*(self._search(backend, query, query_vector) for backend in backends))
+        return self._fused_result(list(outcomes), k or self.config["k"], started)
+
+    def retrieve_sync(self, query: str, backends: List[RetrievalBackend], k: int = None,
+                      query_vector: List[float] = None) -> FusedResult:
+        """Blocking variant for synchronous chains; same fan-out, timeout and fusion."""
+        started = time.perf_counter()
+        finished: Dict[str, float] = {}
+
+        def timed(backend: RetrievalBackend):
+            search, argument = self._call(backend, query, query_vector)
+            try:
+                return search(argument, self.config["candidates_per_backend"])
+            finally:
+                finished[backend.name] = time.perf_counter()
+
+        executor = get_executor("retrieval")
+        futures = {backend.name: executor.submit(timed, backend) for backend in backends}
+        wait(futures.values(), timeout=self.config["timeout_seconds"])
+        outcomes = []
+        for name, future in futures.items():
+            if not future.done():
+                hits, status = [], "timeout"
+                logger.warning({"message": "Retrieval backend timed out", "backend": name,
+                                "timeout_seconds": self.config["timeout_seconds"]})
+            elif future.exception() is not None:
+                hits, status = [], "error"
+                logger.warning({"message": "Retrieval backend failed", "backend": name, "error": str(future.exception())})
+            else:
+                hits, status = future.result(), "ok"
+            latency_ms = (finished.get(name, time.perf_counter()) - started) * 1000
+            outcomes.append((name, hits, self._record(name, status, latency_ms, len(hits))))
+        return self._fused_result(outcomes, k or self.config["k"], started)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                name: {
+                    "calls": stats["calls"],
+                    "timeouts": stats["timeouts"],
+                    "errors": stats["errors"],
+                    "avg_ms": round(stats["total_ms"] / stats["calls"], 1) if stats["calls"] else 0.0,
+                    "max_ms": round(stats["max_ms"], 1)
+                }
+                for name, stats in self._stats.items()
+            }
+
+class FusionRetriever(BaseRetriever):
+    """LangChain retriever over a fixed set of backends, for chains such as RetrievalQA."""
+
+    orchestrator: Any
+    backends: List[Any]
+    k: int = 5
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        return self.orchestrator.retrieve_sync(query, self.backends, self.k).documents
+
+    async def _aget_relevant_documents(self, query: str, *,
+                                       run_manager: AsyncCallbackManagerForRetrieverRun) -> List[Document]:
+        return (await self.orchestrator.retrieve(query, self.backends, self.k)).documents
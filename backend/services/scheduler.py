@@ -0,0 +1,221 @@
+import asyncio
+import logging
+import math
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import Callable, Deque, Dict, Optional
+
+from backend.config.performance_config import SCHEDULER_CONFIGS
+
+logger = logging.getLogger("ConfigGuidanceAPI")
+
+class SchedulerRejected(Exception):
+    """Raised when a generation request is not admitted (mapped to 429/503)."""
+
+    def __init__(self, status_code: int, detail: str, retry_after: int):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+        self.retry_after = retry_after
+
+@dataclass
+class GenerationSlot:
+    """A granted generation slot and its timing."""
+    model: str
+    chat_id: str
+    wait_time: float
+    deadline: float
+
+    def remaining(self) -> float:
+        """Seconds left before the request's deadline."""
+        return max(0.0, self.deadline - time.monotonic())
+
+@dataclass
+class _Waiter:
+    chat_id: str
+    future: asyncio.Future
+    enqueued_at: float
+
+@dataclass
+class _ModelQueue:
+    """Per-model concurrency state and statistics."""
+    model: str
+    max_concurrent: int
+    service_time: float
+    active: int = 0
+    depth: int = 0
+    # chat_id -> waiters, iterated round-robin so one chat cannot starve others
+    chats: "OrderedDict[str, Deque[_Waiter]]" = field(default_factory=OrderedDict)
+    wait_times: Deque[float] = field(default_factory=deque)
+    admitted: int = 0
+    rejected: int = 0
+    timed_out: int = 0
+
+class GenerationScheduler:
+    """Admission control and fair queueing for LLM generations.
+
+    Each model runs at most ``max_in_flight`` generations at once. Excess
+    requests wait in per-chat queues that are served round-robin, and requests
+    that cannot start before their deadline are rejected up front.
+    """
+
+    def __init__(self, concurrency_for: Callable[[str], int], config: Dict = None):
+        self.concurrency_for = concurrency_for
+        self.config = config or SCHEDULER_CONFIGS
+        self._queues: Dict[str, _ModelQueue] = {}
+
+    def _queue(self, model: str) -> _ModelQueue:
+        queue = self._queues.get(model)
+        if queue is None:
+            queue = _ModelQueue(
+                model=model,
+                max_concurrent=self.concurrency_for(model),
+                service_time=self.config["initial_service_time"],
+                wait_times=deque(maxlen=self.config["wait_time_window"])
+            )
+            self._queues[model] = queue
+        return queue
+
+    def estimate_wait(self, model: str) -> float:
+        """Estimated seconds a new request would wait before starting."""
+        queue = self._queue(model)
+        if queue.active < queue.max_concurrent and queue.depth == 0:
+            return 0.0
+        rounds = math.ceil((queue.depth + 1) / queue.max_concurrent)
+        return rounds * queue.service_time
+
+    def admit(self, model: str, chat_id: str, deadline_seconds: Optional[float] = None):
+        """Raise SchedulerRejected if a request would not be admitted right now."""
+        queue = self._queue(model)
+        if queue.active < queue.max_concurrent and queue.depth == 0:
+            return
+
+        deadline_seconds = deadline_seconds or self.config["default_deadline"]
+        estimated_wait = self.estimate_wait(model)
+        retry_after = max(1, math.ceil(estimated_wait))
+
+        if queue.depth >= self.config["max_queue_depth"]:
+            queue.rejected += 1
+            raise SchedulerRejected(429, f"Too many queued requests for {model}. Please retry later.", retry_after)
+
+        waiting_for_chat = len(queue.chats.get(chat_id, ()))
+        if waiting_for_chat >= self.config["max_queued_per_chat"]:
+            queue.rejected += 1
+            raise SchedulerRejected(429, "This chat already has requests waiting. Please retry later.", retry_after)
+
+        if estimated_wait >= deadline_seconds:
+            queue.rejected += 1
+            raise SchedulerRejected(
+                503, f"Estimated wait of {estimated_wait:.0f}s exceeds the request deadline.", retry_after
+            )
+
+    @asynccontextmanager
+    async def slot(self, model: str, chat_id: str, deadline_seconds: Optional[float] = None):
+        """Wait for a generation slot for ``model`` and hold it for the block."""
+        queue = self._queue(model)
+        enqueued_at = time.monotonic()
+        deadline = enqueued_at + (deadline_seconds or self.config["default_deadline"])
+
+        if queue.active < queue.max_concurrent and queue.depth == 0:
+            queue.active += 1
+        else:
+            self.admit(model, chat_id, deadline_seconds)
+            await self._wait_for_turn(queue, chat_id, enqueued_at, deadline)
+
+        wait_time = time.monotonic() - enqueued_at
+        queue.wait_times.append(wait_time)
+        queue.admitted += 1
+
+        started_at = time.monotonic()
+        try:
+            yield GenerationSlot(model=model, chat_id=chat_id, wait_time=wait_time, deadline=deadline)
+        finally:
+            elapsed = time.monotonic() - started_at
+            smoothing = self.config["service_time_smoothing"]
+            queue.service_time = (1 - smoothing) * queue.service_time + smoothing * elapsed
+            self._release(queue)
+
+    async def _wait_for_turn(self, queue: _ModelQueue, chat_id: str, enqueued_at: float, deadline: float):
+        """Queue behind other requests until _dispatch hands this request a slot."""
+        waiter = _Waiter(chat_id=chat_id, future=asyncio.get_running_loop().create_future(), enqueued_at=enqueued_at)
+        queue.chats.setdefault(chat_id, deque()).append(waiter)
+        queue.depth += 1
+
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter.future), timeout=max(0.0, deadline - time.monotonic()))
+        except asyncio.TimeoutError:
+            if waiter.future.done() and not waiter.future.cancelled():
+                return  # Granted at the last moment
+            self._discard(queue, waiter)
+            queue.timed_out += 1
+            raise SchedulerRejected(
+                503, f"Request deadline exceeded while waiting for {queue.model}.",
+                max(1, math.ceil(self.estimate_wait(queue.model)))
+            )
+        except asyncio.CancelledError:
+            if waiter.future.done() and not waiter.future.cancelled():
+                # The slot was handed over just as the client went away
+                self._release(queue)
+            else:
+                self._discard(queue, waiter)
+            raise
+
+    def _discard(self, queue: _ModelQueue, waiter: _Waiter):
+        """Remove a waiter that gave up before being granted a slot."""
+        waiter.future.cancel()
+        waiters = queue.chats.get(waiter.chat_id)
+        if waiters and waiter in waiters:
+            waiters.remove(waiter)
+            queue.depth -= 1
+            if not waiters:
+                del queue.chats[waiter.chat_id]
+
+    def _release(self, queue: _ModelQueue):
+        queue.active -= 1
+        self._dispatch(queue)
+
+    def _dispatch(self, queue: _ModelQueue):
+        """Hand free slots to waiting requests, one chat at a time."""
+        while queue.active < queue.max_concurrent and queue.chats:
+            chat_id, waiters = next(iter(queue.chats.items()))
+            waiter = waiters.popleft()
+            queue.depth -= 1
+
+            # Rotate this chat to the back so the next slot goes to another chat
+            del queue.chats[chat_id]
+            if waiters:
+                queue.chats[chat_id] = waiters
+
+            if waiter.future.done():
+                continue
+            queue.active += 1
+            waiter.future.set_result(True)
+
+    def stats(self) -> Dict[str, Dict]:
+        """Queue depth, concurrency and wait time statistics per model."""
+        stats = {}
+        for model, queue in self._queues.items():
+            waits = sorted(queue.wait_times)
+            stats[model] = {
+                "active": queue.active,
+                "max_concurrent": queue.max_concurrent,
+                "queued": queue.depth,
+                "queued_chats": len(queue.chats),
+                "admitted": queue.admitted,
+                "rejected": queue.rejected,
+                "timed_out": queue.timed_out,
+                "avg_wait_seconds": round(sum(waits) / len(waits), 3) if waits else 0.0,
+                "p95_wait_seconds": round(waits[int(0.95 * (len(waits) - 1))], 3) if waits else 0.0,
+                "avg_generation_seconds": round(queue.service_time, 3),
+                "estimated_wait_seconds": round(self.estimate_wait(model), 3)
+            }
+        return stats
+
+def _default_concurrency(model: str) -> int:
+    from backend.services.llm_pool import llm_registry
+    return llm_registry.max_in_flight(model)
+
+# Global instance
+generation_scheduler = GenerationScheduler(_default_concurrency)
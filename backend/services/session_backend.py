@@ -0,0 +1,289 @@
+import json
+import logging
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from backend.config.performance_config import SESSION_BACKEND_CONFIGS
+
+logger = logging.getLogger("ConfigGuidanceAPI")
+
+def document_bytes(doc: Dict) -> int:
+    """Approximate size of a parsed document."""
+    return len(doc.get("content", "")) + len(json.dumps(doc.get("metadata", {}), default=str))
+
+class SessionBackend(ABC):
+    """Storage for chat session documents, serialized session vectors and conversation state."""
+
+    # True when other workers see the same sessions (session data is not process-local)
+    shared = False
+
+    @abstractmethod
+    def touch(self, chat_id: str):
+        """Create the session if needed and mark it as recently used."""
+
+    @abstractmethod
+    def exists(self, chat_id: str) -> bool: ...
+
+    @abstractmethod
+    def get_files(self, chat_id: str, start: int = 0) -> List[Dict]:
+        """The session's files from upload number ``start`` on, in upload order."""
+
+    @abstractmethod
+    def file_count(self, chat_id: str) -> int: ...
+
+    @abstractmethod
+    def add_file(self, chat_id: str, doc: Dict) -> int:
+        """Append a parsed upload; returns the session's file count."""
+
+    @abstractmethod
+    def get_vectors(self, chat_id: str) -> Tuple[Optional[bytes], int]:
+        """Serialized session index and the number of files it covers."""
+
+    @abstractmethod
+    def put_vectors(self, chat_id: str, data: bytes, file_count: int): ...
+
+    @abstractmethod
+    def get_state(self, chat_id: str) -> Dict: ...
+
+    @abstractmethod
+    def set_state(self, chat_id: str, state: Dict): ...
+
+    @abstractmethod
+    def delete(self, chat_id: str) -> bool: ...
+
+    @abstractmethod
+    def clear(self) -> int: ...
+
+    @abstractmethod
+    def sessions_by_last_used(self) -> List[Tuple[str, float]]:
+        """``(chat_id, last_used)`` pairs, least recently used first."""
+
+    @abstractmethod
+    def document_bytes(self, chat_id: str) -> int: ...
+
+    @abstractmethod
+    def summary(self) -> Dict:
+        """Session, file and document byte totals across all sessions."""
+
+    def local_document_bytes(self) -> int:
+        """Document bytes held in this process's memory."""
+        return 0 if self.shared else self.summary()["document_bytes"]
+
+class InMemorySessionBackend(SessionBackend):
+    """Process-local sessions; the default for single-worker deployments."""
+
+    shared = False
+
+    def __init__(self):
+        self._sessions: "OrderedDict[str, Dict]" = OrderedDict()
+        self._lock = threading.RLock()
+
+    def touch(self, chat_id: str):
+        with self._lock:
+            session = self._sessions.get(chat_id)
+            if session is None:
+                session = {
+                    "files": [],  # Files uploaded in this chat session
+                    "state": {"context": []},  # Conversation state for this session
+                    "vectors": None,
+                    "vectors_file_count": 0,
+                    "created_at": time.time(),
+                    "document_bytes": 0
+                }
+                self._sessions[chat_id] = session
+            session["last_used"] = time.time()
+            self._sessions.move_to_end(chat_id)
+
+    def exists(self, chat_id: str) -> bool:
+        return chat_id in self._sessions
+
+    def get_files(self, chat_id: str, start: int = 0) -> List[Dict]:
+        session = self._sessions.get(chat_id)
+        return session["files"][start:] if session else []
+
+    def file_count(self, chat_id: str) -> int:
+        session = self._sessions.get(chat_id)
+        return len(session["files"]) if session else 0
+
+    def add_file(self, chat_id: str, doc: Dict) -> int:
+        with self._lock:
+            self.touch(chat_id)
+            session = self._sessions[chat_id]
+            session["files"].append(doc)
+            session["document_bytes"] += document_bytes(doc)
+            return len(session["files"])
+
+    def get_vectors(self, chat_id: str) -> Tuple[Optional[bytes], int]:
+        session = self._sessions.get(chat_id)
+        if not session:
+            return None, 0
+        return session["vectors"], session["vectors_file_count"]
+
+    def put_vectors(self, chat_id: str, data: bytes, file_count: int):
+        with self._lock:
+            session = self._sessions.get(chat_id)
+            if session:
+                session["vectors"], session["vectors_file_count"] = data, file_count
+
+    def get_state(self, chat_id: str) -> Dict:
+        session = self._sessions.get(chat_id)
+        return dict(session["state"]) if session else {"context": []}
+
+    def set_state(self, chat_id: str, state: Dict):
+        with self._lock:
+            self.touch(chat_id)
+            self._sessions[chat_id]["state"] = dict(state)
+
+    def delete(self, chat_id: str) -> bool:
+        with self._lock:
+            return self._sessions.pop(chat_id, None) is not None
+
+    def clear(self) -> int:
+        with self._lock:
+            count = len(self._sessions)
+            self._sessions.clear()
+            return count
+
+    def sessions_by_last_used(self) -> List[Tuple[str, float]]:
+        with self._lock:
+            return [(chat_id, session["last_used"]) for chat_id, session in self._sessions.items()]
+
+    def document_bytes(self, chat_id: str) -> int:
+        session = self._sessions.get(chat_id)
+        return session["document_bytes"] if session else 0
+
+    def summary(self) -> Dict:
+        with self._lock:
+            sessions = list(self._sessions.values())
+        return {
+            "sessions": len(sessions),
+            "files": sum(len(session["files"]) for session in sessions),
+            "document_bytes": sum(session["document_bytes"] for session in sessions)
+        }
+
+class RedisSessionBackend(SessionBackend):
+    """Sessions in Redis (or any Redis-protocol server) so every worker can serve every chat.
+
+    Keys per session, all expiring ``idle_ttl_seconds`` after the last use:
+    ``<prefix><chat_id>:meta`` (hash), ``:files`` (list of JSON documents),
+    ``:vectors`` (serialized FAISS index) and ``:state`` (JSON). A sorted set
+    ``<prefix>lru`` orders sessions by last use for eviction.
+    """
+
+    shared = True
+
+    def __init__(self, config: Dict = None, client=None):
+        self.config = config or SESSION_BACKEND_CONFIGS
+        if client is None:
+            try:
+                import redis
+            except ImportError:
+                raise RuntimeError("SESSION_BACKEND=redis requires the 'redis' package")
+            client = redis.Redis.from_url(self.config["redis_url"])
+        self.client = client
+        self.prefix = self.config["key_prefix"]
+        self.ttl = int(self.config["idle_ttl_seconds"])
+        self.lru_key = f"{self.prefix}lru"
+
+    def _key(self, chat_id: str, part: str) -> str:
+        return f"{self.prefix}{chat_id}:{part}"
+
+    def _keys(self, chat_id: str) -> List[str]:
+        return [self._key(chat_id, part) for part in ("meta", "files", "vectors", "state")]
+
+    def touch(self, chat_id: str):
+        now = time.time()
+        pipe = self.client.pipeline()
+        pipe.hsetnx(self._key(chat_id, "meta"), "created_at", now)
+        pipe.hset(self._key(chat_id, "meta"), "last_used", now)
+        pipe.zadd(self.lru_key, {chat_id: now})
+        for key in self._keys(chat_id):
+            pipe.expire(key, self.ttl)
+        pipe.execute()
+
+    def exists(self, chat_id: str) -> bool:
+        return bool(self.client.exists(self._key(chat_id, "meta")))
+
+    def get_files(self, chat_id: str, start: int = 0) -> List[Dict]:
+        return [json.loads(raw) for raw in self.client.lrange(self._key(chat_id, "files"), start, -1)]
+
+    def file_count(self, chat_id: str) -> int:
+        return self.client.llen(self._key(chat_id, "files"))
+
+    def add_file(self, chat_id: str, doc: Dict) -> int:
+        self.touch(chat_id)
+        pipe = self.client.pipeline()
+        pipe.rpush(self._key(chat_id, "files"), json.dumps(doc, default=str))
+        pipe.hincrby(self._key(chat_id, "meta"), "document_bytes", document_bytes(doc))
+        pipe.expire(self._key(chat_id, "files"), self.ttl)
+        count, _, _ = pipe.execute()
+        return count
+
+    def get_vectors(self, chat_id: str) -> Tuple[Optional[bytes], int]:
+        pipe = self.client.pipeline()
+        pipe.get(self._key(chat_id, "vectors"))
+        pipe.hget(self._key(chat_id, "meta"), "vectors_file_count")
+        data, file_count = pipe.execute()
+        return data, int(file_count or 0)
+
+    def put_vectors(self, chat_id: str, data: bytes, file_count: int):
+        pipe = self.client.pipeline()
+        pipe.set(self._key(chat_id, "vectors"), data, ex=self.ttl)
+        pipe.hset(self._key(chat_id, "meta"), "vectors_file_count", file_count)
+        pipe.execute()
+
+    def get_state(self, chat_id: str) -> Dict:
+        raw = self.client.get(self._key(chat_id, "state"))
+        return json.loads(raw) if raw else {"context": []}
+
+    def set_state(self, chat_id: str, state: Dict):
+        self.touch(chat_id)
+        self.client.set(self._key(chat_id, "state"), json.dumps(state, default=str), ex=self.ttl)
+
+    def delete(self, chat_id: str) -> bool:
+        pipe = self.client.pipeline()
+        pipe.delete(*self._keys(chat_id))
+        pipe.zrem(self.lru_key, chat_id)
+        deleted, _ = pipe.execute()
+        return deleted > 0
+
+    def clear(self) -> int:
+        chat_ids = [chat_id for chat_id, _ in self.sessions_by_last_used()]
+        for chat_id in chat_ids:
+            self.delete(chat_id)
+        return len(chat_ids)
+
+    def sessions_by_last_used(self) -> List[Tuple[str, float]]:
+        # Sessions whose keys expired are pruned from the LRU set here
+        self.client.zremrangebyscore(self.lru_key, "-inf", time.time() - self.ttl)
+        return [
+            (chat_id.decode() if isinstance(chat_id, bytes) else chat_id, score)
+            for chat_id, score in self.client.zrange(self.lru_key, 0, -1, withscores=True)
+        ]
+
+    def document_bytes(self, chat_id: str) -> int:
+        return int(self.client.hget(self._key(chat_id, "meta"), "document_bytes") or 0)
+
+    def summary(self) -> Dict:
+        chat_ids = [chat_id for chat_id, _ in self.sessions_by_last_used()]
+        pipe = self.client.pipeline()
+        for chat_id in chat_ids:
+            pipe.llen(self._key(chat_id, "files"))
+            pipe.hget(self._key(chat_id, "meta"), "document_bytes")
+        values = pipe.execute() if chat_ids else []
+        return {
+            "sessions": len(chat_ids),
+            "files": sum(int(value) for value in values[0::2]),
+            "document_bytes": sum(int(value or 0) for value in values[1::2])
+        }
+
+def create_session_backend(config: Dict = None) -> SessionBackend:
+    """Build the backend selected by SESSION_BACKEND ("memory" or "redis")."""
+    config = config or SESSION_BACKEND_CONFIGS
+    if config["backend"] == "redis":
+        logger.info({"message": "Using Redis session backend", "url": config["redis_url"]})
+        return RedisSessionBackend(config)
+    return InMemorySessionBackend()
@@ -0,0 +1,206 @@
+import asyncio
+import logging
+import threading
+import time
+from typing import Dict, List, Optional
+
+from backend.config.performance_config import SESSION_BACKEND_CONFIGS, SESSION_CONFIGS
+from backend.services.executors import run_cpu_bound
+from backend.services.session_backend import InMemorySessionBackend, SessionBackend
+
+logger = logging.getLogger("ConfigGuidanceAPI")
+
+class SessionManager:
+    """Bounded store of chat sessions and their uploaded documents.
+
+    Session data lives in a ``SessionBackend``: in this process by default,
+    or in Redis so that any worker can serve any chat. Sessions are evicted
+    when idle for longer than ``idle_ttl_seconds`` or when there are more
+    than ``max_sessions`` of them. When the estimated memory of this
+    process's documents plus session indexes exceeds ``max_total_bytes``,
+    resident session indexes are spilled to disk first; then whole sessions
+    are dropped (in-process backend) or only local indexes (shared backend,
+    which can rebuild them from the stored vectors).
+    """
+
+    def __init__(self, session_indexes, config: Dict = None, backend: Optional[SessionBackend] = None,
+                 backend_config: Dict = None):
+        self.session_indexes = session_indexes
+        self.config = config or SESSION_CONFIGS
+        self.backend = backend or InMemorySessionBackend()
+        self.backend_config = backend_config or SESSION_BACKEND_CONFIGS
+        self._lock = threading.RLock()
+        self._evictions = {"idle": 0, "max_sessions": 0, "max_bytes": 0, "index_spilled": 0, "index_dropped": 0}
+        self._sweeper: Optional[asyncio.Task] = None
+
+    def __contains__(self, chat_id: str) -> bool:
+        return self.backend.exists(chat_id)
+
+    def ensure(self, chat_id: str):
+        """Create the session if needed and mark it as recently used."""
+        self.backend.touch(chat_id)
+
+    def files(self, chat_id: str) -> List[Dict]:
+        return self.backend.get_files(chat_id)
+
+    def add_file(self, chat_id: str, doc: Dict) -> int:
+        """Attach a parsed upload to a session, then enforce the limits; returns the session's file count."""
+        with self._lock:
+            count = self.backend.add_file(chat_id, doc)
+            self._enforce_limits(keep=chat_id)
+        return count
+
+    def get_state(self, chat_id: str) -> Dict:
+        """Conversation state kept alongside the session's files."""
+        return self.backend.get_state(chat_id)
+
+    def set_state(self, chat_id: str, state: Dict):
+        self.backend.set_state(chat_id, state)
+
+    def session_retriever(self, chat_id: str, **kwargs):
+        """Retriever over the session's uploads, or None if it has none.
+
+        The local index is brought up to date with the stored files: restored
+        from the backend's serialized vectors when this worker has no index,
+        then extended with only the files it has not indexed yet. Only the
+        file count is read when the index is already current.
+        """
+        file_count = self.backend.file_count(chat_id)
+        if not file_count:
+            return None
+
+        session_index = self.session_indexes.get(chat_id)
+        if session_index is not None and session_index.file_count > file_count:
+            # The session was cleared and re-created elsewhere; this index is stale
+            self.session_indexes.remove(chat_id)
+            session_index = None
+        share_vectors = self.backend.shared and self.backend_config["store_vectors"]
+        if session_index is None and share_vectors:
+            data, vectors_file_count = self.backend.get_vectors(chat_id)
+            if data and vectors_file_count <= file_count:
+                try:
+                    session_index = self.session_indexes.restore(chat_id, data, vectors_file_count)
+                except Exception as e:
+                    logger.warning({"message": "Failed to restore session vectors", "chat_id": chat_id, "error": str(e)})
+
+        newly_indexed = self.session_indexes.index_files(
+            chat_id, file_count, lambda start: self.backend.get_files(chat_id, start)
+        )
+        if newly_indexed and share_vectors:
+            data = self.session_indexes.serialize(chat_id)
+            if data:
+                self.backend.put_vectors(chat_id, data, file_count)
+
+        logger.info({"message": "Using session-specific vector store", "chat_id": chat_id,
+                     "documents": file_count, "newly_indexed": newly_indexed})
+        return self.session_indexes.as_retriever(chat_id, **kwargs)
+
+    def remove(self, chat_id: str) -> bool:
+        """Drop a session and its index; returns whether anything was removed."""
+        with self._lock:
+            removed = self.backend.delete(chat_id)
+        return self.session_indexes.remove(chat_id) or removed
+
+    def clear(self):
+        """Drop every session; returns (sessions, indexes) cleared."""
+        with self._lock:
+            session_count = self.backend.clear()
+        return session_count, self.session_indexes.clear()
+
+    def total_bytes(self) -> int:
+        """Estimated memory of session documents and indexes held by this process."""
+        return self.backend.local_document_bytes() + self.session_indexes.stats()["memory_bytes"]
+
+    def _drop(self, chat_id: str, reason: str):
+        self.backend.delete(chat_id)
+        self.session_indexes.remove(chat_id)
+        self._evictions[reason] += 1
+        logger.info({"message": "Evicted chat session", "chat_id": chat_id, "reason": reason})
+
+    def _enforce_limits(self, keep: Optional[str] = None):
+        """Evict idle and least recently used sessions until all limits hold."""
+        now = time.time()
+        sessions = self.backend.sessions_by_last_used()  # Least recently used first
+        live = []
+        for chat_id, last_used in sessions:
+            if chat_id != keep and now - last_used > self.config["idle_ttl_seconds"]:
+                self._drop(chat_id, "idle")
+            else:
+                live.append(chat_id)
+
+        excess = len(live) - self.config["max_sessions"]
+        for chat_id in [c for c in live if c != keep][:max(0, excess)]:
+            self._drop(chat_id, "max_sessions")
+            live.remove(chat_id)
+
+        if self.total_bytes() <= self.config["max_total_bytes"]:
+            return
+        # Spilling indexes keeps the sessions usable, so try that before dropping sessions
+        for chat_id in live:
+            if chat_id == keep:
+                continue
+            session_index = self.session_indexes.get(chat_id)
+            if session_index and session_index.in_memory and self.session_indexes.spill(chat_id):
+                self._evictions["index_spilled"] += 1
+                if self.total_bytes() <= self.config["max_total_bytes"]:
+                    return
+        for chat_id in live:
+            if chat_id == keep:
+                continue
+            if self.backend.shared:
+                # Other workers may be using the session; only release this worker's copy
+                if self.session_indexes.remove(chat_id):
+                    self._evictions["index_dropped"] += 1
+            else:
+                self._drop(chat_id, "max_bytes")
+            if self.total_bytes() <= self.config["max_total_bytes"]:
+                return
+
+    def sweep(self):
+        """Apply idle TTL and memory limits; also run by the background sweeper."""
+        with self._lock:
+            self._enforce_limits()
+        self.session_indexes.evict_idle()
+
+    async def _sweep_forever(self):
+        interval = self.config["sweep_interval_seconds"]
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await run_cpu_bound(self.sweep)
+            except Exception as e:
+                logger.warning({"message": "Session sweep failed", "error": str(e)})
+
+    def start_sweeper(self):
+        """Start the periodic sweep on the running event loop."""
+        if self._sweeper is None or self._sweeper.done():
+            self._sweeper = asyncio.get_running_loop().create_task(self._sweep_forever())
+
+    async def stop_sweeper(self):
+        if self._sweeper is not None:
+            self._sweeper.cancel()
+            try:
+                await self._sweeper
+            except asyncio.CancelledError:
+                pass
+            self._sweeper = None
+
+    def stats(self) -> Dict:
+        """Live session counts, estimated memory and eviction counters."""
+        summary = self.backend.summary()
+        indexes = self.session_indexes.stats()
+        local_document_bytes = self.backend.local_document_bytes()
+        return {
+            "backend": type(self.backend).__name__,
+            "shared": self.backend.shared,
+            "sessions": summary["sessions"],
+            "files": summary["files"],
+            "document_bytes": summary["document_bytes"],
+            "index_bytes": indexes["memory_bytes"],
+            "estimated_total_bytes": local_document_bytes + indexes["memory_bytes"],
+            "max_sessions": self.config["max_sessions"],
+            "max_total_bytes": self.config["max_total_bytes"],
+            "idle_ttl_seconds": self.config["idle_ttl_seconds"],
+            "evictions": dict(self._evictions),
+            "indexes": indexes
+        }
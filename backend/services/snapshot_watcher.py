@@ -0,0 +1,82 @@
+import asyncio
+import logging
+from typing import Callable, Dict, Optional
+
+from backend.config.performance_config import SNAPSHOT_CONFIGS
+from backend.services.executors import run_cpu_bound
+from backend.vector_store.snapshots import SnapshotStore
+
+logger = logging.getLogger("ConfigGuidanceAPI")
+
+class SnapshotWatcher:
+    """Hot-swaps the served FAISS index when a new snapshot becomes current.
+
+    ``reload(version, path)`` loads the snapshot and swaps it in; it runs in
+    the CPU pool, so requests keep being served from the old index (and
+    requests already holding its retriever finish on it) until the swap.
+    A version that failed to load is not retried until CURRENT changes again.
+    """
+
+    def __init__(self, snapshots: SnapshotStore, reload: Callable[[str, object], None],
+                 is_ready: Callable[[], bool] = lambda: True, config: Dict = None):
+        self.snapshots = snapshots
+        self.reload = reload
+        self.is_ready = is_ready  # False while the initial index load is still running
+        self.config = config or SNAPSHOT_CONFIGS
+        self.loaded_version: Optional[str] = None
+        self.failed_version: Optional[str] = None
+        self.swaps = 0
+        self._task: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+
+    async def check(self) -> bool:
+        """Swap to the current snapshot if it is not the one being served; returns whether it swapped."""
+        async with self._lock:
+            if not self.is_ready():
+                return False
+            version = self.snapshots.current_version()
+            if version is None or version in (self.loaded_version, self.failed_version):
+                return False
+            try:
+                await run_cpu_bound(self.reload, version, self.snapshots.path(version))
+            except Exception as e:
+                self.failed_version = version
+                logger.error({"message": "Failed to load FAISS index snapshot, still serving the previous one",
+                              "version": version, "serving": self.loaded_version, "error": str(e)})
+                return False
+            logger.info({"message": "Swapped FAISS index snapshot", "from": self.loaded_version, "to": version})
+            self.loaded_version, self.failed_version = version, None
+            self.swaps += 1
+            return True
+
+    async def _watch_forever(self):
+        while True:
+            await asyncio.sleep(self.config["poll_interval_seconds"])
+            try:
+                await self.check()
+            except Exception as e:
+                logger.warning({"message": "FAISS snapshot check failed", "error": str(e)})
+
+    def start(self):
+        """Start polling on the running event loop (if ``hot_swap`` is enabled)."""
+        if self.config["hot_swap"] and (self._task is None or self._task.done()):
+            self._task = asyncio.get_running_loop().create_task(self._watch_forever())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def status(self) -> Dict:
+        return {
+            "loaded_version": self.loaded_version,
+            "current_version": self.snapshots.current_version(),
+            "failed_version": self.failed_version,
+            "swaps": self.swaps,
+            "hot_swap": self.config["hot_swap"],
+            "snapshots": self.snapshots.versions()
+        }
@@ -0,0 +1,176 @@
+import asyncio
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from backend.config.performance_config import STARTUP_CONFIGS
+from backend.services.executors import run_cpu_bound, run_io_bound
+
+logger = logging.getLogger("ConfigGuidanceAPI")
+
+PENDING, LOADING, READY, FAILED = "pending", "loading", "ready", "failed"
+
+class ComponentsNotReady(Exception):
+    """Raised when a request needs components that are still loading (mapped to 503)."""
+
+    def __init__(self, components: List[str], retry_after: int):
+        self.status_code = 503
+        self.detail = f"Service is starting up; not ready yet: {', '.join(components)}"
+        self.components = components
+        self.retry_after = retry_after
+        super().__init__(self.detail)
+
+@dataclass
+class Component:
+    """An expensive dependency loaded once, either in the background or on first use."""
+    name: str
+    loader: Callable[[], Any]
+    depends_on: Sequence[str] = ()
+    required: bool = True  # Counts towards /readyz
+    pool: str = "cpu"      # Executor the background load runs on: "cpu" or "io"
+    retry: bool = False    # Keep retrying in the background after a failure
+    state: str = PENDING
+    value: Any = None
+    error: Optional[str] = None
+    attempts: int = 0
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+    task: Optional[asyncio.Task] = field(default=None, repr=False)
+
+    def to_dict(self) -> Dict:
+        duration = None
+        if self.started_at is not None:
+            duration = round((self.finished_at or time.time()) - self.started_at, 2)
+        return {
+            "state": self.state,
+            "required": self.required,
+            "depends_on": list(self.depends_on),
+            "attempts": self.attempts,
+            "seconds": duration,
+            "error": self.error
+        }
+
+class StartupOrchestrator:
+    """Brings the app up immediately and loads expensive components behind it.
+
+    Components are registered with their dependencies. ``start()`` warms
+    them concurrently in the executor pools without blocking the event loop,
+    each one as soon as its dependencies are ready. ``get()`` loads a
+    component synchronously on first use if the background load has not got
+    to it yet, and ``require()`` rejects requests with a 503 until the
+    components they need are ready.
+    """
+
+    def __init__(self, config: Dict = None):
+        self.config = config or STARTUP_CONFIGS
+        self.components: Dict[str, Component] = {}
+        self.started_at = time.time()
+
+    def register(self, name: str, loader: Callable[[], Any], depends_on: Sequence[str] = (),
+                 required: bool = True, pool: str = "cpu", retry: bool = False):
+        self.components[name] = Component(name, loader, tuple(depends_on), required, pool, retry)
+
+    def is_ready(self, name: str) -> bool:
+        return self.components[name].state == READY
+
+    def get(self, name: str) -> Any:
+        """Return the component's value, loading it (and its dependencies) now if needed."""
+        return self._load(name)
+
+    def _load(self, name: str) -> Any:
+        component = self.components[name]
+        if component.state == READY:
+            return component.value
+        with component.lock:
+            if component.state == READY:  # Loaded by another thread while we waited
+                return component.value
+            component.state = LOADING
+            component.attempts += 1
+            component.started_at, component.finished_at = time.time(), None
+            try:
+                for dependency in component.depends_on:
+                    self._load(dependency)
+                component.value = component.loader()
+            except Exception as e:
+                component.state, component.error = FAILED, f"{type(e).__name__}: {e}"
+                component.finished_at = time.time()
+                logger.error({"message": "Failed to load component", "component": name, "error": component.error})
+                raise
+            component.state, component.error = READY, None
+            component.finished_at = time.time()
+            logger.info({"message": "Loaded component", "component": name,
+                         "seconds": round(component.finished_at - component.started_at, 2)})
+            return component.value
+
+    async def _run(self, component: Component):
+        """Background load: wait for dependencies, then load in the component's pool."""
+        run_in_pool = run_io_bound if component.pool == "io" else run_cpu_bound
+        while True:
+            try:
+                for dependency in component.depends_on:
+                    self._schedule(dependency)
+                await asyncio.gather(*(
+                    self.components[dependency].task for dependency in component.depends_on
+                    if self.components[dependency].task is not None
+                ))
+                await run_in_pool(self._load, component.name)
+            except Exception:
+                if not component.retry:
+                    return
+                await asyncio.sleep(self.config["retry_interval_seconds"])
+                continue
+            # Dependents that failed because this component was missing can now load
+            for other in self.components.values():
+                if component.name in other.depends_on and other.state == FAILED:
+                    self._schedule(other.name)
+            return
+
+    def _schedule(self, name: str):
+        """Start a background load of ``name`` unless it is ready or already in progress."""
+        component = self.components[name]
+        if component.state == READY or (component.task is not None and not component.task.done()):
+            return
+        component.task = asyncio.get_running_loop().create_task(self._run(component))
+
+    def start(self):
+        """Warm every component in the background (if ``eager``); returns immediately."""
+        self.started_at = time.time()
+        if not self.config["eager"]:
+            return
+        for name in self.components:
+            self._schedule(name)
+
+    async def stop(self):
+        tasks = [c.task for c in self.components.values() if c.task is not None and not c.task.done()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def require(self, *names: str):
+        """Raise ComponentsNotReady unless every named component is ready.
+
+        Components that are neither ready nor loading start loading in the
+        background, so a lazy (non-eager) deployment warms up on first use.
+        """
+        missing = [name for name in names if not self.is_ready(name)]
+        if not missing:
+            return
+        for name in missing:
+            self._schedule(name)
+        raise ComponentsNotReady(missing, self.config["retry_after_seconds"])
+
+    def ready(self) -> bool:
+        """True once every required component is ready."""
+        return all(c.state == READY for c in self.components.values() if c.required)
+
+    def status(self) -> Dict:
+        return {
+            "ready": self.ready(),
+            "uptime_seconds": round(time.time() - self.started_at, 2),
+            "components": {name: component.to_dict() for name, component in self.components.items()}
+        }
+
+startup = StartupOrchestrator()
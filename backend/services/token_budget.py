@@ -0,0 +1,100 @@
+import logging
+import math
+import re
+from dataclasses import dataclass, asdict
+from typing import Dict, Optional, Tuple
+
+from backend.config.performance_config import TOKEN_BUDGET_CONFIGS
+
+logger = logging.getLogger("ConfigGuidanceAPI")
+
+# Words, numbers and individual punctuation marks each cost at least one token
+_TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+
+@dataclass
+class ContextBudget:
+    """The context window chosen for one generation."""
+    num_ctx: int
+    num_predict: int
+    prompt_tokens: int
+    bucket_limit: int
+    truncated_output: bool = False
+
+    def to_dict(self) -> Dict:
+        return asdict(self)
+
+def estimate_tokens(text: str, config: Dict = None) -> int:
+    """Estimate the token count of ``text`` without loading the model's tokenizer.
+
+    Takes the larger of a character-based and a word/punctuation-based count,
+    which over-estimates slightly for prose and tracks dense YAML and CLI
+    output more closely than either count alone.
+    """
+    if not text:
+        return 0
+    config = config or TOKEN_BUDGET_CONFIGS
+    by_chars = len(text) / config["chars_per_token"]
+    by_pieces = len(_TOKEN_PATTERN.findall(text))
+    return math.ceil(max(by_chars, by_pieces) * (1 + config["safety_margin"]))
+
+def plan_context_window(prompt_text: str, options: Dict, system: Optional[str] = None,
+                        config: Dict = None) -> Tuple[Dict, ContextBudget]:
+    """Pick the smallest num_ctx bucket that fits the prompt plus reserved output.
+
+    ``options`` are the model's generation options; their ``num_ctx`` is the
+    largest window allowed and their ``num_predict`` the output to reserve.
+    If even the largest bucket is too small, num_predict is reduced (down to
+    ``min_output_tokens``) rather than letting Ollama truncate the prompt.
+    Returns the adjusted options and the chosen budget.
+    """
+    config = config or TOKEN_BUDGET_CONFIGS
+    max_ctx = options.get("num_ctx", config["ctx_buckets"][-1])
+    num_predict = options.get("num_predict", config["min_output_tokens"])
+
+    prompt_tokens = (
+        estimate_tokens(prompt_text, config)
+        + estimate_tokens(system or "", config)
+        + config["template_overhead_tokens"]
+    )
+    needed = prompt_tokens + num_predict
+
+    buckets = sorted(bucket for bucket in config["ctx_buckets"] if bucket < max_ctx) + [max_ctx]
+    num_ctx = next((bucket for bucket in buckets if bucket >= needed), max_ctx)
+
+    truncated_output = False
+    if needed > num_ctx:
+        available = num_ctx - prompt_tokens
+        num_predict = max(config["min_output_tokens"], min(num_predict, available))
+        truncated_output = True
+        logger.warning({
+            "message": "Prompt does not fit the largest context bucket, reducing num_predict",
+            "prompt_tokens": prompt_tokens,
+            "num_ctx": num_ctx,
+            "num_predict": num_predict
+        })
+
+    planned = dict(options)
+    planned["num_ctx"] = num_ctx
+    planned["num_predict"] = num_predict
+    budget = ContextBudget(
+        num_ctx=num_ctx,
+        num_predict=num_predict,
+        prompt_tokens=prompt_tokens,
+        bucket_limit=max_ctx,
+        truncated_output=truncated_output
+    )
+    return planned, budget
+
+def available_context_tokens(options: Dict, prompt_without_context: str, system: Optional[str] = None,
+                             ceiling: Optional[int] = None, config: Dict = None) -> int:
+    """Tokens left for retrieved context once the prompt frame and output are reserved."""
+    config = config or TOKEN_BUDGET_CONFIGS
+    max_ctx = options.get("num_ctx", config["ctx_buckets"][-1])
+    reserved = (
+        options.get("num_predict", config["min_output_tokens"])
+        + estimate_tokens(prompt_without_context, config)
+        + estimate_tokens(system or "", config)
+        + config["template_overhead_tokens"]
+    )
+    available = max(0, max_ctx - reserved)
+    return min(available, ceiling) if ceiling else available
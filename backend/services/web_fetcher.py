@@ -0,0 +1,199 @@
+import asyncio
+import logging
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+from urllib.parse import urlparse
+
+import httpx
+
+from backend.config.web_search_config import WEB_FETCH_CONFIG, WEB_SEARCH_CONFIG
+from backend.services.executors import get_executor
+
+logger = logging.getLogger("WebSearchModule")
+
+class TokenBucket:
+    """Allows ``rate`` requests per second on average, with bursts of up to ``burst``."""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.capacity = float(burst)
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+
+    async def acquire(self, deadline: float) -> bool:
+        """Take a token, waiting for one to refill; False if that would pass ``deadline`` (monotonic)."""
+        while True:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return True
+            wait = (1 - self.tokens) / self.rate
+            if now + wait > deadline:
+                return False
+            await asyncio.sleep(wait)
+
+@dataclass
+class FetchReport:
+    """Pages fetched for one search, in URL order, and what happened to each URL."""
+    pages: List[Dict]
+    statuses: Dict[str, str] = field(default_factory=dict)  # url -> ok, empty, error, timeout, rate_limited or cancelled
+    elapsed_ms: float = 0.0
+    deadline_hit: bool = False
+
+class WebFetcher:
+    """Fetches pages concurrently over one pooled, HTTP/2-capable httpx client.
+
+    The client lives on a private event loop thread, so request handlers
+    (``afetch``) and synchronous callers (``fetch``) share its connection
+    pool. Each host gets a concurrency limit and a token-bucket rate
+    limit. Every fetch has an overall deadline: pages finished by then are
+    returned and the stragglers are cancelled. Responses are parsed by the
+    caller's ``extract(url, content)`` in the CPU pool.
+    """
+
+    def __init__(self, config: Dict = None):
+        self.config = config or WEB_FETCH_CONFIG
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._client: Optional[httpx.AsyncClient] = None
+        self._lock = threading.Lock()
+        self._host_limits: Dict[str, asyncio.Semaphore] = {}
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._stats = {"fetches": 0, "pages": 0, "errors": 0, "timeouts": 0, "rate_limited": 0,
+                       "cancelled": 0, "deadline_hits": 0}
+
+    def _http2(self) -> bool:
+        if not self.config["http2"]:
+            return False
+        try:
+            import h2  # noqa: F401  httpx needs it for HTTP/2
+        except ImportError:
+            return False
+        return True
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        if self._loop is None:
+            with self._lock:
+                if self._loop is None:
+                    loop = asyncio.new_event_loop()
+                    threading.Thread(target=loop.run_forever, name="web-fetcher", daemon=True).start()
+                    self._loop = loop
+        return self._loop
+
+    def _get_client(self) -> httpx.AsyncClient:
+        # Only called on the fetcher loop
+        if self._client is None:
+            http2 = self._http2()
+            self._client = httpx.AsyncClient(
+                http2=http2,
+                follow_redirects=True,
+                headers={
+                    "User-Agent": WEB_SEARCH_CONFIG["user_agent"],
+                    "Accept": "text/html,application/xhtml+xml",
+                    "Accept-Language": "en-US,en;q=0.9"
+                },
+                timeout=httpx.Timeout(WEB_SEARCH_CONFIG["timeout"], connect=self.config["connect_timeout"]),
+                limits=httpx.Limits(
+                    max_connections=self.config["max_connections"],
+                    max_keepalive_connections=self.config["max_keepalive_connections"],
+                    keepalive_expiry=self.config["keepalive_expiry"]
+                )
+            )
+            logger.info(f"Created pooled web client (http2={http2})")
+        return self._client
+
+    def _host_state(self, host: str):
+        if host not in self._host_limits:
+            self._host_limits[host] = asyncio.Semaphore(self.config["per_host_concurrency"])
+            self._buckets[host] = TokenBucket(self.config["rate_per_host"], self.config["burst_per_host"])
+        return self._host_limits[host], self._buckets[host]
+
+    async def _fetch_one(self, url: str, extract: Callable[[str, bytes], Optional[Dict]], deadline: float):
+        limit, bucket = self._host_state(urlparse(url).netloc)
+        async with limit:
+            if not await bucket.acquire(deadline):
+                return "rate_limited", None
+            remaining = deadline - time.monotonic()
+            response = await self._get_client().get(url, timeout=min(WEB_SEARCH_CONFIG["timeout"], max(remaining, 0.1)))
+            response.raise_for_status()
+        page = await asyncio.get_running_loop().run_in_executor(get_executor("cpu"), extract, url, response.content)
+        return ("ok" if page else "empty"), page
+
+    async def _fetch_all(self, urls: List[str], extract, deadline_seconds: float) -> FetchReport:
+        started = time.monotonic()
+        deadline = started + deadline_seconds
+        tasks = {asyncio.ensure_future(self._fetch_one(url, extract, deadline)): url for url in urls}
+        done, pending = await asyncio.wait(tasks, timeout=deadline_seconds)
+        for task in pending:
+            task.cancel()
+
+        pages: Dict[str, Dict] = {}
+        statuses: Dict[str, str] = {}
+        for task, url in tasks.items():
+            if task in pending:
+                statuses[url] = "cancelled"
+            elif isinstance(task.exception(), httpx.TimeoutException):
+                statuses[url] = "timeout"
+                logger.warning(f"Timed out fetching {url}")
+            elif task.exception() is not None:
+                statuses[url] = "error"
+                logger.warning(f"Network error fetching {url}: {task.exception()}")
+            else:
+                statuses[url], page = task.result()
+                if page:
+                    pages[url] = page
+        if pending:
+            # Let cancellation release connections before returning; also retrieves late exceptions
+            await asyncio.gather(*pending, return_exceptions=True)
+
+        for status in statuses.values():
+            key = {"error": "errors", "timeout": "timeouts", "rate_limited": "rate_limited", "cancelled": "cancelled"}.get(status)
+            if key:
+                self._stats[key] += 1
+        self._stats["fetches"] += 1
+        self._stats["pages"] += len(pages)
+        self._stats["deadline_hits"] += bool(pending)
+        return FetchReport([pages[url] for url in urls if url in pages], statuses,
+                           round((time.monotonic() - started) * 1000, 1), bool(pending))
+
+    def submit(self, urls: List[str], extract: Callable[[str, bytes], Optional[Dict]],
+               deadline_seconds: float = None) -> Future:
+        """Start fetching ``urls`` on the fetcher loop; the Future resolves to a FetchReport."""
+        deadline_seconds = deadline_seconds or self.config["deadline_seconds"]
+        return asyncio.run_coroutine_threadsafe(self._fetch_all(list(dict.fromkeys(urls)), extract, deadline_seconds),
+                                                self._ensure_loop())
+
+    async def afetch(self, urls: List[str], extract, deadline_seconds: float = None) -> FetchReport:
+        return await asyncio.wrap_future(self.submit(urls, extract, deadline_seconds))
+
+    def fetch(self, urls: List[str], extract, deadline_seconds: float = None) -> FetchReport:
+        """Blocking variant of ``afetch`` for synchronous callers."""
+        return self.submit(urls, extract, deadline_seconds).result()
+
+    async def _close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def close(self):
+        """Close the pooled client and stop the fetcher loop."""
+        with self._lock:
+            loop, self._loop = self._loop, None
+        if loop is None:
+            return
+        try:
+            asyncio.run_coroutine_threadsafe(self._close(), loop).result(timeout=5)
+        except Exception as e:
+            logger.warning(f"Failed to close web client: {e}")
+        loop.call_soon_threadsafe(loop.stop)
+        self._host_limits.clear()
+        self._buckets.clear()
+
+    def stats(self) -> Dict:
+        return {"client_started": self._client is not None, "hosts": len(self._host_limits), **self._stats}
+
+web_fetcher = WebFetcher()
@@ -1,3 +1,5 @@
+import asyncio
+import contextlib
 import requests
 import time
 import re
@@ -9,6 +11,9 @@ from backend.config.web_search_config import (
     TRUSTED_WEBSITES, QUERY_PATTERNS, WEB_SEARCH_CONFIG, 
     CONTENT_FILTER, HYBRID_CONFIG, OPENSHIFT_VERSION_URLS, RHEL_VERSION_URLS
 )
+from backend.services.context_packer import ContextChunk, context_packer
+from backend.services.scheduler import SchedulerRejected, generation_scheduler
+from backend.services.web_fetcher import web_fetcher
 
 logger = logging.getLogger("WebSearchModule")
 
@@ -101,14 +106,20 @@ class TrustedWebSearch:
         # Limit to max results
         return urls[:WEB_SEARCH_CONFIG["max_total_results"]]
     
+    def _cached_page(self, url: str) -> Optional[Dict]:
+        if WEB_SEARCH_CONFIG["enable_caching"] and url in self.cache:
+            cache_time, content = self.cache[url]
+            if time.time() - cache_time < WEB_SEARCH_CONFIG["cache_duration"]:
+                return content
+        return None
+    
     def fetch_page_content(self, url: str) -> Optional[Dict]:
         """Fetch and extract content from Red Hat documentation pages."""
         try:
             # Check cache first
-            if WEB_SEARCH_CONFIG["enable_caching"] and url in self.cache:
-                cache_time, content = self.cache[url]
-                if time.time() - cache_time < WEB_SEARCH_CONFIG["cache_duration"]:
-                    return content
+            cached = self._cached_page(url)
+            if cached:
+                return cached
             
             response = self.session.get(
                 url, 
@@ -119,8 +130,19 @@ class TrustedWebSearch:
                 }
             )
             response.raise_for_status()
+            return self.extract_page_content(url, response.content)
             
-            soup = BeautifulSoup(response.content, 'html.parser')
+        except requests.RequestException as e:
+            logger.warning(f"Network error fetching {url}: {str(e)}")
+            return None
+        except Exception as e:
+            logger.warning(f"Failed to fetch content from {url}: {str(e)}")
+            return None
+    
+    def extract_page_content(self, url: str, html: bytes) -> Optional[Dict]:
+        """Extract and cache the main text of a fetched Red Hat documentation page."""
+        try:
+            soup = BeautifulSoup(html, 'html.parser')
             
             # Remove unwanted elements (Red Hat docs specific)
             for element in soup(['script', 'style', 'nav', 'footer', 'aside', 'header', 
@@ -193,11 +215,8 @@ class TrustedWebSearch:
             logger.info(f"Successfully extracted {len(content_text)} chars from {url}")
             return result
             
-        except requests.RequestException as e:
-            logger.warning(f"Network error fetching {url}: {str(e)}")
-            return None
         except Exception as e:
-            logger.warning(f"Failed to fetch content from {url}: {str(e)}")
+            logger.warning(f"Failed to extract content from {url}: {str(e)}")
             return None
     
     def _determine_doc_type(self, url: str, title: str) -> str:
@@ -223,8 +242,7 @@ class TrustedWebSearch:
         else:
             return "Red Hat Documentation"
     
-    def search_trusted_sites(self, query: str) -> List[Dict]:
-        """Search trusted websites for relevant information."""
+    def _search_urls(self, query: str) -> List[str]:
         categories = self.determine_website_category(query)
         versions = self.extract_version_from_query(query)
         
@@ -238,29 +256,58 @@ class TrustedWebSearch:
         version_str = f" (versions: {', '.join(version_info)})" if version_info else ""
         logger.info(f"Searching categories: {categories} for query: {query}{version_str}")
         
-        search_urls = self.build_search_urls(query, categories)
-        results = []
-        
+        return self.build_search_urls(query, categories)
+    
+    def _split_cached(self, search_urls: List[str]):
+        """Pages still fresh in the cache, and the URLs that need fetching."""
+        cached = {}
         for url in search_urls:
-            content = self.fetch_page_content(url)
-            if content:
-                results.append(content)
-                
-            # Respect rate limits
-            time.sleep(0.5)
-            
-            if len(results) >= WEB_SEARCH_CONFIG["max_total_results"]:
-                break
-        
+            page = self._cached_page(url)
+            if page:
+                cached[url] = page
+        return cached, [url for url in search_urls if url not in cached]
+    
+    def _merge_fetched(self, query: str, search_urls: List[str], cached: Dict[str, Dict], report) -> List[Dict]:
+        fetched = {page["url"]: page for page in report.pages} if report else {}
+        results = [cached.get(url) or fetched[url] for url in search_urls if url in cached or url in fetched]
+        if report:
+            logger.info(f"Fetched {len(report.pages)}/{len(report.statuses)} pages in {report.elapsed_ms} ms"
+                        f"{' (deadline reached, stragglers cancelled)' if report.deadline_hit else ''}: {report.statuses}")
         logger.info(f"Found {len(results)} web results for query: {query}")
-        return results
+        return results[:WEB_SEARCH_CONFIG["max_total_results"]]
+    
+    async def asearch_trusted_sites(self, query: str) -> List[Dict]:
+        """Search trusted websites, fetching all pages concurrently within the fetch deadline.
+        
+        Each site is rate limited by a token bucket instead of fixed sleeps;
+        pages still loading at the deadline are dropped, so latency is bounded
+        by the deadline rather than the sum of all pages.
+        """
+        search_urls = self._search_urls(query)
+        cached, to_fetch = self._split_cached(search_urls)
+        report = await web_fetcher.afetch(to_fetch, self.extract_page_content) if to_fetch else None
+        return self._merge_fetched(query, search_urls, cached, report)
+    
+    def search_trusted_sites(self, query: str) -> List[Dict]:
+        """Search trusted websites for relevant information (blocking variant of asearch_trusted_sites)."""
+        search_urls = self._search_urls(query)
+        cached, to_fetch = self._split_cached(search_urls)
+        report = web_fetcher.fetch(to_fetch, self.extract_page_content) if to_fetch else None
+        return self._merge_fetched(query, search_urls, cached, report)
 
 class HybridKnowledgeSystem:
-    def __init__(self, local_vector_store, local_qa_chain):
+    def __init__(self, local_vector_store, local_qa_chain, llm_model: Optional[str] = None):
         self.local_vector_store = local_vector_store
         self.local_qa_chain = local_qa_chain
+        self.llm_model = llm_model  # Model behind local_qa_chain, for generation admission
         self.web_search = TrustedWebSearch()
     
+    def _generation_slot(self, chat_id: Optional[str]):
+        """Scheduler slot for the local QA chain's LLM call, when the request names its chat."""
+        if self.llm_model and chat_id:
+            return generation_scheduler.slot(self.llm_model, chat_id)
+        return contextlib.nullcontext()
+    
     def get_local_results(self, query: str) -> Dict:
         """Get results from local knowledge base."""
         try:
@@ -276,15 +323,40 @@ class HybridKnowledgeSystem:
         
         return {"answer": "", "sources": [], "confidence": "none"}
     
+    async def aget_local_results(self, query: str, chat_id: Optional[str] = None) -> Dict:
+        """Async variant of get_local_results using the chain's native async path.
+
+        With a ``chat_id``, the chain invocation holds a generation slot for
+        ``llm_model``; a rejected admission propagates as SchedulerRejected.
+        """
+        try:
+            if self.local_qa_chain:
+                async with self._generation_slot(chat_id):
+                    result = await self.local_qa_chain.ainvoke({"query": query})
+                return {
+                    "answer": result.get("result", ""),
+                    "sources": [doc.metadata for doc in result.get("source_documents", [])],
+                    "confidence": "high"  # Local results are trusted
+                }
+        except SchedulerRejected:
+            raise
+        except Exception as e:
+            logger.error(f"Local search failed: {str(e)}")
+        
+        return {"answer": "", "sources": [], "confidence": "none"}
+    
     def get_web_results(self, query: str) -> List[Dict]:
         """Get results from trusted web sources."""
         return self.web_search.search_trusted_sites(query)
     
+    async def aget_web_results(self, query: str) -> List[Dict]:
+        """Async variant of get_web_results; pages are fetched concurrently."""
+        return await self.web_search.asearch_trusted_sites(query)
+    
     def merge_results(self, local_result: Dict, web_results: List[Dict], query: str) -> Dict:
-        """Merge local and web results into a comprehensive response."""
+        """Merge local and web results into a token-budgeted context for the LLM."""
         
-        # Prepare context for the LLM
-        context_parts = []
+        chunks = []
         sources = []
         
         # Check weight configuration to determine what to include
@@ -293,7 +365,13 @@ class HybridKnowledgeSystem:
         
         # Add local results only if local_weight > 0
         if local_weight > 0 and local_result["answer"]:
-            context_parts.append(local_result['answer'])
+            # The local answer is already grounded in our documents, so it ranks first
+            chunks.append(ContextChunk(
+                text=local_result['answer'],
+                source_type="local",
+                source_id="local_answer",
+                score=1.0
+            ))
             # Structure local sources properly
             for src in local_result['sources']:
                 source_path = src.get('source', 'Unknown')
@@ -306,58 +384,41 @@ class HybridKnowledgeSystem:
                 })
         
         # Add web results from Red Hat documentation only if web_weight > 0
-        if web_weight > 0 and web_results:
-            web_context = ""
-            for i, web_result in enumerate(web_results[:6], 1):  # Increased to top 6 web results
-                doc_type = web_result.get('doc_type', 'Red Hat Documentation')
-                title = web_result.get('title', 'Untitled')
-                content = web_result.get('content', '')
-                url = web_result.get('url', '')
-                
-                # Increased content preview length for fuller content
-                content_preview = content[:2000] if len(content) > 2000 else content
-                if len(content) > 2000:
-                    content_preview += "...\n[See full documentation at source URL]"
-                
-                web_context += f"{title}:\n{content_preview}\n\n"
-                
-                # Structure web sources properly
+        web_pages = web_results[:6] if web_weight > 0 and web_results else []  # Top 6 web results
+        for web_result in web_pages:
+            chunks.append(ContextChunk(
+                text=web_result.get('content', ''),
+                source_type="web",
+                source_id=web_result.get('url', ''),
+                title=web_result.get('title', 'Untitled')
+            ))
+        
+        # Pack by relevance per token instead of cutting pages at a character limit
+        packed = context_packer.pack(
+            chunks, query, HYBRID_CONFIG["max_hybrid_context_tokens"],
+            quotas={"local": local_weight, "web": web_weight}
+        )
+        
+        # Only cite web pages that contributed at least one passage
+        used_urls = {chunk.source_id.split('#')[0] for chunk in packed.chunks if chunk.source_type == "web"}
+        for web_result in web_pages:
+            url = web_result.get('url', '')
+            if url in used_urls:
                 sources.append({
                     "type": "web",
-                    "title": title,
+                    "title": web_result.get('title', 'Untitled'),
                     "resource": url,
-                    "doc_type": doc_type
+                    "doc_type": web_result.get('doc_type', 'Red Hat Documentation')
                 })
-            
-            context_parts.append(web_context)
-        
-        # Combine all context
-        full_context = "\n\n".join(context_parts)
-        
-        # Only truncate if significantly over limit to avoid unnecessary cuts
-        if len(full_context) > HYBRID_CONFIG["max_hybrid_context"]:
-            # Try to find a good breaking point (sentence or paragraph)
-            truncate_point = HYBRID_CONFIG["max_hybrid_context"] - 200  # Leave space for message
-            
-            # Look for sentence endings near the truncate point
-            sentence_endings = ['. ', '.\n', '!\n', '?\n']
-            best_cut = truncate_point
-            
-            for ending in sentence_endings:
-                pos = full_context.rfind(ending, 0, truncate_point + 100)
-                if pos > truncate_point - 1000:  # Within reasonable range
-                    best_cut = pos + len(ending)
-                    break
-            
-            full_context = full_context[:best_cut] + "\n\n[Note: Response truncated due to length. For complete information, please refer to the source documentation.]"
         
         return {
-            "context": full_context,
+            "context": packed.context,
             "sources": sources,
             "has_local": bool(local_result["answer"]),
             "has_web": bool(web_results),
             "query": query,
-            "documentation_types": [result.get('doc_type', 'Unknown') for result in web_results] if web_results else []
+            "documentation_types": [result.get('doc_type', 'Unknown') for result in web_results] if web_results else [],
+            "context_manifest": packed.manifest()
         }
     
     def hybrid_search(self, query: str) -> Dict:
@@ -381,3 +442,24 @@ class HybridKnowledgeSystem:
         merged_result = self.merge_results(local_result, web_results, query)
         
         return merged_result
+    
+    async def ahybrid_search(self, query: str, chat_id: Optional[str] = None) -> Dict:
+        """Async hybrid search; local QA and web fetching run concurrently.
+
+        Only the local QA chain holds a generation slot (see aget_local_results).
+        """
+        local_weight = HYBRID_CONFIG.get("local_weight", 0.5)
+        web_weight = HYBRID_CONFIG.get("web_weight", 0.5)
+        
+        async def no_local_result() -> Dict:
+            return {"answer": "", "sources": [], "confidence": "none"}
+        
+        async def no_web_results() -> List[Dict]:
+            return []
+        
+        local_result, web_results = await asyncio.gather(
+            self.aget_local_results(query, chat_id) if local_weight > 0 else no_local_result(),
+            self.aget_web_results(query) if web_weight > 0 else no_web_results()
+        )
+        
+        return self.merge_results(local_result, web_results, query)
\ No newline at end of file
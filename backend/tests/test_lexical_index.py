@@ -0,0 +1,63 @@
+import math
+import random
+from collections import Counter
+
+import pytest
+
+from backend.vector_store.lexical_index import LexicalIndex, tokenize
+
+CONFIG = {"k1": 1.2, "b": 0.75, "buffer_docs": 100, "max_segments": 8, "max_deleted_ratio": 0.3}
+VOCABULARY = ["openshift", "oc", "pod", "route", "deployment", "secret", "namespace", "operator",
+              "node", "ingress", "volume", "quota", "build", "image", "registry", "cluster"]
+
+
+def _corpus(n_docs: int, seed: int):
+    rng = random.Random(seed)
+    texts = []
+    for _ in range(n_docs):
+        # "openshift" and "oc" appear in most documents, like in the real corpus
+        words = ["openshift"] * rng.randint(1, 3) + ["oc"] * (rng.random() < 0.8)
+        words += rng.choices(VOCABULARY[2:], k=rng.randint(3, 30))
+        texts.append(" ".join(words))
+    return [f"d{i}" for i in range(n_docs)], texts
+
+
+def _exhaustive(index: LexicalIndex, texts, live, query: str, k: int):
+    """Plain BM25 over every live document, with the index's collection statistics."""
+    tokens = {doc_id: Counter(tokenize(text)) for doc_id, text in texts.items()}
+    lengths = {doc_id: sum(counts.values()) for doc_id, counts in tokens.items()}
+    avg_length = max(1.0, sum(lengths[doc_id] for doc_id in live) / len(live))
+    scores = {}
+    for term in dict.fromkeys(tokenize(query)):
+        df = sum(1 for counts in tokens.values() if term in counts)  # Deleted documents included
+        if not df:
+            continue
+        idf = math.log1p((len(texts) - df + 0.5) / (df + 0.5))
+        for doc_id in live:
+            tf = tokens[doc_id][term]
+            if tf:
+                norm = tf + index.k1 * (1 - index.b + index.b * lengths[doc_id] / avg_length)
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (index.k1 + 1) / norm
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+
+
+def test_pruned_search_matches_exhaustive_scoring_after_deletes():
+    ids, texts = _corpus(400, seed=7)
+    index = LexicalIndex(CONFIG)
+    for start in range(0, len(ids), 100):  # Four segments
+        index.add(ids[start:start + 100], texts[start:start + 100])
+    rng = random.Random(11)
+    deleted = set(rng.sample(ids, 60))
+    assert index.delete(deleted) == 60
+    live = [doc_id for doc_id in ids if doc_id not in deleted]
+    by_id = dict(zip(ids, texts))
+
+    for _ in range(200):
+        query = " ".join(rng.sample(VOCABULARY, rng.randint(1, 4)))
+        for k in (1, 3, 10):
+            expected = _exhaustive(index, by_id, live, query, k)
+            actual = index.search(query, k=k)
+            assert [score for _, score in actual] == pytest.approx([score for _, score in expected], rel=1e-9), query
+            # Ties may come back in either order; the scores above pin the top k down
+            assert {doc_id for doc_id, _ in actual} <= set(live)
+
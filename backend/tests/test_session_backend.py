@@ -0,0 +1,79 @@
+import fakeredis
+import pytest
+
+from backend.services import session_backend
+from backend.services.session_backend import RedisSessionBackend, document_bytes
+
+CONFIG = {"key_prefix": "test:session:", "idle_ttl_seconds": 60}
+
+
+@pytest.fixture
+def backend():
+    return RedisSessionBackend(CONFIG, client=fakeredis.FakeRedis())
+
+
+def _doc(content: str) -> dict:
+    return {"content": content, "metadata": {"source": f"{content}.yaml"}}
+
+
+def test_touch_creates_session_with_expiring_keys(backend):
+    assert not backend.exists("chat-1")
+    backend.touch("chat-1")
+    assert backend.exists("chat-1")
+    assert 0 < backend.client.ttl("test:session:chat-1:meta") <= CONFIG["idle_ttl_seconds"]
+    assert [chat_id for chat_id, _ in backend.sessions_by_last_used()] == ["chat-1"]
+
+
+def test_add_file_appends_documents_and_counts_bytes(backend):
+    first, second = _doc("route"), _doc("deployment")
+    assert backend.add_file("chat-1", first) == 1
+    assert backend.add_file("chat-1", second) == 2
+    assert backend.get_files("chat-1") == [first, second]
+    assert backend.get_files("chat-1", 1) == [second]
+    assert backend.file_count("chat-1") == 2
+    assert backend.document_bytes("chat-1") == document_bytes(first) + document_bytes(second)
+    assert 0 < backend.client.ttl("test:session:chat-1:files") <= CONFIG["idle_ttl_seconds"]
+
+
+def test_vectors_round_trip(backend):
+    assert backend.get_vectors("chat-1") == (None, 0)
+    backend.touch("chat-1")
+    backend.put_vectors("chat-1", b"serialized-index", 3)
+    assert backend.get_vectors("chat-1") == (b"serialized-index", 3)
+
+
+def test_summary_totals_every_session(backend):
+    backend.add_file("chat-1", _doc("route"))
+    backend.add_file("chat-1", _doc("secret"))
+    backend.add_file("chat-2", _doc("pod"))
+    backend.touch("chat-3")
+    assert backend.summary() == {
+        "sessions": 3,
+        "files": 3,
+        "document_bytes": sum(document_bytes(_doc(name)) for name in ("route", "secret", "pod"))
+    }
+
+
+def test_delete_removes_every_key(backend):
+    backend.add_file("chat-1", _doc("route"))
+    backend.put_vectors("chat-1", b"serialized-index", 1)
+    backend.set_state("chat-1", {"context": ["hello"]})
+    assert backend.delete("chat-1")
+    assert not backend.exists("chat-1")
+    assert backend.get_files("chat-1") == []
+    assert backend.get_state("chat-1") == {"context": []}
+    assert backend.sessions_by_last_used() == []
+    assert not backend.delete("chat-1")
+
+
+def test_idle_sessions_are_pruned_from_lru(backend, monkeypatch):
+    now = 1_000_000.0
+    monkeypatch.setattr(session_backend.time, "time", lambda: now)
+    backend.touch("old")
+    now += 45
+    backend.touch("recent")
+    assert [chat_id for chat_id, _ in backend.sessions_by_last_used()] == ["old", "recent"]
+
+    now += 30  # "old" idle for 75s, past the 60s TTL
+    assert [chat_id for chat_id, _ in backend.sessions_by_last_used()] == ["recent"]
+    assert backend.summary()["sessions"] == 1
@@ -0,0 +1,310 @@
+import json
+import logging
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Optional, Tuple, Union
+
+import numpy as np
+from langchain.docstore.document import Document
+from langchain_community.vectorstores import FAISS
+
+logger = logging.getLogger("ConfigGuidanceAPI")
+
+ANN_INDEX_FILENAME = "ann.faiss"
+ANN_PARAMS_FILENAME = "ann.json"
+INDEX_TYPES = ("flat", "hnsw", "ivf_flat", "ivf_pq")
+
+def index_fingerprint(index_file: Path) -> str:
+    """Size and mtime of a saved index, used to tie derived files to the index they came from."""
+    stat = Path(index_file).stat()
+    return f"{stat.st_size}:{stat.st_mtime_ns}"
+
+def mmap_read_flags() -> int:
+    """faiss.read_index flags for a read-only memory-mapped load.
+
+    IO_FLAG_MMAP_IFC (faiss >= 1.10) maps flat, HNSW and IVF storage; plain
+    IO_FLAG_MMAP only maps IVF inverted lists and is the fallback on older
+    versions. The two must not be combined.
+    """
+    import faiss
+
+    return getattr(faiss, "IO_FLAG_MMAP_IFC", faiss.IO_FLAG_MMAP) | faiss.IO_FLAG_READ_ONLY
+
+def _pq_subquantizers(dimension: int, requested: int) -> int:
+    """Largest PQ sub-quantizer count <= requested that divides the dimension."""
+    for m in range(min(requested, dimension), 0, -1):
+        if dimension % m == 0:
+            return m
+    return 1
+
+def _factory_string(index_type: str, ntotal: int, dimension: int, config: Dict) -> Tuple[str, Dict]:
+    """faiss.index_factory description and build parameters for an index type."""
+    if index_type == "flat":
+        return "Flat", {}
+    if index_type == "hnsw":
+        m = config["hnsw_m"]
+        return f"HNSW{m}", {"hnsw_m": m, "ef_construction": config["hnsw_ef_construction"]}
+    # FAISS wants ~39 training points per list; 4*sqrt(n) lists is its usual starting point
+    nlist = config["ivf_nlist"] or int(4 * math.sqrt(ntotal))
+    nlist = max(1, min(nlist, ntotal // 39 or 1))
+    if index_type == "ivf_flat":
+        return f"IVF{nlist},Flat", {"nlist": nlist}
+    m = _pq_subquantizers(dimension, config["pq_m"])
+    return f"IVF{nlist},PQ{m}x{config['pq_nbits']}", {"nlist": nlist, "pq_m": m, "pq_nbits": config["pq_nbits"]}
+
+def build_ann_index(vector_store: FAISS, index_path: Union[str, Path], config: Dict = None) -> Optional[Dict]:
+    """Build the configured ANN index from a saved flat store and persist it with its parameters.
+
+    The ANN index holds the same vectors in the same order as ``index.faiss``,
+    so it shares the store's docstore and position-to-ID map. It is written
+    to ``ann.faiss`` with ``ann.json`` recording the type, build parameters,
+    default search knobs and the fingerprint of the flat index it was built
+    from. Returns the parameters, or None when the flat index is used as is.
+    """
+    import faiss
+
+    if config is None:
+        from backend.config.performance_config import ANN_INDEX_CONFIGS as config
+
+    index_path = Path(index_path)
+    index_type = config["type"]
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"Unknown FAISS index type: {index_type}. Expected one of: {', '.join(INDEX_TYPES)}")
+    flat = vector_store.index
+    ntotal, dimension = flat.ntotal, flat.d
+    if index_type == "flat" or ntotal < config["min_vectors"]:
+        # Brute force is exact and already fast at this size
+        for name in (ANN_INDEX_FILENAME, ANN_PARAMS_FILENAME):
+            (index_path / name).unlink(missing_ok=True)
+        return None
+
+    started = time.time()
+    factory, build_params = _factory_string(index_type, ntotal, dimension, config)
+    index = faiss.index_factory(dimension, factory, flat.metric_type)
+    if index_type == "hnsw":
+        index.hnsw.efConstruction = build_params["ef_construction"]
+
+    batch = config["build_batch_size"]
+    if not index.is_trained:
+        sample_size = min(ntotal, max(config["train_sample"], 39 * build_params["nlist"]))
+        rng = np.random.default_rng(0)
+        sample_ids = np.sort(rng.choice(ntotal, size=sample_size, replace=False))
+        index.train(np.vstack([flat.reconstruct(int(i)) for i in sample_ids]).astype(np.float32))
+    for start in range(0, ntotal, batch):
+        index.add(flat.reconstruct_n(start, min(batch, ntotal - start)))
+
+    tmp = index_path / f"{ANN_INDEX_FILENAME}.{os.getpid()}.tmp"
+    faiss.write_index(index, str(tmp))
+    os.replace(tmp, index_path / ANN_INDEX_FILENAME)
+    params = {
+        "type": index_type,
+        "factory": factory,
+        "build": build_params,
+        "ntotal": ntotal,
+        "dimension": dimension,
+        "search_defaults": dict(config["search_profiles"][config["default_profile"]]),
+        "built_from": index_fingerprint(index_path / "index.faiss"),
+        "build_seconds": round(time.time() - started, 2)
+    }
+    tmp = index_path / f"{ANN_PARAMS_FILENAME}.{os.getpid()}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(params, f, indent=2)
+    os.replace(tmp, index_path / ANN_PARAMS_FILENAME)
+    logger.info({"message": "Built ANN index", **params})
+    return params
+
+def ann_index_current(index_path: Union[str, Path], config: Dict) -> bool:
+    """True if the ANN files on disk match the configured type and the current ``index.faiss``."""
+    params_file = Path(index_path) / ANN_PARAMS_FILENAME
+    if config["type"] == "flat":
+        return not params_file.exists()
+    if not params_file.exists():
+        return False
+    with open(params_file) as f:
+        params = json.load(f)
+    return (params.get("type") == config["type"]
+            and params.get("built_from") == index_fingerprint(Path(index_path) / "index.faiss"))
+
+class ReadOnlyIndexError(RuntimeError):
+    """Raised on writes to a search-only vector store (memory-mapped, or searching an ANN index)."""
+
+class TunableFAISS(FAISS):
+    """FAISS store whose searches accept per-call ``search_params``.
+
+    ``search_params`` may be a profile name from ANN_INDEX_CONFIGS or a dict
+    of knobs (``nprobe`` for IVF, ``efSearch`` for HNSW), and can be passed
+    through retriever ``search_kwargs``. Knobs go to faiss as per-call
+    SearchParameters, so concurrent requests never change shared index state.
+    Searches without ``search_params`` (including MMR, which LangChain calls
+    without extra kwargs) use the defaults persisted in ``ann.json``.
+
+    A ``selection`` (see metadata_index.py) restricts a search to the
+    positions it holds: inside the faiss search through an IDSelector, or
+    by an exact scan of just those vectors when there are few of them, so
+    a narrow filter still returns ``k`` in-filter results.
+
+    With an ANN index attached the store is search-only: writes raise
+    ReadOnlyIndexError instead of changing the ANN index behind ``index.faiss``.
+    """
+
+    ann_params: Optional[Dict] = None
+    lexical_index = None  # BM25 index saved with this store (see lexical_index.py), if any
+    metadata_index = None  # Metadata filter index saved with this store (see metadata_index.py), if any
+
+    @property
+    def read_only(self) -> bool:
+        # Vectors added to the ANN index would not reach index.faiss, so it is search-only
+        return self.ann_params is not None
+
+    def _check_writable(self):
+        if self.read_only:
+            raise ReadOnlyIndexError("The FAISS index searches an ANN index and is read-only; update it with init_faiss.py")
+
+    def add_texts(self, *args, **kwargs):
+        self._check_writable()
+        return super().add_texts(*args, **kwargs)
+
+    def add_embeddings(self, *args, **kwargs):
+        self._check_writable()
+        return super().add_embeddings(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        self._check_writable()
+        return super().delete(*args, **kwargs)
+
+    def merge_from(self, *args, **kwargs):
+        self._check_writable()
+        return super().merge_from(*args, **kwargs)
+
+    def save_local(self, *args, **kwargs):
+        self._check_writable()
+        return super().save_local(*args, **kwargs)
+
+    def _faiss_search_params(self, search_params, selector=None):
+        import faiss
+
+        if self.ann_params is None or not (search_params or selector):
+            return faiss.SearchParameters(sel=selector) if selector is not None else None
+        knobs = dict(self.ann_params["search_defaults"])
+        if isinstance(search_params, str):
+            from backend.config.performance_config import ANN_INDEX_CONFIGS
+
+            knobs.update(ANN_INDEX_CONFIGS["search_profiles"].get(search_params, {}))
+        else:
+            knobs.update(search_params)
+        if self.ann_params["type"] == "hnsw":
+            params = faiss.SearchParametersHNSW(efSearch=int(knobs.get("efSearch", 64)))
+        else:
+            params = faiss.SearchParametersIVF(nprobe=int(knobs.get("nprobe", 16)))
+        if selector is not None:
+            params.sel = selector
+        return params
+
+    @contextmanager
+    def _searching_with(self, search_params):
+        params = self._faiss_search_params(search_params)
+        if params is None:
+            yield
+            return
+        _call_params.value = params
+        try:
+            yield
+        finally:
+            _call_params.value = None
+
+    def similarity_search_with_score_by_vector(self, embedding, k=4, filter=None, fetch_k=20, **kwargs):
+        selection = kwargs.pop("selection", None)
+        if selection is not None:
+            return self._search_selection(embedding, k, selection, kwargs.pop("search_params", None))
+        with self._searching_with(kwargs.pop("search_params", None)):
+            return super().similarity_search_with_score_by_vector(embedding, k, filter, fetch_k, **kwargs)
+
+    def _search_selection(self, embedding, k: int, selection, search_params):
+        import faiss
+        from backend.config.performance_config import METADATA_FILTER_CONFIGS
+
+        if not len(selection):
+            return []
+        vector = np.array([embedding], dtype=np.float32)
+        if self._normalize_L2:
+            faiss.normalize_L2(vector)
+        index = self.index._index if isinstance(self.index, _TunedIndex) else self.index
+        if len(selection) <= METADATA_FILTER_CONFIGS["exact_search_max_rows"]:
+            # Cheaper than graph or list traversal that mostly lands outside a small subset
+            positions = np.asarray(selection.positions, dtype=np.int64)
+            candidates = index.reconstruct_batch(positions)
+            if index.metric_type == faiss.METRIC_INNER_PRODUCT:
+                scores = candidates @ vector[0]
+                order = np.argsort(-scores)[:k]
+            else:
+                scores = ((candidates - vector[0]) ** 2).sum(axis=1)
+                order = np.argsort(scores)[:k]
+            found = zip(positions[order], scores[order])
+        else:
+            scores, indices = index.search(vector, k, params=self._faiss_search_params(
+                search_params, selection.faiss_selector()
+            ))
+            found = zip(indices[0], scores[0])
+
+        results = []
+        for position, score in found:
+            if position == -1:
+                continue
+            document = self.docstore.search(self.index_to_docstore_id[int(position)])
+            if isinstance(document, Document):
+                results.append((document, float(score)))
+        return results
+
+    def ann_info(self) -> Dict:
+        return dict(self.ann_params) if self.ann_params else {"type": "flat"}
+
+# Per-thread search parameters for the call in progress; LangChain calls index.search(x, k)
+_call_params = threading.local()
+
+class _TunedIndex:
+    """Wraps a faiss index so LangChain's plain ``search(x, k)`` uses the current call's parameters."""
+
+    def __init__(self, index):
+        self._index = index
+
+    def search(self, x, k, **kwargs):
+        params = getattr(_call_params, "value", None)
+        if params is not None and "params" not in kwargs:
+            kwargs["params"] = params
+        return self._index.search(x, k, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self._index, name)
+
+def attach_ann_index(vector_store: TunableFAISS, index_path: Union[str, Path], mmap: bool = False) -> bool:
+    """Serve searches from ``ann.faiss`` when it was built from the current ``index.faiss``."""
+    import faiss
+
+    index_path = Path(index_path)
+    params_file = index_path / ANN_PARAMS_FILENAME
+    if not params_file.exists():
+        return False
+    with open(params_file) as f:
+        params = json.load(f)
+    if (params.get("built_from") != index_fingerprint(index_path / "index.faiss")
+            or params.get("ntotal") != vector_store.index.ntotal):
+        logger.warning({"message": "ANN index is stale, searching the flat index; rerun init_faiss.py",
+                        "path": str(index_path)})
+        return False
+
+    index = faiss.read_index(str(index_path / ANN_INDEX_FILENAME), mmap_read_flags() if mmap else 0)
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        ivf.make_direct_map()  # reconstruct() for MMR search
+    for knob, value in params["search_defaults"].items():
+        if (knob == "nprobe" and ivf is not None) or (knob == "efSearch" and params["type"] == "hnsw"):
+            faiss.ParameterSpace().set_index_parameter(index, knob, value)
+    vector_store.index = _TunedIndex(index)
+    vector_store.ann_params = params
+    logger.info({"message": "Using ANN index", "type": params["type"], "factory": params["factory"],
+                 "memory_mapped": mmap})
+    return True
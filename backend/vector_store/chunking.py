@@ -0,0 +1,213 @@
+import hashlib
+import json
+import re
+from dataclasses import dataclass, field
+from functools import partial
+from typing import Dict, List, Optional, Union
+
+from langchain.docstore.document import Document
+
+# Parser metadata that describes the whole file and would be copied into every chunk
+_FILE_LEVEL_KEYS = ("sections",)
+_MARKDOWN_HEADING = re.compile(r"^(#{1,6})\s+(.+?)\s*#*\s*$")
+_YAML_SEPARATOR = re.compile(r"^---\s*$", re.MULTILINE)
+_YAML_KIND = re.compile(r"^kind:\s*['\"]?([\w.-]+)", re.MULTILINE)
+_YAML_NAME = re.compile(r"^metadata:\s*\n(?:[ \t]+.*\n)*?[ \t]+name:\s*['\"]?([\w.-]+)", re.MULTILINE)
+_PARAGRAPH_BREAK = re.compile(r"\n\s*\n")
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+@dataclass
+class Block:
+    """A structural unit of a document (PDF section, YAML document, HTML heading section)."""
+    text: str
+    heading: Optional[str] = None
+    line_based: bool = False   # YAML, scripts: split on lines rather than sentences
+    mergeable: bool = True     # Small blocks may be folded into the block before them
+    metadata: Dict = field(default_factory=dict)
+
+def chunking_signature(config: Dict = None) -> str:
+    """Identifies the chunking settings, so an index built with other settings can be detected."""
+    config = config or _default_config()
+    settings = {key: config[key] for key in ("enabled", "chunk_tokens", "overlap_tokens", "min_chunk_tokens", "chars_per_token")}
+    return hashlib.sha1(json.dumps(settings, sort_keys=True).encode()).hexdigest()[:12]
+
+def _default_config() -> Dict:
+    from backend.config.performance_config import CHUNKING_CONFIGS
+
+    return CHUNKING_CONFIGS
+
+def _file_type(metadata: Dict) -> str:
+    file_type = str(metadata.get("file_type") or metadata.get("type") or "").lower()
+    if "yaml" in file_type or file_type == "yml":
+        return "yaml"
+    if file_type in ("shell", "sh", "script"):
+        return "shell"
+    if file_type in ("html", "htm", "web_content"):
+        return "html"
+    return file_type
+
+def _pdf_blocks(sections: List[Dict]) -> List[Block]:
+    blocks = []
+    for section in sections:
+        if not section.get("content", "").strip():
+            continue
+        page_start = section.get("page_start")
+        # The parser closes a section on the page before the next header, which can precede its start
+        page_end = max(page_start or 0, section.get("page_end") or 0) or page_start
+        blocks.append(Block(section["content"], section.get("title"),
+                            metadata={"section": section.get("title"), "page_start": page_start, "page_end": page_end}))
+    return blocks
+
+def _yaml_document_block(document: Dict) -> Block:
+    metadata = {f"yaml_{key}": document[key] for key in ("kind", "name", "namespace") if document.get(key)}
+    heading = " ".join(document[key] for key in ("kind", "name") if document.get(key)) or None
+    return Block(document["content"], heading, line_based=True, mergeable=False, metadata=metadata)
+
+def _yaml_blocks(parsed: Dict, text: str) -> List[Block]:
+    if parsed.get("documents"):
+        return [_yaml_document_block(document) for document in parsed["documents"] if document.get("content", "").strip()]
+    # Raw YAML text (e.g. from parse_any_file_enhanced): split on document separators
+    blocks = []
+    for part in _YAML_SEPARATOR.split(text):
+        if not part.strip():
+            continue
+        document = {"content": part.strip("\n")}
+        for key, pattern in (("kind", _YAML_KIND), ("name", _YAML_NAME)):
+            match = pattern.search(part)
+            if match:
+                document[key] = match.group(1)
+        blocks.append(_yaml_document_block(document))
+    return blocks
+
+def _markdown_blocks(text: str) -> List[Block]:
+    """Split html2text output at headings, tracking the heading path as the section."""
+    blocks, lines, path = [], [], []
+
+    def flush():
+        if "\n".join(lines).strip():
+            section = " > ".join(title for _, title in path) or None
+            blocks.append(Block("\n".join(lines), path[-1][1] if path else None, metadata={"section": section}))
+        lines.clear()
+
+    for line in text.splitlines():
+        match = _MARKDOWN_HEADING.match(line)
+        if match:
+            flush()
+            level = len(match.group(1))
+            path[:] = [(lvl, title) for lvl, title in path if lvl < level] + [(level, match.group(2))]
+        else:
+            lines.append(line)
+    flush()
+    return blocks
+
+def _blocks(parsed: Dict, text: str, metadata: Dict) -> List[Block]:
+    file_type = _file_type(metadata)
+    if parsed.get("sections"):
+        return _pdf_blocks(parsed["sections"])
+    if file_type == "yaml":
+        return _yaml_blocks(parsed, text)
+    if file_type == "shell":
+        return [Block(text, line_based=True)]
+    if file_type == "html" or _MARKDOWN_HEADING.search(text.split("\n", 1)[0]):
+        return _markdown_blocks(text)
+    return [Block(text)]
+
+def _merge_small(blocks: List[Block], min_tokens: int, estimate) -> List[Block]:
+    """Append blocks too small to stand alone (e.g. a heading and one line) to the block before them."""
+    merged = []
+    for block in blocks:
+        previous = merged[-1] if merged else None
+        if previous is not None and previous.mergeable and block.mergeable and estimate(block.text) < min_tokens:
+            heading = f"{block.heading}\n" if block.heading else ""
+            previous.text = f"{previous.text.rstrip()}\n\n{heading}{block.text.strip()}"
+            if block.metadata.get("page_end"):
+                previous.metadata["page_end"] = max(previous.metadata.get("page_end") or 0, block.metadata["page_end"])
+        else:
+            merged.append(block)
+    return merged
+
+def _units(block: Block, max_tokens: int, estimate, split_passages) -> List[str]:
+    """Smallest pieces a block may be cut into: lines for code, paragraphs/sentences for prose."""
+    if block.line_based:
+        pieces = block.text.splitlines()
+    else:
+        pieces = []
+        for paragraph in _PARAGRAPH_BREAK.split(block.text):
+            if not paragraph.strip():
+                continue
+            if estimate(paragraph) <= max_tokens:
+                pieces.append(paragraph.strip())
+            else:
+                pieces.extend(s for s in _SENTENCE_END.split(paragraph.strip()) if s.strip())
+    units = []
+    for piece in pieces:
+        # A single oversized line or sentence is hard-split rather than dropped
+        units.extend(split_passages(piece, max_tokens) if estimate(piece) > max_tokens else [piece])
+    return units
+
+def _pack(units: List[str], chunk_tokens: int, overlap_tokens: int, separator: str, estimate) -> List[str]:
+    """Greedily pack units into chunks, repeating the last ~overlap_tokens of each chunk in the next."""
+    chunks, current, size = [], [], 0
+    for unit in units:
+        tokens = estimate(unit)
+        if current and size + tokens > chunk_tokens:
+            chunks.append(separator.join(current))
+            overlap, overlap_size = [], 0
+            for previous in reversed(current):
+                previous_tokens = estimate(previous)
+                if overlap_size + previous_tokens > overlap_tokens:
+                    break
+                overlap.insert(0, previous)
+                overlap_size += previous_tokens
+            if overlap_size + tokens > chunk_tokens:
+                overlap, overlap_size = [], 0
+            current, size = overlap, overlap_size
+        current.append(unit)
+        size += tokens
+    if current:
+        chunks.append(separator.join(current))
+    return [chunk for chunk in chunks if chunk.strip()]
+
+def chunk_parsed(parsed: Union[Dict, Document], config: Dict = None) -> List[Document]:
+    """Split one parsed file into embedding-sized Documents along its structure.
+
+    PDF ``sections`` (from EnhancedPDFParser), YAML documents and their
+    ``kind``, and markdown headings in HTML output become block boundaries;
+    blocks are packed into chunks of about ``chunk_tokens`` with
+    ``overlap_tokens`` of overlap. Each chunk keeps the file's metadata plus
+    its section or YAML kind/name, page range and position in the file.
+    """
+    from backend.services.context_packer import split_passages
+    from backend.services.token_budget import estimate_tokens
+
+    config = config or _default_config()
+    if isinstance(parsed, Document):
+        parsed = {"content": parsed.page_content, "metadata": parsed.metadata}
+    text = parsed.get("content") or ""
+    metadata = {k: v for k, v in (parsed.get("metadata") or {}).items() if k not in _FILE_LEVEL_KEYS}
+    if not text.strip():
+        return []
+    if not config["enabled"]:
+        return [Document(page_content=text, metadata=metadata)]
+
+    estimate = partial(estimate_tokens, config=config)
+    chunk_tokens = config["chunk_tokens"]
+    blocks = _merge_small(_blocks(parsed, text, metadata) or [Block(text)], config["min_chunk_tokens"], estimate)
+
+    documents = []
+    for block_index, block in enumerate(blocks):
+        heading = f"{block.heading}\n" if block.heading else ""
+        # The heading is repeated in every chunk of its block, so leave room for it
+        budget = max(config["min_chunk_tokens"], chunk_tokens - estimate(heading))
+        units = _units(block, budget, estimate, lambda piece, limit: split_passages(piece, limit, config))
+        separator = "\n" if block.line_based else "\n\n"
+        for chunk in _pack(units, budget, config["overlap_tokens"], separator, estimate):
+            documents.append(Document(
+                page_content=f"{heading}{chunk}",
+                metadata={**metadata, **{k: v for k, v in block.metadata.items() if v is not None},
+                          "block_index": block_index}
+            ))
+    for chunk_index, document in enumerate(documents):
+        document.metadata["chunk_index"] = chunk_index
+        document.metadata["chunk_count"] = len(documents)
+    return documents
@@ -0,0 +1,247 @@
+import asyncio
+import hashlib
+import logging
+import queue
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+logger = logging.getLogger("ConfigGuidanceAPI")
+
+class _DiskEmbeddingCache:
+    """SQLite store of embeddings keyed by model + content hash."""
+
+    def __init__(self, db_path: str):
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL)")
+        self._conn.commit()
+        self._lock = threading.Lock()
+
+    def get_many(self, keys: List[str]) -> Dict[str, List[float]]:
+        found = {}
+        with self._lock:
+            # SQLite limits bound parameters per statement
+            for start in range(0, len(keys), 500):
+                chunk = keys[start:start + 500]
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(chunk))})", chunk
+                )
+                for key, blob in rows:
+                    found[key] = np.frombuffer(blob, dtype=np.float32).tolist()
+        return found
+
+    def put_many(self, items: Dict[str, List[float]]):
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings VALUES (?, ?)",
+                [(key, np.asarray(vector, dtype=np.float32).tobytes()) for key, vector in items.items()]
+            )
+            self._conn.commit()
+
+class EmbeddingService(Embeddings):
+    """Process-wide embedding model with request batching and a content-hash cache.
+
+    The sentence-transformer is loaded once. Concurrent embed calls are
+    collected for up to ``batch_window_ms`` and encoded in a single model
+    call by one batcher thread. Every vector is cached in memory (LRU) and
+    on disk, keyed by a hash of the model name and text, so identical chunks
+    are only ever embedded once.
+    """
+
+    def __init__(self, model_name: str, config: Dict):
+        self.model_name = model_name
+        self.config = config
+        self._model = None
+        self._model_lock = threading.Lock()
+        self._memory: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._memory_lock = threading.Lock()
+        self._disk = _DiskEmbeddingCache(config["disk_cache_path"]) if config["disk_cache_enabled"] else None
+        self._requests: "queue.Queue" = queue.Queue()
+        self._batcher: Optional[threading.Thread] = None
+        self._stats = {"memory_hits": 0, "disk_hits": 0, "embedded": 0, "batches": 0, "requests": 0}
+
+    # LangChain Embeddings interface
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self._embed(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed([text])[0]
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        return await self._aembed(texts)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return (await self._aembed([text]))[0]
+
+    # Cache
+
+    def _key(self, text: str) -> str:
+        return hashlib.sha256(f"{self.model_name}\0{text}".encode("utf-8")).hexdigest()
+
+    def _lookup(self, keys: List[str]) -> Dict[str, List[float]]:
+        found = {}
+        with self._memory_lock:
+            for key in keys:
+                vector = self._memory.get(key)
+                if vector is not None:
+                    self._memory.move_to_end(key)
+                    found[key] = vector
+            self._stats["memory_hits"] += len(found)
+
+        missing = [key for key in keys if key not in found]
+        if missing and self._disk:
+            from_disk = self._disk.get_many(missing)
+            self._stats["disk_hits"] += len(from_disk)
+            self._remember(from_disk)
+            found.update(from_disk)
+        return found
+
+    def _remember(self, items: Dict[str, List[float]]):
+        limit = self.config["memory_cache_entries"]
+        with self._memory_lock:
+            for key, vector in items.items():
+                self._memory[key] = vector
+                self._memory.move_to_end(key)
+            while len(self._memory) > limit:
+                self._memory.popitem(last=False)
+
+    # Batching
+
+    def _prepare(self, texts: List[str]):
+        """Resolve cached vectors; returns keys, cached vectors and the texts still to embed."""
+        keys = [self._key(text) for text in texts]
+        cached = self._lookup(list(dict.fromkeys(keys)))
+        to_embed = {}
+        for key, text in zip(keys, texts):
+            if key not in cached:
+                to_embed[key] = text
+        return keys, cached, to_embed
+
+    def _submit(self, to_embed: Dict[str, str]) -> Future:
+        self._ensure_batcher()
+        future: Future = Future()
+        self._requests.put((to_embed, future))
+        return future
+
+    def _embed(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        keys, vectors, to_embed = self._prepare(texts)
+        if to_embed:
+            vectors.update(self._submit(to_embed).result())
+        return [vectors[key] for key in keys]
+
+    async def _aembed(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        keys, vectors, to_embed = self._prepare(texts)
+        if to_embed:
+            vectors.update(await asyncio.wrap_future(self._submit(to_embed)))
+        return [vectors[key] for key in keys]
+
+    def _ensure_batcher(self):
+        if self._batcher is None or not self._batcher.is_alive():
+            with self._model_lock:
+                if self._batcher is None or not self._batcher.is_alive():
+                    self._batcher = threading.Thread(target=self._run_batcher, name="embedding-batcher", daemon=True)
+                    self._batcher.start()
+
+    def _load_model(self):
+        if self._model is None:
+            from langchain_huggingface import HuggingFaceEmbeddings
+
+            started = time.time()
+            self._model = HuggingFaceEmbeddings(model_name=self.model_name)
+            logger.info({"message": "Loaded embedding model", "model": self.model_name,
+                         "seconds": round(time.time() - started, 2)})
+        return self._model
+
+    def _run_batcher(self):
+        """Collect requests for a short window, then embed them in one model call."""
+        window = self.config["batch_window_ms"] / 1000
+        max_batch = self.config["max_batch_size"]
+        while True:
+            batch = [self._requests.get()]
+            size = len(batch[0][0])
+            deadline = time.monotonic() + window
+            while size < max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    request = self._requests.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                batch.append(request)
+                size += len(request[0])
+            self._embed_batch(batch)
+
+    def _embed_batch(self, batch):
+        # Texts requested by several callers in the same window are embedded once
+        unique: Dict[str, str] = {}
+        for to_embed, _ in batch:
+            unique.update(to_embed)
+        try:
+            keys = list(unique)
+            vectors = self._load_model().embed_documents([unique[key] for key in keys])
+            embedded = dict(zip(keys, vectors))
+        except Exception as e:
+            logger.error({"message": "Embedding batch failed", "texts": len(unique), "error": str(e)})
+            for _, future in batch:
+                future.set_exception(e)
+            return
+
+        self._remember(embedded)
+        if self._disk:
+            try:
+                self._disk.put_many(embedded)
+            except Exception as e:
+                logger.warning({"message": "Failed to persist embeddings", "error": str(e)})
+
+        self._stats["batches"] += 1
+        self._stats["requests"] += len(batch)
+        self._stats["embedded"] += len(embedded)
+        for to_embed, future in batch:
+            future.set_result({key: embedded[key] for key in to_embed})
+
+    def stats(self) -> Dict:
+        """Cache hit and batching counters."""
+        batches = self._stats["batches"]
+        return {
+            "model": self.model_name,
+            "model_loaded": self._model is not None,
+            "memory_cache_entries": len(self._memory),
+            "disk_cache_enabled": self._disk is not None,
+            **self._stats,
+            "avg_requests_per_batch": round(self._stats["requests"] / batches, 2) if batches else 0.0,
+            "avg_texts_per_batch": round(self._stats["embedded"] / batches, 2) if batches else 0.0
+        }
+
+_services: Dict[str, EmbeddingService] = {}
+_services_lock = threading.Lock()
+
+def get_embedding_service(model_name: str) -> EmbeddingService:
+    """Return the shared embedding service for ``model_name``, creating it once per process."""
+    service = _services.get(model_name)
+    if service is None:
+        with _services_lock:
+            service = _services.get(model_name)
+            if service is None:
+                from backend.config.performance_config import EMBEDDING_SERVICE_CONFIGS
+
+                service = EmbeddingService(model_name, EMBEDDING_SERVICE_CONFIGS)
+                _services[model_name] = service
+    return service
+
+def get_embedding_stats() -> Dict[str, Dict]:
+    return {model_name: service.stats() for model_name, service in _services.items()}
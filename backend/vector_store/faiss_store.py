@@ -1,29 +1,42 @@
+import uuid
+
 from langchain_community.vectorstores import FAISS
-from langchain_huggingface import HuggingFaceEmbeddings
-from langchain.docstore.document import Document
-from pathlib import Path
+
+from .chunking import chunk_parsed
+from .embedding_service import get_embedding_service
+from .lexical_index import LEXICAL_DIRNAME, open_lexical_index
+from .metadata_index import build_metadata_index
+from .mmap_store import export_docstore, save_index
+from .snapshots import SnapshotStore
 
 EMBEDDING_MODEL = "all-MiniLM-L6-v2"
 FAISS_INDEX_PATH = "./faiss_index"
 
 def create_vector_store(parsed_data):
-    """Create or update FAISS vector store with embeddings."""
+    """Create or update FAISS vector store with embeddings, published as a new index snapshot."""
     if not parsed_data:
         raise ValueError("parsed_data is empty. Cannot create vector store with no data.")
-    embedding_model = HuggingFaceEmbeddings(model_name=EMBEDDING_MODEL)
-    documents = [
-        Document(page_content=data["content"], metadata=data["metadata"])
-        for data in parsed_data
-    ]
-    index_file = Path(FAISS_INDEX_PATH) / "index.faiss"
-    if index_file.exists():
-        try:
-            vector_store = FAISS.load_local(FAISS_INDEX_PATH, embeddings=embedding_model, allow_dangerous_deserialization=True)
-            vector_store.add_documents(documents)
-        except Exception as e:
-            print(f"Error loading existing FAISS index: {e}. Creating new index.")
-            vector_store = FAISS.from_documents(documents, embedding_model)
-    else:
-        vector_store = FAISS.from_documents(documents, embedding_model)
-    vector_store.save_local(FAISS_INDEX_PATH)
-    return vector_store
\ No newline at end of file
+    embedding_model = get_embedding_service(EMBEDDING_MODEL)
+    documents = [chunk for data in parsed_data for chunk in chunk_parsed(data)]
+    ids = [str(uuid.uuid4()) for _ in documents]
+    snapshots = SnapshotStore(FAISS_INDEX_PATH)
+    with snapshots.stage() as staging:
+        vector_store = None
+        if (staging / "index.faiss").exists():
+            try:
+                vector_store = FAISS.load_local(str(staging), embeddings=embedding_model, allow_dangerous_deserialization=True)
+            except Exception as e:
+                print(f"Error loading existing FAISS index: {e}. Creating new index.")
+        lexical, _ = open_lexical_index(vector_store, staging)
+        if vector_store is not None:
+            vector_store.add_documents(documents, ids=ids)
+        else:
+            vector_store = FAISS.from_documents(documents, embedding_model, ids=ids)
+        save_index(vector_store, staging)
+        export_docstore(vector_store, staging)
+        build_metadata_index(vector_store, staging)
+        if lexical is not None:
+            lexical.add_documents(documents, ids)
+            lexical.commit(staging / LEXICAL_DIRNAME)
+        snapshots.publish(staging, source="create_vector_store", info={"documents_added": len(documents)})
+    return vector_store
@@ -0,0 +1,364 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from langchain.docstore.document import Document
+
+from .ann_index import ann_index_current, build_ann_index
+from .chunking import chunk_parsed, chunking_signature
+from .embedding_service import get_embedding_service
+from .faiss_store import EMBEDDING_MODEL
+from .lexical_index import LEXICAL_DIRNAME, LexicalIndex, load_lexical_index, open_lexical_index
+from .metadata_index import build_metadata_index, metadata_index_current
+from .mmap_store import DOCSTORE_FILENAME, SQLiteDocstore, docstore_matches_index, export_docstore, save_index
+from .parallel_ingest import iter_parsed
+
+logger = logging.getLogger("ConfigGuidanceAPI")
+
+MANIFEST_FILENAME = "ingest_manifest.sqlite"
+SUPPORTED_EXTENSIONS = (".pdf", ".yaml", ".yml", ".sh", ".html", ".htm")
+HASH_BLOCK_SIZE = 1024 * 1024
+
+@dataclass
+class FileRecord:
+    """What the manifest knows about one ingested file."""
+    path: str
+    size: int
+    mtime_ns: int
+    content_hash: str
+    vector_ids: List[str] = field(default_factory=list)
+
+@dataclass
+class IngestionPlan:
+    """Files grouped by what a sync has to do with them."""
+    new: List[FileRecord] = field(default_factory=list)
+    changed: List[FileRecord] = field(default_factory=list)
+    unchanged: List[FileRecord] = field(default_factory=list)
+    removed: List[FileRecord] = field(default_factory=list)
+
+class IngestionManifest:
+    """SQLite record of every ingested file and the vector IDs it produced."""
+
+    def __init__(self, db_path: str):
+        self.db_path = str(db_path)
+        Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(self.db_path)
+        self._conn.execute("CREATE TABLE IF NOT EXISTS settings (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS files (
+                path TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                content_hash TEXT NOT NULL,
+                vector_ids TEXT NOT NULL,
+                indexed_at REAL NOT NULL
+            )"""
+        )
+        self._conn.commit()
+
+    def records(self) -> Dict[str, FileRecord]:
+        rows = self._conn.execute("SELECT path, size, mtime_ns, content_hash, vector_ids FROM files")
+        return {
+            path: FileRecord(path, size, mtime_ns, content_hash, json.loads(vector_ids))
+            for path, size, mtime_ns, content_hash, vector_ids in rows
+        }
+
+    def __len__(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM files").fetchone()[0]
+
+    def upsert(self, record: FileRecord):
+        self._conn.execute(
+            "INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?)",
+            (record.path, record.size, record.mtime_ns, record.content_hash,
+             json.dumps(record.vector_ids), time.time())
+        )
+
+    def setting(self, key: str) -> Optional[str]:
+        row = self._conn.execute("SELECT value FROM settings WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def set_setting(self, key: str, value: str):
+        self._conn.execute("INSERT OR REPLACE INTO settings VALUES (?, ?)", (key, value))
+
+    def remove(self, path: str):
+        self._conn.execute("DELETE FROM files WHERE path = ?", (path,))
+
+    def clear(self):
+        self._conn.execute("DELETE FROM files")
+
+    @property
+    def changes(self) -> int:
+        """Rows written through this connection, committed or not."""
+        return self._conn.total_changes
+
+    def commit(self):
+        self._conn.commit()
+
+    def rollback(self):
+        self._conn.rollback()
+
+    def close(self):
+        self._conn.close()
+
+def hash_file(file_path: str) -> str:
+    """SHA-256 of a file's content, read in blocks."""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def plan_ingestion(root_path: str, manifest: IngestionManifest,
+                   extensions: Tuple[str, ...] = SUPPORTED_EXTENSIONS) -> IngestionPlan:
+    """Compare the files under ``root_path`` with the manifest.
+
+    Files whose size and mtime match the manifest are trusted without being
+    read; otherwise the content hash decides whether the file really changed.
+    """
+    known = manifest.records()
+    plan = IngestionPlan()
+    seen = set()
+
+    for root, _, files in os.walk(root_path):
+        for file in files:
+            if not file.endswith(extensions):
+                continue
+            file_path = os.path.join(root, file)
+            try:
+                stat = os.stat(file_path)
+            except OSError as e:
+                logger.warning({"message": f"Cannot stat file: {file_path}", "error": str(e)})
+                continue
+            seen.add(file_path)
+            previous = known.get(file_path)
+
+            if previous and previous.size == stat.st_size and previous.mtime_ns == stat.st_mtime_ns:
+                plan.unchanged.append(previous)
+                continue
+
+            record = FileRecord(file_path, stat.st_size, stat.st_mtime_ns, hash_file(file_path))
+            if previous is None:
+                plan.new.append(record)
+            elif previous.content_hash == record.content_hash:
+                # Touched but identical: keep the vectors, refresh size/mtime
+                record.vector_ids = previous.vector_ids
+                plan.unchanged.append(record)
+                manifest.upsert(record)
+            else:
+                record.vector_ids = previous.vector_ids  # Stale IDs, deleted during sync
+                plan.changed.append(record)
+
+    plan.removed = [record for path, record in known.items() if path not in seen]
+    return plan
+
+def _vector_ids(record: FileRecord, count: int) -> List[str]:
+    """Deterministic IDs so a re-run after a crash replaces rather than duplicates vectors."""
+    path_key = hashlib.sha1(record.path.encode()).hexdigest()[:16]
+    return [f"{path_key}:{record.content_hash[:12]}:{i}" for i in range(count)]
+
+def _as_documents(parsed) -> List[Document]:
+    """Normalize a parser result (dict, Document or list of either) to chunked Documents."""
+    if parsed is None:
+        return []
+    items = parsed if isinstance(parsed, list) else [parsed]
+    documents = []
+    for item in items:
+        if isinstance(item, Document) or (isinstance(item, dict) and item.get("content")):
+            documents.extend(chunk_parsed(item))
+    return documents
+
+def _delete_vectors(vector_store, lexical: Optional[LexicalIndex], vector_ids: List[str]) -> int:
+    if vector_store is None or not vector_ids:
+        return 0
+    # Docstore lookups are O(1); sync calls this once per parsed file
+    present = vector_store.docstore._dict
+    to_delete = [vector_id for vector_id in vector_ids if vector_id in present]
+    if to_delete:
+        vector_store.delete(to_delete)
+        if lexical is not None:
+            lexical.delete(to_delete)
+    return len(to_delete)
+
+def _add_batch(vector_store, lexical: Optional[LexicalIndex], documents: List[Document], ids: List[str],
+               embedding_model):
+    """Embed a batch into the index, creating the index on the first batch."""
+    from langchain_community.vectorstores import FAISS
+
+    if lexical is not None:
+        lexical.add_documents(documents, ids)
+    if vector_store is None:
+        return FAISS.from_documents(documents, embedding_model, ids=ids)
+    vector_store.add_documents(documents, ids=ids)
+    return vector_store
+
+def index_up_to_date(root_path: str, index_path: str,
+                     extensions: Tuple[str, ...] = SUPPORTED_EXTENSIONS, ann_config: Optional[Dict] = None) -> bool:
+    """True if ``sync_vector_store`` would leave the index at ``index_path`` as it is.
+
+    Only manifests and file metadata are read (files whose size or mtime
+    changed are hashed); nothing is loaded or written. Callers use it to
+    skip staging a snapshot when the share has not changed.
+    """
+    from backend.config.performance_config import ANN_INDEX_CONFIGS, LEXICAL_INDEX_CONFIGS
+
+    index_path = Path(index_path)
+    if not ((index_path / "index.faiss").exists() and (index_path / MANIFEST_FILENAME).exists()):
+        return False
+    if not (docstore_matches_index(index_path) and ann_index_current(index_path, ann_config or ANN_INDEX_CONFIGS)
+            and metadata_index_current(index_path)):
+        return False
+    if LEXICAL_INDEX_CONFIGS["enabled"]:
+        lexical = load_lexical_index(index_path)
+        ntotal = int(SQLiteDocstore(index_path / DOCSTORE_FILENAME).info()["ntotal"])
+        if lexical is None or len(lexical) != ntotal:
+            return False
+
+    manifest = IngestionManifest(index_path / MANIFEST_FILENAME)
+    try:
+        if len(manifest) == 0 or manifest.setting("chunking") != chunking_signature():
+            return False
+        plan = plan_ingestion(root_path, manifest, extensions)
+        # Touched but identical files only refresh their manifest rows, which is still an update
+        return not (plan.new or plan.changed or plan.removed or manifest.changes)
+    finally:
+        manifest.rollback()
+        manifest.close()
+
+def sync_vector_store(root_path: str, index_path: str, parse_file: Callable[[str, str], object],
+                      embedding_model=None, rebuild: bool = False,
+                      extensions: Tuple[str, ...] = SUPPORTED_EXTENSIONS,
+                      workers: Optional[int] = None, ann_config: Optional[Dict] = None):
+    """Bring the FAISS index at ``index_path`` in line with the files under ``root_path``.
+
+    Only new and changed files are parsed and embedded; vectors of changed and
+    removed files are deleted. ``parse_file(file_path, relative_dir)`` returns
+    a parsed dict, a Document, a list of either, or None. It runs in parser
+    processes when ``workers`` > 1, so it must be a module-level function.
+    After saving, the ANN index selected by ``ann_config`` (default
+    ANN_INDEX_CONFIGS) is rebuilt from the flat index if it is out of date.
+    The BM25 lexical index under ``lexical/`` gets the same additions and
+    deletions, keyed by the same vector IDs. The metadata filter index under
+    ``metadata/`` is rebuilt, since deletions shift FAISS positions.
+
+    Files are written in place under ``index_path``; callers serving the
+    index pass a snapshot staging directory (see snapshots.SnapshotStore).
+
+    Returns ``(vector_store, report)``; vector_store is None if nothing is
+    indexed, and ``report["index_updated"]`` says whether any file changed.
+    """
+    from langchain_community.vectorstores import FAISS
+    from backend.config.performance_config import ANN_INDEX_CONFIGS, INGESTION_CONFIGS
+
+    started = time.time()
+    workers = workers or INGESTION_CONFIGS["parse_workers"]
+    ann_config = ann_config or ANN_INDEX_CONFIGS
+    embedding_model = embedding_model or get_embedding_service(EMBEDDING_MODEL)
+    manifest = IngestionManifest(Path(index_path) / MANIFEST_FILENAME)
+    index_file = Path(index_path) / "index.faiss"
+
+    vector_store = None
+    chunking = chunking_signature()
+    if index_file.exists() and not rebuild:
+        if len(manifest) == 0:
+            # Index built before the manifest existed: its vectors cannot be attributed to files
+            logger.warning({"message": "FAISS index has no ingestion manifest, rebuilding", "path": index_path})
+        elif manifest.setting("chunking") != chunking:
+            # Vectors of unchanged files were cut differently; re-embed everything consistently
+            logger.warning({"message": "Chunking settings changed, rebuilding FAISS index", "path": index_path})
+            rebuild = True
+        else:
+            vector_store = FAISS.load_local(index_path, embeddings=embedding_model, allow_dangerous_deserialization=True)
+    if vector_store is None:
+        manifest.clear()
+        manifest.set_setting("chunking", chunking)
+    lexical, lexical_rebuilt = open_lexical_index(vector_store, index_path)
+
+    try:
+        plan = plan_ingestion(root_path, manifest, extensions)
+
+        vectors_deleted = 0
+        for record in plan.changed + plan.removed:
+            vectors_deleted += _delete_vectors(vector_store, lexical, record.vector_ids)
+        for record in plan.removed:
+            manifest.remove(record.path)
+
+        vectors_added, failed = 0, 0
+        tasks = [
+            (record.path, os.path.relpath(os.path.dirname(record.path), root_path), record)
+            for record in plan.new + plan.changed
+        ]
+        outcomes = iter_parsed(
+            tasks, parse_file, workers,
+            INGESTION_CONFIGS["parse_timeout"], INGESTION_CONFIGS["result_queue_size"]
+        )
+        documents, ids, batch_files = [], [], 0
+        # Parser processes keep working on the next files while a batch is embedded
+        for (file_path, _, record), parsed, error in outcomes:
+            if error:
+                logger.error({"message": f"Failed to process file: {file_path}", "error": error})
+                failed += 1
+                manifest.remove(file_path)  # Retry on the next sync
+                continue
+            file_documents = _as_documents(parsed)
+            record.vector_ids = _vector_ids(record, len(file_documents))
+            # Clear leftovers from an interrupted earlier run with the same content
+            _delete_vectors(vector_store, lexical, record.vector_ids)
+            documents.extend(file_documents)
+            ids.extend(record.vector_ids)
+            manifest.upsert(record)
+            batch_files += 1
+
+            if batch_files >= INGESTION_CONFIGS["embed_batch_files"] and documents:
+                vector_store = _add_batch(vector_store, lexical, documents, ids, embedding_model)
+                vectors_added += len(documents)
+                documents, ids, batch_files = [], [], 0
+
+        if documents:
+            vector_store = _add_batch(vector_store, lexical, documents, ids, embedding_model)
+            vectors_added += len(documents)
+
+        saved = bool(vector_store is not None and (vectors_added or vectors_deleted or rebuild))
+        updated = saved
+        if saved:
+            save_index(vector_store, index_path)
+        if vector_store is not None and (saved or not docstore_matches_index(index_path)):
+            # Docstore for read-only, memory-mapped loading by the API workers
+            export_docstore(vector_store, index_path)
+            updated = True
+        if vector_store is not None and (saved or not ann_index_current(index_path, ann_config)):
+            build_ann_index(vector_store, index_path, ann_config)
+            updated = True
+        if vector_store is not None and lexical is not None and (saved or lexical_rebuilt):
+            lexical.commit(Path(index_path) / LEXICAL_DIRNAME)
+            updated = True
+        if vector_store is not None and (saved or not metadata_index_current(index_path)):
+            build_metadata_index(vector_store, index_path)
+            updated = True
+        updated = updated or manifest.changes > 0
+        # The manifest is committed only after the index it describes is on disk
+        manifest.commit()
+    except Exception:
+        manifest.rollback()
+        raise
+    finally:
+        manifest.close()
+
+    report = {
+        "new_files": len(plan.new),
+        "changed_files": len(plan.changed),
+        "unchanged_files": len(plan.unchanged),
+        "removed_files": len(plan.removed),
+        "failed_files": failed,
+        "vectors_added": vectors_added,
+        "vectors_deleted": vectors_deleted,
+        "index_updated": updated,
+        "seconds": round(time.time() - started, 2)
+    }
+    logger.info({"message": "Incremental ingestion complete", "root": root_path, **report})
+    return vector_store, report
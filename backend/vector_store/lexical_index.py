@@ -0,0 +1,505 @@
+import hashlib
+import heapq
+import json
+import logging
+import os
+import re
+import shutil
+import threading
+import weakref
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+import numpy as np
+from langchain.docstore.document import Document
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.retrievers import BaseRetriever
+
+logger = logging.getLogger("ConfigGuidanceAPI")
+
+LEXICAL_DIRNAME = "lexical"
+MANIFEST_FILENAME = "manifest.json"
+# Bump when tokenize() changes; indexes built with another version are rebuilt
+TOKENIZER_VERSION = 1
+
+# Flags (--all-namespaces), dotted/dashed/pathed names (pod.spec, openshift-monitoring,
+# quay.io/org/image:tag, v4.16) and plain words, matched on the original text
+_TOKEN = re.compile(r"-{1,2}[a-z0-9][\w-]*|[a-z0-9](?:[\w.\-/:]*[a-z0-9])?", re.IGNORECASE)
+_PART = re.compile(r"[a-z0-9]+")
+_CAMEL_PART = re.compile(r"[A-Z]+(?![a-z])|[A-Z]?[a-z]+|\d+")
+_CAMEL_BOUNDARY = re.compile(r"[a-z][A-Z]")
+_STOPWORDS = frozenset(
+    "a an and are as at be but by can do does for from has have how i if in into is it its of on or "
+    "should so that the their then there these this to was what when where which while who why will "
+    "with you your".split()
+)
+
+def tokenize(text: str) -> List[str]:
+    """Lower-cased terms, keeping compound identifiers whole and also indexing their parts.
+
+    ``CrashLoopBackOff`` yields crashloopbackoff, crash, loop, back, off;
+    ``openshift-monitoring`` yields itself plus openshift and monitoring; a
+    flag like ``--all-namespaces`` is kept with its dashes, so exact
+    resource names, flags and error strings match exactly while partial
+    queries still match their parts.
+    """
+    terms = []
+    for match in _TOKEN.finditer(text):
+        raw = match.group(0)
+        term = raw.lower()
+        if term in _STOPWORDS:
+            continue
+        terms.append(term)
+        parts = _PART.findall(term)
+        if len(parts) > 1:
+            terms.extend(part for part in parts if len(part) > 1 and part not in _STOPWORDS)
+        elif _CAMEL_BOUNDARY.search(raw):
+            camel = _CAMEL_PART.findall(raw)
+            if len(camel) > 1:
+                terms.extend(part.lower() for part in camel if len(part) > 1)
+    return terms
+
+def _term_hash(term: str) -> int:
+    return int.from_bytes(hashlib.blake2b(term.encode("utf-8"), digest_size=8).digest(), "little")
+
+def doc_id_hashes(doc_ids: Iterable[str]) -> np.ndarray:
+    """64-bit hashes of document IDs, as matched by a search's ``doc_filter``."""
+    return np.array([_term_hash(doc_id) for doc_id in doc_ids], dtype=np.uint64)
+
+class _Segment:
+    """An immutable block of the inverted index; only its deletion bitmap changes.
+
+    Terms are stored as sorted 64-bit hashes with offsets into flat postings
+    arrays (local doc numbers and term frequencies, sorted by doc), so a
+    saved segment is a handful of ``.npy`` files that load memory-mapped.
+    Per-term max tf and min doc length give BM25 upper bounds for pruning.
+    """
+
+    ARRAYS = ("term_hashes", "term_offsets", "term_max_tf", "term_min_length",
+              "postings_docs", "postings_tf", "doc_lengths", "doc_id_offsets", "doc_id_bytes")
+
+    def __init__(self, arrays: Dict[str, np.ndarray], deleted: Optional[np.ndarray] = None, name: str = None):
+        for key in self.ARRAYS:
+            setattr(self, key, arrays[key])
+        self.n_docs = len(self.doc_lengths)
+        self.deleted = np.zeros(self.n_docs, dtype=bool) if deleted is None else deleted
+        self.name = name                # Directory name once saved
+        self.deleted_dirty = False      # Deletion bitmap changed since it was saved
+        self._id_hashes: Optional[np.ndarray] = None
+        self._filter_masks = weakref.WeakKeyDictionary()  # doc_filter -> documents it excludes
+        self._refresh_counts()
+
+    def _refresh_counts(self):
+        self.deleted_count = int(self.deleted.sum())
+        self.live_count = self.n_docs - self.deleted_count
+        self.live_length = int(np.asarray(self.doc_lengths, dtype=np.int64)[~self.deleted].sum()) if self.n_docs else 0
+
+    @classmethod
+    def build(cls, doc_ids: List[str], token_lists: List[List[str]]) -> "_Segment":
+        hashes, docs, tfs, hash_cache = [], [], [], {}
+        for local, terms in enumerate(token_lists):
+            for term, tf in Counter(terms).items():
+                term_hash = hash_cache.get(term)
+                if term_hash is None:
+                    term_hash = hash_cache[term] = _term_hash(term)
+                hashes.append(term_hash)
+                docs.append(local)
+                tfs.append(min(tf, 65535))
+        return cls._from_postings(
+            np.array(hashes, dtype=np.uint64), np.array(docs, dtype=np.int32), np.array(tfs, dtype=np.uint16),
+            np.array([len(terms) for terms in token_lists], dtype=np.int32), doc_ids
+        )
+
+    @classmethod
+    def merge(cls, segments: List["_Segment"]) -> "_Segment":
+        """One segment holding the live documents of ``segments``; deleted documents are dropped."""
+        hashes, docs, tfs, lengths, doc_ids, base = [], [], [], [], [], 0
+        for segment in segments:
+            live = ~segment.deleted
+            new_local = np.cumsum(live, dtype=np.int64) - 1 + base
+            postings_docs = np.asarray(segment.postings_docs)
+            keep = live[postings_docs]
+            hashes.append(np.repeat(np.asarray(segment.term_hashes), np.diff(segment.term_offsets))[keep])
+            docs.append(new_local[postings_docs[keep]].astype(np.int32))
+            tfs.append(np.asarray(segment.postings_tf)[keep])
+            lengths.append(np.asarray(segment.doc_lengths)[live])
+            doc_ids.extend(doc_id for doc_id, alive in zip(segment.doc_ids(), live) if alive)
+            base += int(live.sum())
+        return cls._from_postings(
+            np.concatenate(hashes) if hashes else np.empty(0, np.uint64),
+            np.concatenate(docs) if docs else np.empty(0, np.int32),
+            np.concatenate(tfs) if tfs else np.empty(0, np.uint16),
+            np.concatenate(lengths) if lengths else np.empty(0, np.int32), doc_ids
+        )
+
+    @classmethod
+    def _from_postings(cls, hashes, docs, tfs, doc_lengths, doc_ids: List[str]) -> "_Segment":
+        order = np.lexsort((docs, hashes))
+        hashes, docs, tfs = hashes[order], docs[order], tfs[order]
+        term_hashes, starts = np.unique(hashes, return_index=True)
+        encoded = [doc_id.encode("utf-8") for doc_id in doc_ids]
+        doc_id_offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        doc_id_offsets[1:] = np.cumsum([len(e) for e in encoded])
+        return cls({
+            "term_hashes": term_hashes.astype(np.uint64),
+            "term_offsets": np.append(starts, len(hashes)).astype(np.int64),
+            "term_max_tf": np.maximum.reduceat(tfs, starts) if len(tfs) else np.empty(0, np.uint16),
+            "term_min_length": np.minimum.reduceat(doc_lengths[docs], starts) if len(docs) else np.empty(0, np.int32),
+            "postings_docs": docs.astype(np.int32),
+            "postings_tf": tfs.astype(np.uint16),
+            "doc_lengths": doc_lengths.astype(np.int32),
+            "doc_id_offsets": doc_id_offsets,
+            "doc_id_bytes": np.frombuffer(b"".join(encoded), dtype=np.uint8)
+        })
+
+    def postings(self, term_hash: int) -> Optional[Tuple[np.ndarray, np.ndarray, int, int]]:
+        """(docs, tfs, max_tf, min_length) for a term, or None if it does not occur here."""
+        i = int(np.searchsorted(self.term_hashes, np.uint64(term_hash)))
+        if i >= len(self.term_hashes) or int(self.term_hashes[i]) != term_hash:
+            return None
+        start, end = int(self.term_offsets[i]), int(self.term_offsets[i + 1])
+        return (self.postings_docs[start:end], self.postings_tf[start:end],
+                int(self.term_max_tf[i]), int(self.term_min_length[i]))
+
+    def doc_id(self, local: int) -> str:
+        start, end = int(self.doc_id_offsets[local]), int(self.doc_id_offsets[local + 1])
+        return bytes(self.doc_id_bytes[start:end]).decode("utf-8")
+
+    def excluded_by(self, doc_filter) -> np.ndarray:
+        """Documents ``doc_filter`` rejects, computed once per filter from hashed document IDs."""
+        mask = self._filter_masks.get(doc_filter)
+        if mask is None:
+            if self._id_hashes is None:
+                self._id_hashes = doc_id_hashes(self.doc_ids())
+            mask = self._filter_masks[doc_filter] = ~doc_filter.allows(self._id_hashes)
+        return mask
+
+    def doc_ids(self) -> List[str]:
+        blob = bytes(self.doc_id_bytes)
+        offsets = np.asarray(self.doc_id_offsets).tolist()
+        return [blob[offsets[i]:offsets[i + 1]].decode("utf-8") for i in range(self.n_docs)]
+
+    def delete(self, locals_: Iterable[int]):
+        locals_ = list(locals_)
+        if locals_:
+            if not self.deleted.flags.writeable:
+                self.deleted = self.deleted.copy()
+            self.deleted[locals_] = True
+            self.deleted_dirty = True
+            self._refresh_counts()
+
+    def save(self, path: Path):
+        path.mkdir(parents=True, exist_ok=True)
+        for key in self.ARRAYS:
+            np.save(path / f"{key}.npy", getattr(self, key))
+        self.save_deleted(path)
+
+    def save_deleted(self, path: Path):
+        tmp = path / f"deleted.{os.getpid()}.tmp.npy"
+        np.save(tmp, self.deleted)
+        os.replace(tmp, path / "deleted.npy")
+        self.deleted_dirty = False
+
+    @classmethod
+    def load(cls, path: Path, mmap: bool = True) -> "_Segment":
+        arrays = {key: np.load(path / f"{key}.npy", mmap_mode="r" if mmap else None) for key in cls.ARRAYS}
+        # Deletions are updated in memory, so the bitmap is always a private copy
+        return cls(arrays, np.array(np.load(path / "deleted.npy")), name=path.name)
+
+    def disk_bytes(self) -> int:
+        return sum(getattr(self, key).nbytes for key in self.ARRAYS) + self.deleted.nbytes
+
+class LexicalIndex:
+    """BM25 keyword index over chunks, the lexical half of hybrid search.
+
+    Documents are identified by the same IDs as their FAISS vectors. New
+    documents collect in a buffer that becomes a segment when it is full,
+    when searched, or on ``commit``; deletes are tombstones in the segment
+    bitmaps. ``commit`` writes new segments and bitmaps, merges segments
+    when there are too many or too much is deleted, and replaces the
+    manifest atomically. Saved segments load memory-mapped, so API workers
+    share the postings through the page cache.
+
+    Search is term-at-a-time with MaxScore-style pruning: terms are scored
+    from the highest BM25 upper bound down, and once the bounds of the
+    remaining terms cannot lift an unseen document into the top k, those
+    (usually long, common-term) posting lists are only probed for the
+    existing candidates instead of being scanned.
+    """
+
+    def __init__(self, config: Dict = None):
+        if config is None:
+            from backend.config.performance_config import LEXICAL_INDEX_CONFIGS as config
+        self.config = config
+        self.k1, self.b = float(config["k1"]), float(config["b"])
+        self.segments: List[_Segment] = []
+        self.path: Optional[Path] = None
+        self._buffer_ids: List[str] = []
+        self._buffer_tokens: List[List[str]] = []
+        self._id_locations: Optional[Dict[str, Tuple[_Segment, int]]] = None  # Built on first delete
+        self._next_segment = 1
+        self._lock = threading.RLock()
+
+    # Writing
+
+    def add(self, ids: List[str], texts: List[str]):
+        with self._lock:
+            self._buffer_ids.extend(ids)
+            self._buffer_tokens.extend(tokenize(text) for text in texts)
+            if len(self._buffer_ids) >= self.config["buffer_docs"]:
+                self._flush()
+
+    def add_documents(self, documents: List[Document], ids: List[str]):
+        self.add(ids, [document.page_content for document in documents])
+
+    def _flush(self):
+        if not self._buffer_ids:
+            return
+        segment = _Segment.build(self._buffer_ids, self._buffer_tokens)
+        self.segments.append(segment)
+        if self._id_locations is not None:
+            self._id_locations.update((doc_id, (segment, local)) for local, doc_id in enumerate(self._buffer_ids))
+        self._buffer_ids, self._buffer_tokens = [], []
+
+    def delete(self, ids: Iterable[str]) -> int:
+        """Delete documents by ID; unknown IDs are ignored. Returns how many were deleted."""
+        with self._lock:
+            self._flush()
+            if self._id_locations is None:
+                self._id_locations = {
+                    doc_id: (segment, local)
+                    for segment in self.segments
+                    for local, doc_id in enumerate(segment.doc_ids()) if not segment.deleted[local]
+                }
+            by_segment: Dict[int, Tuple[_Segment, List[int]]] = {}
+            for doc_id in ids:
+                location = self._id_locations.pop(doc_id, None)
+                if location is not None:
+                    by_segment.setdefault(id(location[0]), (location[0], []))[1].append(location[1])
+            for segment, locals_ in by_segment.values():
+                segment.delete(locals_)
+            return sum(len(locals_) for _, locals_ in by_segment.values())
+
+    def commit(self, path: Union[str, Path] = None):
+        """Persist the index under ``path`` (default: where it was loaded from)."""
+        with self._lock:
+            path = Path(path or self.path)
+            self._flush()
+            self._maybe_merge()
+            path.mkdir(parents=True, exist_ok=True)
+            for segment in self.segments:
+                if segment.name is None or not (path / segment.name).is_dir():
+                    segment.name = f"seg_{self._next_segment:06d}"
+                    self._next_segment += 1
+                    segment.save(path / segment.name)
+                elif segment.deleted_dirty:
+                    segment.save_deleted(path / segment.name)
+            manifest = {
+                "tokenizer_version": TOKENIZER_VERSION,
+                "k1": self.k1,
+                "b": self.b,
+                "segments": [segment.name for segment in self.segments],
+                "next_segment": self._next_segment
+            }
+            tmp = path / f"{MANIFEST_FILENAME}.{os.getpid()}.tmp"
+            tmp.write_text(json.dumps(manifest, indent=2))
+            os.replace(tmp, path / MANIFEST_FILENAME)
+            live = set(manifest["segments"])
+            for child in path.iterdir():
+                if child.is_dir() and child.name.startswith("seg_") and child.name not in live:
+                    shutil.rmtree(child, ignore_errors=True)
+            self.path = path
+
+    def _maybe_merge(self):
+        n_docs = sum(segment.n_docs for segment in self.segments)
+        deleted = sum(segment.deleted_count for segment in self.segments)
+        if len(self.segments) > self.config["max_segments"] or (n_docs and deleted / n_docs > self.config["max_deleted_ratio"]):
+            logger.info({"message": "Merging lexical index segments", "segments": len(self.segments),
+                         "documents": n_docs, "deleted": deleted})
+            self.segments = [_Segment.merge(self.segments)]
+            self._id_locations = None
+
+    @classmethod
+    def load(cls, path: Union[str, Path], mmap: bool = True, config: Dict = None) -> "LexicalIndex":
+        """Open a committed index; raises FileNotFoundError or ValueError if it is missing or incompatible."""
+        path = Path(path)
+        manifest = json.loads((path / MANIFEST_FILENAME).read_text())
+        if manifest.get("tokenizer_version") != TOKENIZER_VERSION:
+            raise ValueError(f"lexical index in {path} was built with tokenizer version {manifest.get('tokenizer_version')}")
+        index = cls(config)
+        index.k1, index.b = manifest["k1"], manifest["b"]
+        index.segments = [_Segment.load(path / name, mmap) for name in manifest["segments"]]
+        index._next_segment = manifest["next_segment"]
+        index.path = path
+        return index
+
+    @classmethod
+    def from_docstore(cls, vector_store, config: Dict = None) -> "LexicalIndex":
+        """Build an index over every document of a FAISS store, keyed by its docstore IDs."""
+        index = cls(config)
+        ids, texts = [], []
+        for doc_id in vector_store.index_to_docstore_id.values():
+            document = vector_store.docstore.search(doc_id)
+            if isinstance(document, Document):
+                ids.append(doc_id)
+                texts.append(document.page_content)
+            if len(ids) >= index.config["buffer_docs"]:
+                index.add(ids, texts)
+                ids, texts = [], []
+        index.add(ids, texts)
+        return index
+
+    # Reading
+
+    def __len__(self) -> int:
+        with self._lock:
+            return sum(segment.live_count for segment in self.segments) + len(self._buffer_ids)
+
+    def _bm25(self, tf, length, avg_length: float):
+        tf = np.asarray(tf, dtype=np.float64)
+        return tf * (self.k1 + 1) / (tf + self.k1 * (1 - self.b + self.b * np.asarray(length, dtype=np.float64) / avg_length))
+
+    def search(self, query: str, k: int = 5, doc_filter=None) -> List[Tuple[str, float]]:
+        """Top-k ``(document ID, BM25 score)`` for a query, best first.
+
+        ``doc_filter`` restricts the search to the documents it allows:
+        anything with an ``allows(id_hashes)`` method returning a boolean
+        mask over ``doc_id_hashes`` of document IDs, such as a metadata
+        Selection. Excluded documents are skipped while scoring, so the top
+        k are the best allowed documents; collection statistics (IDF,
+        average length) still cover the whole index.
+        """
+        with self._lock:
+            self._flush()
+            segments = list(self.segments)
+        term_hashes = list(dict.fromkeys(_term_hash(term) for term in tokenize(query)))
+        n_docs = sum(segment.live_count for segment in segments)
+        if not term_hashes or not n_docs or k <= 0:
+            return []
+        avg_length = max(1.0, sum(segment.live_length for segment in segments) / n_docs)
+
+        postings = [[segment.postings(term_hash) for term_hash in term_hashes] for segment in segments]
+        # Document frequency and collection size both count tombstoned documents
+        # (Lucene's maxDoc), so df <= max_docs and every IDF stays non-negative,
+        # which the MaxScore bounds in _search_segment rely on
+        df = np.array([sum(len(p[t][0]) for p in postings if p[t] is not None) for t in range(len(term_hashes))],
+                      dtype=np.float64)
+        max_docs = sum(segment.n_docs for segment in segments)
+        idf = np.log1p((max_docs - df + 0.5) / (df + 0.5))
+
+        heap: List[Tuple[float, int, int]] = []  # (score, segment number, local doc), k best so far
+        for number, (segment, segment_postings) in enumerate(zip(segments, postings)):
+            threshold = heap[0][0] if len(heap) >= k else 0.0
+            blocked = segment.deleted if segment.deleted_count else None
+            if doc_filter is not None:
+                excluded = segment.excluded_by(doc_filter)
+                blocked = excluded if blocked is None else blocked | excluded
+            for local, score in self._search_segment(segment, segment_postings, idf, avg_length, k, threshold, blocked):
+                entry = (score, number, local)
+                if len(heap) < k:
+                    heapq.heappush(heap, entry)
+                elif entry > heap[0]:
+                    heapq.heapreplace(heap, entry)
+        return [(segments[number].doc_id(local), score) for score, number, local in sorted(heap, reverse=True)]
+
+    def _search_segment(self, segment: _Segment, postings, idf, avg_length: float, k: int,
+                        threshold: float, blocked: Optional[np.ndarray]) -> List[Tuple[int, float]]:
+        terms = [
+            (idf[t] * float(self._bm25(p[2], p[3], avg_length)), p[0], p[1], idf[t])
+            for t, p in enumerate(postings) if p is not None
+        ]
+        if not terms:
+            return []
+        terms.sort(key=lambda term: term[0], reverse=True)
+        # remaining[i]: the most any document can still gain from terms i..n
+        remaining = np.cumsum([term[0] for term in terms][::-1])[::-1]
+        lengths = segment.doc_lengths
+        cand_docs, cand_scores = np.empty(0, dtype=np.int32), np.empty(0, dtype=np.float64)
+
+        for i, (_, docs, tfs, term_idf) in enumerate(terms):
+            kth = np.partition(cand_scores, -k)[-k] if len(cand_scores) >= k else 0.0
+            bar = max(threshold, kth)
+            if remaining[i] <= bar:
+                # No document outside the candidates can reach the top k any more:
+                # drop hopeless candidates and only probe this list for the rest
+                alive = cand_scores + remaining[i] > bar
+                cand_docs, cand_scores = cand_docs[alive], cand_scores[alive]
+                if not len(cand_docs):
+                    break
+                positions = np.minimum(np.searchsorted(docs, cand_docs), len(docs) - 1)
+                hit = np.asarray(docs[positions]) == cand_docs
+                if hit.any():
+                    matched = cand_docs[hit]
+                    cand_scores[hit] += term_idf * self._bm25(np.asarray(tfs)[positions[hit]], lengths[matched], avg_length)
+                continue
+            docs = np.asarray(docs)
+            contributions = term_idf * self._bm25(tfs, lengths[docs], avg_length)
+            if blocked is not None:
+                live = ~blocked[docs]
+                docs, contributions = docs[live], contributions[live]
+            merged_docs, inverse = np.unique(np.concatenate([cand_docs, docs]), return_inverse=True)
+            cand_scores = np.bincount(inverse, weights=np.concatenate([cand_scores, contributions]),
+                                      minlength=len(merged_docs))
+            cand_docs = merged_docs.astype(np.int32)
+
+        if not len(cand_docs):
+            return []
+        top = np.argpartition(-cand_scores, min(k, len(cand_scores)) - 1)[:k]
+        return [(int(cand_docs[i]), float(cand_scores[i])) for i in top if cand_scores[i] > threshold]
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "documents": sum(segment.live_count for segment in self.segments) + len(self._buffer_ids),
+                "deleted": sum(segment.deleted_count for segment in self.segments),
+                "segments": len(self.segments),
+                "terms": sum(len(segment.term_hashes) for segment in self.segments),
+                "postings": sum(len(segment.postings_docs) for segment in self.segments),
+                "bytes": sum(segment.disk_bytes() for segment in self.segments),
+                "buffered": len(self._buffer_ids),
+                "path": str(self.path) if self.path else None
+            }
+
+def load_lexical_index(index_path: Union[str, Path], mmap: bool = True) -> Optional[LexicalIndex]:
+    """The lexical index saved next to a FAISS index, or None if there is no usable one."""
+    try:
+        return LexicalIndex.load(Path(index_path) / LEXICAL_DIRNAME, mmap)
+    except FileNotFoundError:
+        return None
+    except (ValueError, KeyError, OSError) as e:
+        logger.warning({"message": "Ignoring unusable lexical index", "path": str(index_path), "error": str(e)})
+        return None
+
+def open_lexical_index(vector_store, index_path: Union[str, Path]) -> Tuple[Optional[LexicalIndex], bool]:
+    """The lexical index to update alongside ``vector_store``, and whether it had to be (re)built.
+
+    Returns ``(None, False)`` when the lexical index is disabled.
+    """
+    from backend.config.performance_config import LEXICAL_INDEX_CONFIGS
+
+    if not LEXICAL_INDEX_CONFIGS["enabled"]:
+        return None, False
+    if vector_store is None:
+        return LexicalIndex(), True
+    lexical = load_lexical_index(index_path)
+    if lexical is not None and len(lexical) == len(vector_store.index_to_docstore_id):
+        return lexical, False
+    # Missing (index built before the lexical index existed) or out of step with the vectors
+    logger.info({"message": "Building lexical index from the FAISS docstore", "path": str(index_path)})
+    return LexicalIndex.from_docstore(vector_store), True
+
+class LexicalRetriever(BaseRetriever):
+    """BM25 retriever returning the FAISS store's documents for the lexical index's top hits."""
+
+    index: Any
+    docstore: Any
+    k: int = 5
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        documents = []
+        for doc_id, _ in self.index.search(query, self.k):
+            document = self.docstore.search(doc_id)
+            if isinstance(document, Document):
+                documents.append(document)
+        return documents
@@ -0,0 +1,136 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, List, Tuple
+
+import numpy as np
+from langchain.docstore.document import Document
+
+logger = logging.getLogger("ConfigGuidanceAPI")
+
+@dataclass
+class LiveEntry:
+    """The latest output of one oc command, chunked and embedded."""
+    command: str
+    documents: List[Document]
+    vectors: np.ndarray  # Unit-length rows, one per document
+    captured_at: float
+    expires_at: float
+
+def _chunk_lines(text: str, max_chars: int) -> List[str]:
+    """Split command output on line boundaries into chunks of at most ``max_chars``."""
+    chunks, current, size = [], [], 0
+    for line in text.splitlines():
+        if current and size + len(line) + 1 > max_chars:
+            chunks.append("\n".join(current))
+            current, size = [], 0
+        current.append(line[:max_chars])
+        size += len(line) + 1
+    if current:
+        chunks.append("\n".join(current))
+    return [chunk for chunk in chunks if chunk.strip()]
+
+def _unit_rows(vectors) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+class LiveClusterIndex:
+    """Small in-memory index of live oc command output, searched alongside the static indexes.
+
+    Holds one entry per command: a new result for the same command replaces
+    the old one, so repeated ``oc get pods`` never accumulates and stale
+    cluster state cannot outrank a newer capture. Entries expire after
+    ``ttl_seconds`` and the oldest are evicted beyond ``max_entries``.
+    Nothing is written to disk or to the global FAISS index.
+    """
+
+    def __init__(self, embeddings, config: Dict = None):
+        if config is None:
+            from backend.config.performance_config import LIVE_INDEX_CONFIGS as config
+        self.embeddings = embeddings
+        self.config = config
+        self._entries: "OrderedDict[str, LiveEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"puts": 0, "replaced": 0, "expired": 0, "evicted": 0, "searches": 0, "hits": 0}
+
+    def put(self, command: str, oc_result: Dict) -> int:
+        """Embed an oc result as the current state for ``command``; returns its chunk count."""
+        metadata = dict(oc_result.get("metadata", {}))
+        command = metadata.get("command") or command
+        chunks = _chunk_lines(oc_result.get("content", ""), self.config["chunk_chars"])
+        if not chunks:
+            return 0
+        # Embedded outside the lock; only the swap of the entry is serialized
+        vectors = _unit_rows(self.embeddings.embed_documents(chunks))
+        now = time.time()
+        metadata.update({"live": True, "captured_at": now})
+        documents = [Document(page_content=chunk, metadata=dict(metadata, chunk=i)) for i, chunk in enumerate(chunks)]
+        entry = LiveEntry(command, documents, vectors, now, now + self.config["ttl_seconds"])
+        with self._lock:
+            if self._entries.pop(command, None) is not None:
+                self._stats["replaced"] += 1
+            self._entries[command] = entry
+            self._stats["puts"] += 1
+            while len(self._entries) > self.config["max_entries"]:
+                self._entries.popitem(last=False)
+                self._stats["evicted"] += 1
+        return len(documents)
+
+    def _live_entries(self) -> List[LiveEntry]:
+        now = time.time()
+        with self._lock:
+            for command in [c for c, entry in self._entries.items() if entry.expires_at <= now]:
+                del self._entries[command]
+                self._stats["expired"] += 1
+            return list(self._entries.values())
+
+    def search(self, query: str, k: int = None) -> List[Tuple[Document, float]]:
+        """Live documents most similar to ``query`` (cosine), above ``min_similarity``."""
+        if not self._live_entries():
+            with self._lock:
+                self._stats["searches"] += 1
+            return []
+        return self.search_by_vector(self.embeddings.embed_query(query), k)
+
+    def search_by_vector(self, vector: List[float], k: int = None) -> List[Tuple[Document, float]]:
+        """Like ``search``, for a query already embedded with this index's model."""
+        entries = self._live_entries()
+        with self._lock:
+            self._stats["searches"] += 1
+        if not entries:
+            return []
+        k = k or self.config["k"]
+        query_vector = _unit_rows([vector])[0]
+        documents = [doc for entry in entries for doc in entry.documents]
+        scores = np.vstack([entry.vectors for entry in entries]) @ query_vector
+        ranked = [
+            (documents[i], float(scores[i])) for i in np.argsort(-scores)[:k]
+            if scores[i] >= self.config["min_similarity"]
+        ]
+        if ranked:
+            with self._lock:
+                self._stats["hits"] += 1
+        return ranked
+
+    def clear(self) -> int:
+        with self._lock:
+            count = len(self._entries)
+            self._entries.clear()
+        return count
+
+    def stats(self) -> Dict:
+        entries = self._live_entries()
+        now = time.time()
+        with self._lock:
+            stats = dict(self._stats)
+        return {
+            **stats,
+            "entries": len(entries),
+            "documents": sum(len(entry.documents) for entry in entries),
+            "commands": {entry.command: round(now - entry.captured_at, 1) for entry in entries},  # Age in seconds
+            "ttl_seconds": self.config["ttl_seconds"],
+            "max_entries": self.config["max_entries"]
+        }
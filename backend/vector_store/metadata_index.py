@@ -0,0 +1,278 @@
+import json
+import logging
+import os
+import re
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+import numpy as np
+
+from .ann_index import index_fingerprint
+from .lexical_index import doc_id_hashes
+
+logger = logging.getLogger("ConfigGuidanceAPI")
+
+METADATA_DIRNAME = "metadata"
+MANIFEST_FILENAME = "manifest.json"
+FORMAT_VERSION = 1
+# Metadata fields documents can be filtered on
+FILTER_FIELDS = ("file_type", "directory", "context", "doc_type", "topics", "openshift_version")
+# Value under which documents without a field are indexed; a filter may list None to include them
+MISSING = ""
+
+# "OpenShift 4.16", "openshift-docs/4.14/...", "OCP_4.12_Networking.pdf"
+_OPENSHIFT_VERSION = re.compile(r"(?:openshift|ocp)\D{0,40}?\b([34]\.\d{1,2})\b", re.IGNORECASE)
+
+def openshift_version(text: str) -> Optional[str]:
+    """The OpenShift version a path, title or question refers to, e.g. ``4.16``."""
+    match = _OPENSHIFT_VERSION.search(text or "")
+    return match.group(1) if match else None
+
+def _directories(directory: str) -> List[str]:
+    # A directory filter matches its whole subtree, so every ancestor is indexed
+    parts = [part for part in directory.replace("\\", "/").split("/") if part and part != "."]
+    return ["/".join(parts[:depth]).lower() for depth in range(1, len(parts) + 1)]
+
+def field_values(metadata: Dict) -> Dict[str, List[str]]:
+    """Filterable values of a chunk's metadata; fields it lacks map to ``[MISSING]``."""
+    topics = metadata.get("topics") or []
+    version = metadata.get("openshift_version") or openshift_version(
+        " ".join(str(metadata.get(key, "")) for key in ("source", "directory", "filename"))
+    )
+    values = {
+        "file_type": [str(metadata.get("file_type") or metadata.get("type") or "").lower()],
+        "directory": _directories(str(metadata.get("directory") or "")),
+        "context": [str(metadata.get("context") or "").lower()],
+        "doc_type": [str(metadata.get("doc_type") or "").lower()],
+        "topics": [str(topic).lower() for topic in (topics if isinstance(topics, list) else [topics])],
+        "openshift_version": [str(version or "")]
+    }
+    return {name: list(dict.fromkeys(value for value in field if value)) or [MISSING] for name, field in values.items()}
+
+def normalize_filters(filters: Dict) -> Dict[str, Tuple[str, ...]]:
+    """``{field: value or [values]}`` as sorted lower-case tuples; None stands for documents without the field.
+
+    Raises ValueError for fields not in FILTER_FIELDS.
+    """
+    normalized = {}
+    for name, values in (filters or {}).items():
+        if name not in FILTER_FIELDS:
+            raise ValueError(f"Unknown filter field: {name}. Available: {', '.join(FILTER_FIELDS)}")
+        if values is None or isinstance(values, (str, int, float)):
+            values = [values]
+        cleaned = {MISSING if value is None else str(value).strip().strip("/").lower() for value in values}
+        if name == "directory":
+            cleaned = {value.replace("\\", "/") for value in cleaned}
+        normalized[name] = tuple(sorted(cleaned))
+    return normalized
+
+class Selection:
+    """The FAISS positions matching a filter, usable as a faiss selector and as a lexical ``doc_filter``."""
+
+    def __init__(self, filters: Dict[str, Tuple[str, ...]], positions: np.ndarray, id_hashes: np.ndarray, ntotal: int):
+        self.filters = filters
+        self.positions = positions      # Sorted int64
+        self.ntotal = ntotal
+        self._id_hashes = np.unique(id_hashes[positions]) if len(positions) else np.empty(0, np.uint64)
+        self._bitmap: Optional[np.ndarray] = None
+        self._selector = None
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.positions)
+
+    def allows(self, id_hashes: np.ndarray) -> np.ndarray:
+        """Mask of the given document ID hashes that belong to the selection (lexical ``doc_filter``)."""
+        return np.isin(id_hashes, self._id_hashes)
+
+    def faiss_selector(self):
+        """An IDSelectorBitmap over FAISS positions; the bitmap is kept alive with the selection."""
+        import faiss
+
+        with self._lock:
+            if self._selector is None:
+                bits = np.zeros(self.ntotal, dtype=bool)
+                bits[self.positions] = True
+                self._bitmap = np.packbits(bits, bitorder="little")
+                self._selector = faiss.IDSelectorBitmap(self.ntotal, faiss.swig_ptr(self._bitmap))
+            return self._selector
+
+    def report(self) -> Dict:
+        return {"filters": {name: list(values) for name, values in self.filters.items()}, "documents": len(self)}
+
+class MetadataIndex:
+    """Inverted index from metadata field values to FAISS positions, for filtered search.
+
+    For each field in FILTER_FIELDS, the positions of the chunks carrying
+    each value are stored as one sorted run in a flat array (``.npy``,
+    memory-mapped when loaded read-only), alongside a 64-bit hash of every
+    position's document ID for filtering the lexical index. A filter ORs
+    the values listed for a field and ANDs the fields; the resulting
+    Selection restricts the ANN search itself through a faiss IDSelector,
+    so narrow filters still return k in-filter results. Positions refer to
+    the ``index.faiss`` the index was built from (``built_from``).
+    """
+
+    def __init__(self, runs: Dict[str, Dict[str, List[int]]], positions: np.ndarray, id_hashes: np.ndarray,
+                 ntotal: int, built_from: str = None, config: Dict = None):
+        self.runs = runs                # field -> value -> [start, end) in positions
+        self.positions = positions
+        self.id_hashes = id_hashes
+        self.ntotal = ntotal
+        self.built_from = built_from
+        self._config = config
+        self._selections: "OrderedDict[Tuple, Selection]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"selections": 0, "cache_hits": 0}
+
+    @property
+    def config(self) -> Dict:
+        if self._config is None:
+            from backend.config.performance_config import METADATA_FILTER_CONFIGS
+
+            self._config = METADATA_FILTER_CONFIGS
+        return self._config
+
+    @classmethod
+    def build(cls, vector_store) -> "MetadataIndex":
+        """Index the metadata of every document in a FAISS store by its position."""
+        ntotal = vector_store.index.ntotal
+        members: Dict[str, Dict[str, List[int]]] = {name: {} for name in FILTER_FIELDS}
+        doc_ids = []
+        for position in range(ntotal):
+            doc_id = vector_store.index_to_docstore_id[position]
+            doc_ids.append(doc_id)
+            document = vector_store.docstore.search(doc_id)
+            metadata = getattr(document, "metadata", None) or {}
+            for name, values in field_values(metadata).items():
+                for value in values:
+                    members[name].setdefault(value, []).append(position)
+
+        runs, chunks, start = {}, [], 0
+        for name in FILTER_FIELDS:
+            runs[name] = {}
+            for value, rows in sorted(members[name].items()):
+                runs[name][value] = [start, start + len(rows)]
+                chunks.append(np.array(rows, dtype=np.int32))
+                start += len(rows)
+        positions = np.concatenate(chunks) if chunks else np.empty(0, np.int32)
+        return cls(runs, positions, doc_id_hashes(doc_ids), ntotal)
+
+    def save(self, path: Union[str, Path], built_from: str):
+        path = Path(path)
+        path.mkdir(parents=True, exist_ok=True)
+        # Replaced rather than rewritten: staged snapshots hard-link these files
+        for name, array in (("positions", self.positions), ("id_hashes", self.id_hashes)):
+            tmp = path / f"{name}.{os.getpid()}.tmp.npy"
+            np.save(tmp, np.asarray(array))
+            os.replace(tmp, path / f"{name}.npy")
+        manifest = {"format": FORMAT_VERSION, "ntotal": self.ntotal, "built_from": built_from, "runs": self.runs}
+        tmp = path / f"{MANIFEST_FILENAME}.{os.getpid()}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(manifest, f)
+        os.replace(tmp, path / MANIFEST_FILENAME)
+        self.built_from = built_from
+
+    @classmethod
+    def load(cls, path: Union[str, Path], mmap: bool = True) -> "MetadataIndex":
+        path = Path(path)
+        with open(path / MANIFEST_FILENAME) as f:
+            manifest = json.load(f)
+        if manifest.get("format") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported metadata index format: {manifest.get('format')}")
+        mmap_mode = "r" if mmap else None
+        return cls(manifest["runs"], np.load(path / "positions.npy", mmap_mode=mmap_mode),
+                   np.load(path / "id_hashes.npy", mmap_mode=mmap_mode), manifest["ntotal"], manifest["built_from"])
+
+    def count(self, name: str, value: str) -> int:
+        start, end = self.runs.get(name, {}).get(value, (0, 0))
+        return end - start
+
+    def _field_positions(self, name: str, values: Iterable[str]) -> np.ndarray:
+        runs = [self.runs[name][value] for value in values if value in self.runs[name]]
+        if not runs:
+            return np.empty(0, np.int64)
+        if len(runs) == 1:
+            start, end = runs[0]
+            return np.asarray(self.positions[start:end], dtype=np.int64)
+        # A topic list or directory subtree can hold a position under several values
+        return np.unique(np.concatenate([np.asarray(self.positions[start:end], dtype=np.int64) for start, end in runs]))
+
+    def select(self, filters: Dict) -> Optional[Selection]:
+        """The Selection for ``filters`` (see ``normalize_filters``), or None for no filters."""
+        filters = normalize_filters(filters)
+        if not filters:
+            return None
+        key = tuple(sorted(filters.items()))
+        with self._lock:
+            self._stats["selections"] += 1
+            selection = self._selections.get(key)
+            if selection is not None:
+                self._selections.move_to_end(key)
+                self._stats["cache_hits"] += 1
+                return selection
+
+        # Intersect the smallest field first
+        per_field = sorted((self._field_positions(name, values) for name, values in filters.items()), key=len)
+        positions = per_field[0]
+        for other in per_field[1:]:
+            if not len(positions):
+                break
+            positions = np.intersect1d(positions, other, assume_unique=True)
+        selection = Selection(filters, positions, self.id_hashes, self.ntotal)
+        with self._lock:
+            self._selections[key] = selection
+            while len(self._selections) > self.config["selection_cache_entries"]:
+                self._selections.popitem(last=False)
+        return selection
+
+    def stats(self) -> Dict:
+        return {
+            "documents": self.ntotal,
+            "values": {name: len(values) for name, values in self.runs.items()},
+            "openshift_versions": sorted(value for value in self.runs.get("openshift_version", {}) if value),
+            **self._stats
+        }
+
+def metadata_index_current(index_path: Union[str, Path]) -> bool:
+    """True if the metadata index under ``index_path`` was built from the ``index.faiss`` there."""
+    manifest_file = Path(index_path) / METADATA_DIRNAME / MANIFEST_FILENAME
+    if not manifest_file.exists():
+        return False
+    try:
+        with open(manifest_file) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return False
+    return (manifest.get("format") == FORMAT_VERSION
+            and manifest.get("built_from") == index_fingerprint(Path(index_path) / "index.faiss"))
+
+def build_metadata_index(vector_store, index_path: Union[str, Path]) -> MetadataIndex:
+    """Build and save the metadata index for the store saved at ``index_path``."""
+    index_path = Path(index_path)
+    metadata_index = MetadataIndex.build(vector_store)
+    metadata_index.save(index_path / METADATA_DIRNAME, index_fingerprint(index_path / "index.faiss"))
+    logger.info({"message": "Built metadata index", "documents": metadata_index.ntotal,
+                 "values": {name: len(values) for name, values in metadata_index.runs.items()}})
+    return metadata_index
+
+def load_metadata_index(index_path: Union[str, Path], ntotal: int, mmap: bool = True) -> Optional[MetadataIndex]:
+    """The metadata index saved with a FAISS index, or None if it is missing or stale."""
+    index_path = Path(index_path)
+    if not (index_path / METADATA_DIRNAME / MANIFEST_FILENAME).exists():
+        return None
+    if not metadata_index_current(index_path):
+        logger.warning({"message": "Metadata index is stale, filtered search is unavailable; rerun init_faiss.py",
+                        "path": str(index_path)})
+        return None
+    try:
+        metadata_index = MetadataIndex.load(index_path / METADATA_DIRNAME, mmap=mmap)
+    except (OSError, ValueError, KeyError) as e:
+        logger.warning({"message": "Failed to load metadata index", "path": str(index_path), "error": str(e)})
+        return None
+    if metadata_index.ntotal != ntotal:
+        logger.warning({"message": "Metadata index does not match the FAISS index", "path": str(index_path)})
+        return None
+    return metadata_index
@@ -0,0 +1,189 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+from collections.abc import Mapping
+from pathlib import Path
+from typing import Dict, List, Union
+
+from langchain.docstore.document import Document
+from langchain_community.docstore.base import Docstore
+from langchain_community.vectorstores import FAISS
+
+from .ann_index import ReadOnlyIndexError, TunableFAISS, attach_ann_index, index_fingerprint, mmap_read_flags
+from .lexical_index import load_lexical_index
+from .metadata_index import load_metadata_index
+
+logger = logging.getLogger("ConfigGuidanceAPI")
+
+DOCSTORE_FILENAME = "docstore.sqlite"
+INDEX_FILENAME = "index.faiss"
+
+class SQLiteDocstore(Docstore):
+    """Read-only document payloads in SQLite, replacing the pickled in-memory docstore.
+
+    Each thread gets its own read-only connection. SQLite memory-maps the
+    database file, so workers on one node share its pages through the OS
+    page cache instead of each holding a copy of every document.
+    """
+
+    def __init__(self, db_path: Union[str, Path], mmap_bytes: int = 256 * 1024 * 1024):
+        self.db_path = str(db_path)
+        self.mmap_bytes = mmap_bytes
+        self._local = threading.local()
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(f"file:{self.db_path}?mode=ro", uri=True, check_same_thread=False)
+            conn.execute(f"PRAGMA mmap_size = {int(self.mmap_bytes)}")
+            self._local.conn = conn
+        return conn
+
+    def search(self, search: str) -> Union[str, Document]:
+        row = self._conn().execute("SELECT page_content, metadata FROM docs WHERE id = ?", (search,)).fetchone()
+        if row is None:
+            return f"ID {search} not found."
+        return Document(id=search, page_content=row[0], metadata=json.loads(row[1]))
+
+    def id_at(self, position: int) -> str:
+        row = self._conn().execute("SELECT id FROM docs WHERE position = ?", (int(position),)).fetchone()
+        if row is None:
+            raise KeyError(position)
+        return row[0]
+
+    def count(self) -> int:
+        return self._conn().execute("SELECT COUNT(*) FROM docs").fetchone()[0]
+
+    def info(self) -> Dict[str, str]:
+        return dict(self._conn().execute("SELECT key, value FROM info"))
+
+    def delete(self, ids: List) -> None:
+        raise ReadOnlyIndexError("The memory-mapped docstore is read-only")
+
+class _PositionToId(Mapping):
+    """index_to_docstore_id backed by the docstore, so no per-worker dict of every vector ID."""
+
+    def __init__(self, docstore: SQLiteDocstore):
+        self.docstore = docstore
+
+    def __getitem__(self, position) -> str:
+        return self.docstore.id_at(position)
+
+    def __iter__(self):
+        rows = self.docstore._conn().execute("SELECT position FROM docs ORDER BY position")
+        return (position for (position,) in rows)
+
+    def __len__(self) -> int:
+        return self.docstore.count()
+
+class ReadOnlyFAISS(TunableFAISS):
+    """FAISS store over a memory-mapped index and a SQLite docstore; searches only."""
+
+    read_only = True
+
+    def _read_only(self, *args, **kwargs):
+        raise ReadOnlyIndexError("The FAISS index is memory-mapped read-only; rebuild it with init_faiss.py")
+
+    add_texts = add_embeddings = add_documents = delete = merge_from = save_local = _read_only
+
+    async def aadd_texts(self, *args, **kwargs):
+        self._read_only()
+
+    async def aadd_documents(self, *args, **kwargs):
+        self._read_only()
+
+def save_index(vector_store: FAISS, index_path: Union[str, Path]):
+    """``save_local`` through temporary names renamed into place.
+
+    Snapshot staging hard-links ``index.faiss`` and ``index.pkl`` to the
+    served snapshot's files, so they must be replaced, never rewritten.
+    """
+    index_path = Path(index_path)
+    tmp_name = f"index.{os.getpid()}.tmp"
+    vector_store.save_local(str(index_path), index_name=tmp_name)
+    os.replace(index_path / f"{tmp_name}.pkl", index_path / "index.pkl")
+    os.replace(index_path / f"{tmp_name}.faiss", index_path / INDEX_FILENAME)
+
+def export_docstore(vector_store: FAISS, index_path: Union[str, Path]) -> Path:
+    """Write the store's documents to ``docstore.sqlite`` next to a saved ``index.faiss``.
+
+    The file is written under a temporary name and renamed into place, so
+    readers never see a partial docstore.
+    """
+    index_path = Path(index_path)
+    target = index_path / DOCSTORE_FILENAME
+    tmp = index_path / f"{DOCSTORE_FILENAME}.{os.getpid()}.tmp"
+    tmp.unlink(missing_ok=True)
+    conn = sqlite3.connect(str(tmp))
+    try:
+        conn.execute("CREATE TABLE docs (position INTEGER PRIMARY KEY, id TEXT NOT NULL UNIQUE, "
+                     "page_content TEXT NOT NULL, metadata TEXT NOT NULL)")
+        conn.execute("CREATE TABLE info (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        rows = []
+        for position, doc_id in vector_store.index_to_docstore_id.items():
+            doc = vector_store.docstore.search(doc_id)
+            rows.append((int(position), doc_id, doc.page_content, json.dumps(doc.metadata, default=str)))
+            if len(rows) >= 5000:
+                conn.executemany("INSERT INTO docs VALUES (?, ?, ?, ?)", rows)
+                rows = []
+        conn.executemany("INSERT INTO docs VALUES (?, ?, ?, ?)", rows)
+        conn.executemany("INSERT INTO info VALUES (?, ?)", [
+            ("ntotal", str(vector_store.index.ntotal)),
+            ("index_fingerprint", index_fingerprint(index_path / INDEX_FILENAME))
+        ])
+        conn.commit()
+    finally:
+        conn.close()
+    os.replace(tmp, target)
+    return target
+
+def docstore_matches_index(index_path: Union[str, Path]) -> bool:
+    """True if ``docstore.sqlite`` was exported from the ``index.faiss`` currently on disk."""
+    index_path = Path(index_path)
+    index_file, docstore_file = index_path / INDEX_FILENAME, index_path / DOCSTORE_FILENAME
+    if not (index_file.exists() and docstore_file.exists()):
+        return False
+    try:
+        info = SQLiteDocstore(docstore_file).info()
+    except sqlite3.Error:
+        return False
+    return info.get("index_fingerprint") == index_fingerprint(index_file)
+
+def load_mmap_vector_store(index_path: Union[str, Path], embeddings, mmap_bytes: int = 256 * 1024 * 1024) -> ReadOnlyFAISS:
+    """Open ``index.faiss`` memory-mapped and read-only, with documents served from SQLite."""
+    import faiss
+
+    index_path = Path(index_path)
+    index = faiss.read_index(str(index_path / INDEX_FILENAME), mmap_read_flags())
+    docstore = SQLiteDocstore(index_path / DOCSTORE_FILENAME, mmap_bytes)
+    if str(index.ntotal) != docstore.info().get("ntotal"):
+        raise ValueError(f"docstore does not match index.faiss in {index_path}; re-export it")
+    return ReadOnlyFAISS(embeddings, index, docstore, _PositionToId(docstore))
+
+def open_vector_store(index_path: Union[str, Path], embeddings, read_only: bool,
+                      mmap_bytes: int = 256 * 1024 * 1024) -> TunableFAISS:
+    """Load the saved index, memory-mapped when ``read_only``, searching its ANN index if one was built.
+
+    The BM25 index saved alongside it, if any, is opened as ``lexical_index``
+    and the metadata filter index as ``metadata_index``.
+
+    An index saved without a matching SQLite docstore (e.g. by an older
+    build) is loaded normally once and its docstore exported, so later
+    starts can map it.
+    """
+    if read_only and not docstore_matches_index(index_path):
+        logger.info({"message": "Exporting FAISS docstore to SQLite for memory-mapped loading", "path": str(index_path)})
+        export_docstore(
+            FAISS.load_local(str(index_path), embeddings=embeddings, allow_dangerous_deserialization=True), index_path
+        )
+
+    if read_only:
+        vector_store = load_mmap_vector_store(index_path, embeddings, mmap_bytes)
+    else:
+        vector_store = TunableFAISS.load_local(str(index_path), embeddings=embeddings, allow_dangerous_deserialization=True)
+    attach_ann_index(vector_store, index_path, mmap=read_only)
+    vector_store.lexical_index = load_lexical_index(index_path, mmap=read_only)
+    vector_store.metadata_index = load_metadata_index(index_path, vector_store.index.ntotal, mmap=read_only)
+    return vector_store
@@ -1,14 +1,20 @@
 from langchain_community.vectorstores import FAISS
 from langchain_huggingface import HuggingFaceEmbeddings
 from langchain.docstore.document import Document
-from langchain_community.retrievers import BM25Retriever
-from langchain.retrievers import EnsembleRetriever
 from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_community.cross_encoders import HuggingFaceCrossEncoder
 from typing import List, Dict, Any
+import logging
 import numpy as np
 from pathlib import Path
-import pickle
+import uuid
+
+from .lexical_index import LEXICAL_DIRNAME, LexicalIndex, LexicalRetriever, load_lexical_index
+
+logger = logging.getLogger("ConfigGuidanceAPI")
+
+# Offline callers wait for the cross-encoder, including loading it on first use,
+# instead of the request-path latency budget
+OFFLINE_RERANK_BUDGET_MS = 120_000
 
 class OptimizedVectorStore:
     def __init__(self, embedding_model_name: str = "sentence-transformers/all-mpnet-base-v2"):
@@ -18,9 +24,10 @@ class OptimizedVectorStore:
             encode_kwargs={'normalize_embeddings': True}
         )
         self.vector_store = None
+        self.lexical_index = None
         self.bm25_retriever = None
         self.ensemble_retriever = None
-        self.reranker = HuggingFaceCrossEncoder(model_name="cross-encoder/ms-marco-MiniLM-L-6-v2")
+        self.reranker_profile = "accurate"  # cross-encoder/ms-marco-MiniLM-L-6-v2, see RERANKER_CONFIGS
         
         # Optimized text splitter
         self.text_splitter = RecursiveCharacterTextSplitter(
@@ -58,24 +65,33 @@ class OptimizedVectorStore:
         """Create a hybrid retriever combining FAISS and BM25."""
         # Process documents into optimized chunks
         processed_docs = self.create_optimized_chunks(documents)
+        ids = [str(uuid.uuid4()) for _ in processed_docs]
         
         # Create FAISS vector store
-        self.vector_store = FAISS.from_documents(processed_docs, self.embedding_model)
+        self.vector_store = FAISS.from_documents(processed_docs, self.embedding_model, ids=ids)
         self.vector_store.save_local(faiss_path)
         
-        # Create BM25 retriever
-        self.bm25_retriever = BM25Retriever.from_documents(processed_docs)
-        self.bm25_retriever.k = 5
+        # Create BM25 index over the same chunks, keyed by their vector IDs
+        self.lexical_index = LexicalIndex()
+        self.lexical_index.add_documents(processed_docs, ids)
+        self.bm25_retriever = LexicalRetriever(index=self.lexical_index, docstore=self.vector_store.docstore, k=5)
         
-        # Create ensemble retriever (combines both)
-        faiss_retriever = self.vector_store.as_retriever(search_kwargs={"k": 5})
+        # Create hybrid retriever (combines both)
+        self.ensemble_retriever = self._fusion_retriever()
         
-        self.ensemble_retriever = EnsembleRetriever(
-            retrievers=[faiss_retriever, self.bm25_retriever],
-            weights=[0.7, 0.3]  # Favor vector search slightly
+        return self.ensemble_retriever
+    
+    def _fusion_retriever(self):
+        """FAISS and BM25 searched concurrently and merged by rank fusion (scores are not comparable)."""
+        from backend.services.retrieval_orchestrator import (
+            FusionRetriever, RetrievalOrchestrator, lexical_backend, vector_backend
         )
         
-        return self.ensemble_retriever
+        backends = [
+            vector_backend("dense", self.vector_store),
+            lexical_backend("lexical", self.lexical_index, self.vector_store.docstore)
+        ]
+        return FusionRetriever(orchestrator=RetrievalOrchestrator(), backends=backends, k=10)
     
     def retrieve_with_reranking(self, query: str, k: int = 8) -> List[Document]:
         """Retrieve documents with cross-encoder reranking."""
@@ -88,16 +104,16 @@ class OptimizedVectorStore:
         if not initial_docs:
             return []
         
-        # Rerank using cross-encoder
-        doc_texts = [doc.page_content for doc in initial_docs]
-        scores = self.reranker.score([[query, text] for text in doc_texts])
+        # Rerank using the shared, batched and cached cross-encoder
+        from backend.services.reranker import get_reranker
         
-        # Sort by reranking scores
-        scored_docs = list(zip(initial_docs, scores))
-        scored_docs.sort(key=lambda x: x[1], reverse=True)
+        reranked = get_reranker(self.reranker_profile).rerank(query, initial_docs, budget_ms=OFFLINE_RERANK_BUDGET_MS)
+        if not reranked.reranked:
+            logger.warning({"message": "Reranking fell back to fused order", "profile": self.reranker_profile,
+                            "reason": reranked.reason, "latency_ms": reranked.latency_ms})
         
         # Return top k reranked documents
-        return [doc for doc, score in scored_docs[:k]]
+        return reranked.documents[:k]
     
     def load_existing_store(self, faiss_path: str = "./faiss_index"):
         """Load existing FAISS store and create retrievers."""
@@ -108,37 +124,30 @@ class OptimizedVectorStore:
                 allow_dangerous_deserialization=True
             )
             
-            # Load BM25 retriever if exists
-            bm25_path = Path(faiss_path) / "bm25_retriever.pkl"
-            if bm25_path.exists():
-                with open(bm25_path, 'rb') as f:
-                    self.bm25_retriever = pickle.load(f)
+            # Load BM25 index if exists (memory-mapped, no unpickling)
+            self.lexical_index = load_lexical_index(faiss_path)
+            if self.lexical_index is not None:
+                self.bm25_retriever = LexicalRetriever(index=self.lexical_index, docstore=self.vector_store.docstore, k=5)
                 
-                # Recreate ensemble retriever
-                faiss_retriever = self.vector_store.as_retriever(search_kwargs={"k": 5})
-                self.ensemble_retriever = EnsembleRetriever(
-                    retrievers=[faiss_retriever, self.bm25_retriever],
-                    weights=[0.7, 0.3]
-                )
+                # Recreate hybrid retriever
+                self.ensemble_retriever = self._fusion_retriever()
             
             return True
         except Exception as e:
             print(f"Failed to load existing store: {e}")
             return False
     
-    def save_bm25_retriever(self, faiss_path: str = "./faiss_index"):
-        """Save BM25 retriever for persistence."""
-        if self.bm25_retriever:
-            bm25_path = Path(faiss_path) / "bm25_retriever.pkl"
-            with open(bm25_path, 'wb') as f:
-                pickle.dump(self.bm25_retriever, f)
+    def save_lexical_index(self, faiss_path: str = "./faiss_index"):
+        """Save BM25 index for persistence."""
+        if self.lexical_index:
+            self.lexical_index.commit(Path(faiss_path) / LEXICAL_DIRNAME)
 
 # Usage example functions
 def create_optimized_vector_store(parsed_data: List[Dict], faiss_path: str = "./faiss_index"):
     """Create optimized vector store with hybrid retrieval."""
     store = OptimizedVectorStore()
     retriever = store.create_hybrid_retriever(parsed_data, faiss_path)
-    store.save_bm25_retriever(faiss_path)
+    store.save_lexical_index(faiss_path)
     return store, retriever
 
 def load_optimized_vector_store(faiss_path: str = "./faiss_index"):
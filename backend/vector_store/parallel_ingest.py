@@ -0,0 +1,189 @@
+import logging
+import multiprocessing
+import queue
+import threading
+import time
+from multiprocessing.connection import wait
+from typing import Callable, Iterable, Iterator, Optional, Tuple
+
+logger = logging.getLogger("ConfigGuidanceAPI")
+
+# (task, parsed result or None, error message or None)
+ParseOutcome = Tuple[object, object, Optional[str]]
+
+def _worker_main(conn, parse_file: Callable):
+    """Parse files sent over ``conn`` one at a time until a None task arrives."""
+    while True:
+        try:
+            task = conn.recv()
+        except EOFError:
+            break
+        if task is None:
+            break
+        file_path, relative_dir = task
+        try:
+            conn.send((parse_file(file_path, relative_dir), None))
+        except Exception as e:
+            conn.send((None, f"{type(e).__name__}: {e}"))
+    conn.close()
+
+class _Worker:
+    """One parser process with its own pipe, so a hung or crashed file only costs this worker."""
+
+    def __init__(self, context, parse_file: Callable):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(target=_worker_main, args=(child_conn, parse_file), daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.task = None
+        self.started_at = 0.0
+
+    def assign(self, task):
+        self.task = task
+        self.started_at = time.monotonic()
+        self.conn.send((task[0], task[1]))
+
+    def stop(self, timeout: float = 1.0):
+        try:
+            self.conn.send(None)
+        except (BrokenPipeError, OSError):
+            pass
+        self.process.join(timeout)
+        if self.process.is_alive():
+            self.process.terminate()
+            self.process.join(timeout)
+        self.conn.close()
+
+    def kill(self):
+        self.process.kill()
+        self.process.join()
+        self.conn.close()
+
+class ParsePool:
+    """Process pool for file parsing with per-file timeouts and crash isolation.
+
+    Unlike ProcessPoolExecutor, a segfaulting parser or a file that exceeds
+    ``timeout`` only kills its own worker, which is replaced; the rest of the
+    pool keeps going and the file is reported as failed.
+    """
+
+    def __init__(self, parse_file: Callable, workers: int, timeout: float):
+        self.parse_file = parse_file
+        self.workers = max(1, workers)
+        self.timeout = timeout
+        self._context = multiprocessing.get_context()
+
+    def imap_unordered(self, tasks: Iterable[Tuple]) -> Iterator[ParseOutcome]:
+        """Yield ``(task, result, error)`` as files finish; tasks are ``(file_path, relative_dir, ...)``."""
+        pending = iter(tasks)
+        workers = [_Worker(self._context, self.parse_file) for _ in range(self.workers)]
+        exhausted = False
+        try:
+            while True:
+                for worker in workers:
+                    if worker.task is None and not exhausted:
+                        task = next(pending, None)
+                        if task is None:
+                            exhausted = True
+                        else:
+                            worker.assign(task)
+
+                busy = [worker for worker in workers if worker.task is not None]
+                if not busy:
+                    break
+
+                now = time.monotonic()
+                next_deadline = min(worker.started_at + self.timeout for worker in busy)
+                ready = wait(
+                    [worker.conn for worker in busy] + [worker.process.sentinel for worker in busy],
+                    timeout=max(0.0, next_deadline - now)
+                )
+
+                now = time.monotonic()
+                for index, worker in enumerate(workers):
+                    if worker.task is None:
+                        continue
+                    task, outcome = worker.task, None
+                    if worker.conn in ready or worker.conn.poll():
+                        try:
+                            result, error = worker.conn.recv()
+                            outcome = (task, result, error)
+                            worker.task = None
+                        except EOFError:
+                            outcome = (task, None, f"parser process exited with code {worker.process.exitcode}")
+                    elif not worker.process.is_alive():
+                        outcome = (task, None, f"parser process exited with code {worker.process.exitcode}")
+                    elif now - worker.started_at > self.timeout:
+                        outcome = (task, None, f"parsing timed out after {self.timeout:.0f}s")
+
+                    if outcome is None:
+                        continue
+                    if worker.task is not None:
+                        # Crashed or timed out: replace the worker, keep the pool size
+                        logger.warning({"message": "Replacing parser process", "file": task[0], "error": outcome[2]})
+                        worker.kill()
+                        workers[index] = _Worker(self._context, self.parse_file)
+                    yield outcome
+        finally:
+            for worker in workers:
+                if worker.task is not None:
+                    worker.kill()
+                else:
+                    worker.stop()
+
+def iter_parsed(tasks: list, parse_file: Callable, workers: int, timeout: float,
+                queue_size: int) -> Iterator[ParseOutcome]:
+    """Parse ``tasks`` and stream outcomes through a bounded queue.
+
+    Parsing runs in a feeder thread driving the process pool, so the caller
+    can embed one batch while the workers already parse the next. The queue
+    bound applies backpressure when embedding is the slower stage. With a
+    single worker, files are parsed in-process.
+    """
+    if workers <= 1 or len(tasks) <= 1:
+        for task in tasks:
+            try:
+                yield task, parse_file(task[0], task[1]), None
+            except Exception as e:
+                yield task, None, f"{type(e).__name__}: {e}"
+        return
+
+    outcomes: "queue.Queue" = queue.Queue(maxsize=queue_size)
+    stop = threading.Event()
+    done = object()
+
+    def feed():
+        try:
+            for outcome in ParsePool(parse_file, min(workers, len(tasks)), timeout).imap_unordered(tasks):
+                while not stop.is_set():
+                    try:
+                        outcomes.put(outcome, timeout=0.5)
+                        break
+                    except queue.Full:
+                        continue
+                if stop.is_set():
+                    return
+        except Exception as e:
+            outcomes.put(e)
+        finally:
+            outcomes.put(done)
+
+    feeder = threading.Thread(target=feed, name="ingest-parse-feeder", daemon=True)
+    feeder.start()
+    try:
+        while True:
+            item = outcomes.get()
+            if item is done:
+                break
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        stop.set()
+        # Drain so a blocked put() in the feeder can observe the stop flag
+        while feeder.is_alive():
+            try:
+                outcomes.get(timeout=0.1)
+            except queue.Empty:
+                pass
+        feeder.join()
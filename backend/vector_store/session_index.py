@@ -0,0 +1,287 @@
+import hashlib
+import logging
+import shutil
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from langchain_community.vectorstores import FAISS
+
+from .chunking import chunk_parsed
+
+logger = logging.getLogger("ConfigGuidanceAPI")
+
+class SessionIndex:
+    """In-memory flat FAISS index holding one chat session's uploaded documents.
+
+    Documents are appended as they arrive, so each upload only embeds the new
+    file. The index is never written to the global FAISS directory; it can be
+    spilled to a private directory and reloaded when memory is tight.
+    """
+
+    def __init__(self, chat_id: str, embeddings):
+        self.chat_id = chat_id
+        self.embeddings = embeddings
+        self.vector_store: Optional[FAISS] = None
+        self.content_hashes = set()
+        self.file_count = 0  # Session files indexed so far, in upload order
+        self.spill_path: Optional[Path] = None
+        self.last_used = time.time()
+        self.lock = threading.Lock()  # Held while embedding, loading or spilling
+
+    @property
+    def in_memory(self) -> bool:
+        return self.vector_store is not None
+
+    @property
+    def document_count(self) -> int:
+        return len(self.content_hashes)
+
+    def add_documents(self, parsed_docs: List[Dict]) -> int:
+        """Chunk, embed and append documents not already in this session; returns how many chunks were added."""
+        new_docs, new_hashes = [], set()
+        for parsed in parsed_docs:
+            content_hash = hashlib.sha256(parsed["content"].encode("utf-8")).hexdigest()
+            if content_hash in self.content_hashes or content_hash in new_hashes or not parsed["content"].strip():
+                continue
+            new_hashes.add(content_hash)
+            chunks = chunk_parsed(parsed)
+            for chunk in chunks:
+                # Lets restore() recover which files a serialized index already holds
+                chunk.metadata["content_hash"] = content_hash
+            new_docs.extend(chunks)
+
+        if new_docs:
+            self.load()
+            if self.vector_store is None:
+                self.vector_store = FAISS.from_documents(new_docs, self.embeddings)
+            else:
+                self.vector_store.add_documents(new_docs)
+        # Recorded only once embedded, so a failed upload is retried on the next request
+        self.content_hashes |= new_hashes
+        self.file_count += len(parsed_docs)
+        self.last_used = time.time()
+        return len(new_docs)
+
+    def serialize(self) -> Optional[bytes]:
+        self.load()
+        return self.vector_store.serialize_to_bytes() if self.vector_store is not None else None
+
+    def restore(self, data: bytes, file_count: int):
+        """Replace the index with one serialized by another worker."""
+        self.vector_store = FAISS.deserialize_from_bytes(
+            data, embeddings=self.embeddings, allow_dangerous_deserialization=True
+        )
+        # Chunks carry the hash of the whole file they were cut from; chunks
+        # without one predate chunking and hold the whole file
+        self.content_hashes = {
+            doc.metadata.get("content_hash") or hashlib.sha256(doc.page_content.encode("utf-8")).hexdigest()
+            for doc in self.vector_store.docstore._dict.values()
+        }
+        self.file_count = file_count
+        self.last_used = time.time()
+
+    def as_retriever(self, **kwargs):
+        self.load()
+        self.last_used = time.time()
+        return self.vector_store.as_retriever(**kwargs)
+
+    def memory_bytes(self) -> int:
+        if self.vector_store is None:
+            return 0
+        index = self.vector_store.index
+        return index.ntotal * index.d * 4
+
+    def spill(self, spill_dir: Path):
+        """Write the index to ``spill_dir`` and release the in-memory copy."""
+        if self.vector_store is None:
+            return
+        self.spill_path = spill_dir / hashlib.sha1(self.chat_id.encode()).hexdigest()
+        self.vector_store.save_local(str(self.spill_path))
+        self.vector_store = None
+
+    def load(self):
+        """Reload a spilled index into memory."""
+        if self.vector_store is None and self.spill_path is not None:
+            self.vector_store = FAISS.load_local(
+                str(self.spill_path), embeddings=self.embeddings, allow_dangerous_deserialization=True
+            )
+
+    def discard(self):
+        self.vector_store = None
+        if self.spill_path is not None:
+            shutil.rmtree(self.spill_path, ignore_errors=True)
+            self.spill_path = None
+
+class SessionIndexStore:
+    """Per-chat SessionIndex objects with LRU/idle eviction and optional spill to disk."""
+
+    def __init__(self, embeddings, config: Dict):
+        self.embeddings = embeddings
+        self.config = config
+        self.spill_dir = Path(config["spill_dir"])
+        self._indexes: "OrderedDict[str, SessionIndex]" = OrderedDict()
+        self._lock = threading.RLock()
+        self._evictions = 0
+        if config["spill_to_disk"]:
+            # Spilled indexes do not survive a restart; sessions are rebuilt from their files
+            shutil.rmtree(self.spill_dir, ignore_errors=True)
+
+    def __contains__(self, chat_id: str) -> bool:
+        return chat_id in self._indexes
+
+    def __len__(self) -> int:
+        return len(self._indexes)
+
+    def get(self, chat_id: str) -> Optional[SessionIndex]:
+        with self._lock:
+            session_index = self._indexes.get(chat_id)
+            if session_index is not None:
+                self._indexes.move_to_end(chat_id)
+            return session_index
+
+    def index_files(self, chat_id: str, file_count: int, fetch_files: Callable[[int], List[Dict]]) -> int:
+        """Index the session files not yet in its index, creating it on first use; returns how many.
+
+        ``fetch_files(start)`` returns the session's files from upload number
+        ``start`` on; it is only called when the index covers fewer than
+        ``file_count`` files.
+        """
+        with self._lock:
+            session_index = self._indexes.get(chat_id)
+            if session_index is None:
+                session_index = SessionIndex(chat_id, self.embeddings)
+                self._indexes[chat_id] = session_index
+            self._indexes.move_to_end(chat_id)
+
+        # Embedding holds only this session's lock, so other sessions are not blocked
+        with session_index.lock:
+            new_files = fetch_files(session_index.file_count) if session_index.file_count < file_count else []
+            added = session_index.add_documents(new_files) if new_files else 0
+        if new_files:
+            logger.info({
+                "message": "Updated session index",
+                "chat_id": chat_id,
+                "files_indexed": len(new_files),
+                "documents_added": added,
+                "documents_total": session_index.document_count
+            })
+        self._evict(keep=chat_id)
+        return len(new_files)
+
+    def restore(self, chat_id: str, data: bytes, file_count: int) -> SessionIndex:
+        """Load a session index serialized elsewhere (e.g. by another worker) instead of re-embedding."""
+        session_index = SessionIndex(chat_id, self.embeddings)
+        session_index.restore(data, file_count)
+        with self._lock:
+            previous = self._indexes.pop(chat_id, None)
+            self._indexes[chat_id] = session_index
+        self._evict(keep=chat_id)
+        if previous is not None:
+            previous.discard()
+        logger.info({"message": "Restored session index", "chat_id": chat_id,
+                     "documents_total": session_index.document_count})
+        return session_index
+
+    def serialize(self, chat_id: str) -> Optional[bytes]:
+        with self._lock:
+            session_index = self._indexes.get(chat_id)
+        if session_index is None:
+            return None
+        with session_index.lock:
+            return session_index.serialize()
+
+    def as_retriever(self, chat_id: str, **kwargs):
+        """Retriever over a session's index, reloading it if it was spilled."""
+        with self._lock:
+            session_index = self._indexes[chat_id]
+            self._indexes.move_to_end(chat_id)
+        with session_index.lock:
+            retriever = session_index.as_retriever(**kwargs)
+        self._evict(keep=chat_id)
+        return retriever
+
+    def _evict(self, keep: Optional[str] = None):
+        """Spill (or drop) indexes beyond the in-memory limit or idle for too long.
+
+        Victims are chosen, and their session locks taken, under the store
+        lock; the disk writes happen after it is released, so other chats
+        are not blocked behind them. Call without holding the store lock.
+        """
+        now = time.time()
+        victims = []
+        with self._lock:
+            resident = [chat_id for chat_id, index in self._indexes.items() if index.in_memory]
+            over_limit = max(0, len(resident) - self.config["max_sessions_in_memory"])
+            for chat_id in resident:  # Least recently used first
+                if chat_id == keep:
+                    continue
+                session_index = self._indexes[chat_id]
+                idle = now - session_index.last_used > self.config["idle_seconds"]
+                if over_limit <= 0 and not idle:
+                    continue
+                if not session_index.lock.acquire(blocking=False):
+                    continue  # Busy embedding, loading or being evicted; try again on the next pass
+                if not self.config["spill_to_disk"]:
+                    del self._indexes[chat_id]
+                victims.append((chat_id, session_index, idle))
+                over_limit -= 1
+                self._evictions += 1
+
+        for chat_id, session_index, idle in victims:
+            try:
+                if self.config["spill_to_disk"]:
+                    session_index.spill(self.spill_dir)
+                else:
+                    session_index.discard()
+            finally:
+                session_index.lock.release()
+            logger.info({"message": "Evicted session index from memory", "chat_id": chat_id,
+                         "spilled": self.config["spill_to_disk"], "idle": idle})
+
+    def spill(self, chat_id: str) -> bool:
+        """Move one session's index out of memory; returns False if it could not be spilled now."""
+        with self._lock:
+            session_index = self._indexes.get(chat_id)
+        if session_index is None or not self.config["spill_to_disk"]:
+            return False
+        if not session_index.lock.acquire(blocking=False):
+            return False
+        try:
+            session_index.spill(self.spill_dir)
+        finally:
+            session_index.lock.release()
+        return True
+
+    def evict_idle(self):
+        self._evict()
+
+    def remove(self, chat_id: str) -> bool:
+        with self._lock:
+            session_index = self._indexes.pop(chat_id, None)
+        if session_index is None:
+            return False
+        session_index.discard()
+        return True
+
+    def clear(self) -> int:
+        with self._lock:
+            indexes = list(self._indexes.values())
+            self._indexes.clear()
+        for session_index in indexes:
+            session_index.discard()
+        return len(indexes)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            indexes = list(self._indexes.values())
+        return {
+            "sessions": len(indexes),
+            "in_memory": sum(1 for index in indexes if index.in_memory),
+            "spilled": sum(1 for index in indexes if not index.in_memory and index.spill_path),
+            "documents": sum(index.document_count for index in indexes),
+            "memory_bytes": sum(index.memory_bytes() for index in indexes),
+            "evictions": self._evictions
+        }
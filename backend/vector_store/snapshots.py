@@ -0,0 +1,237 @@
+import json
+import logging
+import os
+import shutil
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Union
+
+try:
+    import fcntl
+except ImportError:  # Windows: publishers are not serialized across processes
+    fcntl = None
+
+logger = logging.getLogger("ConfigGuidanceAPI")
+
+CURRENT_FILENAME = "CURRENT"
+SNAPSHOT_MANIFEST_FILENAME = "snapshot.json"
+SNAPSHOTS_DIRNAME = "snapshots"
+STAGING_DIRNAME = ".staging"
+LOCK_FILENAME = ".lock"
+STALE_STAGING_SECONDS = 24 * 3600
+# SQLite databases and their sidecars are modified in place, so they are staged as copies, not links
+IN_PLACE_SUFFIXES = (".sqlite", ".sqlite-journal", ".sqlite-wal", ".sqlite-shm")
+_ANY_PARENT = object()
+
+class SnapshotConflict(RuntimeError):
+    """Raised when publishing on top of a snapshot that is no longer current."""
+
+def _fsync_tree(path: Path):
+    """Flush a directory's files and the directory entry itself to disk."""
+    for child in path.iterdir():
+        if child.is_file():
+            with open(child, "rb") as f:
+                os.fsync(f.fileno())
+        elif child.is_dir():
+            _fsync_tree(child)
+    _fsync_dir(path)
+
+def _fsync_dir(path: Path):
+    if os.name == "nt":
+        return
+    fd = os.open(str(path), os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+def _link_or_copy(source, target):
+    """Stage one snapshot file: hard-link it unless SQLite may write to it in place."""
+    if not str(source).endswith(IN_PLACE_SUFFIXES):
+        try:
+            os.link(source, target)
+            return target
+        except OSError:  # Another filesystem, or links unsupported
+            pass
+    return shutil.copy2(source, target)
+
+class SnapshotStore:
+    """Versioned, immutable FAISS index snapshots under one root directory.
+
+    Layout::
+
+        faiss_index/
+            CURRENT              name of the served snapshot, e.g. "v000042"
+            snapshots/v000042/   index.faiss, index.pkl, docstore.sqlite, ann.*,
+                                 ingest_manifest.sqlite, snapshot.json
+
+    Writers build a new snapshot in a staging directory seeded from the
+    current one (see ``stage``), then ``publish`` renames it into
+    ``snapshots/`` and swaps ``CURRENT`` with an atomic replace. Readers never see a partly written
+    index, and a crash mid-write leaves only an orphaned staging directory.
+    A root with ``index.faiss`` directly inside (the layout before snapshots)
+    is served as is until the first publish.
+    """
+
+    def __init__(self, root: Union[str, Path], keep: int = None):
+        if keep is None:
+            from backend.config.performance_config import SNAPSHOT_CONFIGS
+
+            keep = SNAPSHOT_CONFIGS["keep"]
+        self.root = Path(root)
+        self.keep = max(1, keep)
+        self.snapshots_dir = self.root / SNAPSHOTS_DIRNAME
+
+    def current_version(self) -> Optional[str]:
+        try:
+            version = (self.root / CURRENT_FILENAME).read_text().strip()
+        except FileNotFoundError:
+            return None
+        return version if (self.snapshots_dir / version).is_dir() else None
+
+    def current_path(self) -> Path:
+        """Directory of the served index: the current snapshot, else the legacy root."""
+        version = self.current_version()
+        return self.snapshots_dir / version if version else self.root
+
+    def exists(self) -> bool:
+        return (self.current_path() / "index.faiss").exists()
+
+    def path(self, version: str) -> Path:
+        return self.snapshots_dir / version
+
+    def versions(self) -> List[Dict]:
+        """Published snapshots, oldest first, with their snapshot.json contents."""
+        if not self.snapshots_dir.is_dir():
+            return []
+        current = self.current_version()
+        versions = []
+        for path in sorted(self.snapshots_dir.iterdir()):
+            if not path.is_dir():
+                continue
+            try:
+                info = json.loads((path / SNAPSHOT_MANIFEST_FILENAME).read_text())
+            except (OSError, ValueError):
+                info = {"version": path.name}
+            info["current"] = path.name == current
+            versions.append(info)
+        return versions
+
+    @contextmanager
+    def _locked(self):
+        """Serialize publishers (init_faiss.py and API workers) on this root."""
+        self.root.mkdir(parents=True, exist_ok=True)
+        with open(self.root / LOCK_FILENAME, "a") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    @contextmanager
+    def stage(self, copy_current: bool = True) -> Iterator[Path]:
+        """Yield a private directory to build the next snapshot in.
+
+        It starts as the contents of the current snapshot, including index
+        subdirectories such as ``lexical/``. SQLite databases are updated in
+        place, so they are copied; every other index file is only ever
+        replaced through a temporary name and ``os.replace``, so it is
+        hard-linked (copied where links are unsupported). Unless it is
+        published inside the block, it is deleted on exit.
+        """
+        staging = self.root / STAGING_DIRNAME / f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        staging.mkdir(parents=True)
+        try:
+            source = self.current_path()
+            if copy_current and (source / "index.faiss").exists():
+                for item in source.iterdir():
+                    if item.name.startswith(".") or item.name.endswith(".tmp") \
+                            or item.name in (CURRENT_FILENAME, SNAPSHOT_MANIFEST_FILENAME):
+                        continue
+                    if item.is_file():
+                        _link_or_copy(item, staging / item.name)
+                    elif item.is_dir() and item.name != SNAPSHOTS_DIRNAME:
+                        shutil.copytree(item, staging / item.name, copy_function=_link_or_copy)
+            yield staging
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+
+    def publish(self, staging: Union[str, Path], source: str, info: Dict = None,
+                expected_parent: Optional[str] = _ANY_PARENT) -> str:
+        """Move a staged snapshot into place and make it current; returns its version.
+
+        With ``expected_parent`` set to a version (or None for "no snapshot
+        yet"), SnapshotConflict is raised if another writer published first.
+        """
+        staging = Path(staging)
+        with self._locked():
+            parent = self.current_version()
+            if expected_parent is not _ANY_PARENT and parent != expected_parent:
+                raise SnapshotConflict(f"snapshot {parent} was published after {expected_parent}")
+            existing = [int(p.name[1:]) for p in self.snapshots_dir.glob("v*") if p.name[1:].isdigit()] \
+                if self.snapshots_dir.is_dir() else []
+            version = f"v{max(existing, default=0) + 1:06d}"
+            manifest = {
+                "version": version,
+                "parent": parent,
+                "source": source,
+                "created_at": time.time(),
+                "files": {str(p.relative_to(staging)): p.stat().st_size for p in sorted(staging.rglob("*"))
+                          if p.is_file() and p.name != SNAPSHOT_MANIFEST_FILENAME},
+                **(info or {})
+            }
+            (staging / SNAPSHOT_MANIFEST_FILENAME).write_text(json.dumps(manifest, indent=2, default=str))
+            _fsync_tree(staging)
+
+            self.snapshots_dir.mkdir(parents=True, exist_ok=True)
+            os.rename(staging, self.snapshots_dir / version)
+            _fsync_dir(self.snapshots_dir)
+            self._set_current(version)
+            self._prune()
+        logger.info({"message": "Published FAISS index snapshot", "version": version, "parent": parent,
+                     "source": source})
+        return version
+
+    def rollback(self, version: str = None) -> str:
+        """Serve an earlier snapshot: ``version``, or the one published before the current one."""
+        with self._locked():
+            available = [p.name for p in sorted(self.snapshots_dir.iterdir()) if p.is_dir()] \
+                if self.snapshots_dir.is_dir() else []
+            current = self.current_version()
+            if version is None:
+                older = [v for v in available if current is None or v < current]
+                if not older:
+                    raise ValueError("No earlier index snapshot to roll back to")
+                version = older[-1]
+            elif version not in available:
+                raise ValueError(f"Unknown index snapshot: {version}. Available: {', '.join(available)}")
+            self._set_current(version)
+        logger.info({"message": "Rolled back FAISS index snapshot", "from": current, "to": version})
+        return version
+
+    def _set_current(self, version: str):
+        tmp = self.root / f"{CURRENT_FILENAME}.{os.getpid()}.tmp"
+        with open(tmp, "w") as f:
+            f.write(version)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.root / CURRENT_FILENAME)
+        _fsync_dir(self.root)
+
+    def _prune(self):
+        """Keep the newest ``keep`` snapshots (and always the current one); drop stale staging dirs."""
+        current = self.current_version()
+        published = sorted(p for p in self.snapshots_dir.iterdir() if p.is_dir())
+        for path in published[:-self.keep]:
+            if path.name != current:
+                shutil.rmtree(path, ignore_errors=True)
+        staging_root = self.root / STAGING_DIRNAME
+        if staging_root.is_dir():
+            # Left behind by writers that crashed mid-build
+            for path in staging_root.iterdir():
+                if time.time() - path.stat().st_mtime > STALE_STAGING_SECONDS:
+                    shutil.rmtree(path, ignore_errors=True)